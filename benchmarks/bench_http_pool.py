@@ -0,0 +1,87 @@
+"""Connection setup cost saved by the shared HTTP pools.
+
+    python -m benchmarks.bench_http_pool --requests 20
+    python -m benchmarks.bench_http_pool --providers openai elevenlabs --turn openai elevenlabs
+    python -m benchmarks.bench_http_pool --url https://staging.example.com/health
+
+For every target the same HEAD request is sent --requests times twice:
+once through a fresh httpx.Client per request (DNS + TCP + TLS every time,
+what an unpooled SDK client pays after its connection idles out) and once
+through the pooled client from src.services.http_pool. The difference of
+the medians is the setup cost a pooled request avoids; summing it over the
+providers one turn talks to (--turn) gives the saving per turn.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Dict, List, Any
+
+import httpx
+
+from benchmarks.run_benchmarks import percentile
+from src.services.http_pool import HttpPoolRegistry, PROVIDER_BASE_URLS, HTTP2_AVAILABLE
+
+def _timed_head(client: httpx.Client, url: str) -> float:
+    started = time.perf_counter()
+    client.head(url)
+    return time.perf_counter() - started
+
+def measure(url: str, provider: str, requests: int, http2: bool) -> Dict[str, Any]:
+    cold: List[float] = []
+    for _ in range(requests):
+        with httpx.Client(http2=http2, timeout=10.0) as client:
+            cold.append(_timed_head(client, url))
+
+    pools = HttpPoolRegistry(timeout=10.0)
+    pooled_client = pools.httpx_client(provider)
+    pooled_client.head(url)  # first request opens the pooled connection
+    pooled = [_timed_head(pooled_client, url) for _ in range(requests)]
+    pooled_client.close()
+
+    cold.sort()
+    pooled.sort()
+    return {
+        'url': url,
+        'cold_p50_ms': round(percentile(cold, 50) * 1000, 2),
+        'cold_p95_ms': round(percentile(cold, 95) * 1000, 2),
+        'pooled_p50_ms': round(percentile(pooled, 50) * 1000, 2),
+        'pooled_p95_ms': round(percentile(pooled, 95) * 1000, 2),
+        'saved_per_request_ms': round((statistics.median(cold) - statistics.median(pooled)) * 1000, 2)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--providers', nargs='+', choices=sorted(PROVIDER_BASE_URLS),
+                        default=['openai', 'elevenlabs', 'twilio'])
+    parser.add_argument('--url', action='append', default=[], help='extra URL to measure (repeatable)')
+    parser.add_argument('--turn', nargs='+', default=['openai', 'elevenlabs'],
+                        help='targets one conversational turn talks to')
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--http1', action='store_true', help='disable HTTP/2 for the cold clients')
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    targets = {provider: PROVIDER_BASE_URLS[provider] for provider in args.providers}
+    targets.update({url: url for url in args.url})
+
+    report = {'http2': HTTP2_AVAILABLE and not args.http1, 'requests': args.requests, 'targets': {}}
+    for name, url in targets.items():
+        print(f"Measuring {name}...", flush=True)
+        try:
+            report['targets'][name] = measure(url, name, args.requests, report['http2'])
+        except httpx.HTTPError as e:
+            report['targets'][name] = {'url': url, 'error': str(e)}
+    report['saved_per_turn_ms'] = round(sum(
+        report['targets'][name].get('saved_per_request_ms', 0) for name in args.turn if name in report['targets']
+    ), 2)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Intent classifier throughput, one utterance at a time and in batches.
+
+    python -m benchmarks.bench_intents --utterances 20000
+    python -m benchmarks.bench_intents --corpus calls.jsonl --batch 256
+
+Utterances come from a replay corpus (customer turns) or, by default, the
+benchmark MESSAGES with varied suffixes. Runs on one core; reports
+utterances per second and per-call latency percentiles.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from typing import List
+
+from benchmarks.run_benchmarks import MESSAGES, percentile
+from src.services.intent_classifier import intents
+
+SUFFIXES = ['', '', ' please', ' لو سمحت', ' today', ' for my son', '?', ' شكرا']
+
+def utterances(corpus: str, count: int) -> List[str]:
+    if corpus:
+        from benchmarks.replay import load_from_corpus
+        pool = [turn for session in load_from_corpus(corpus) for turn in session['turns']]
+    else:
+        pool = [message + suffix for message in MESSAGES for suffix in SUFFIXES]
+    return [random.choice(pool) for _ in range(count)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='replay JSONL corpus to draw customer turns from')
+    parser.add_argument('--utterances', type=int, default=20000)
+    parser.add_argument('--batch', type=int, default=512)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    texts = utterances(args.corpus, args.utterances)
+    intents.classify('warm up')  # trains or loads the model
+
+    single = []
+    for text in texts[:min(len(texts), 5000)]:
+        started = time.perf_counter()
+        intents.classify(text)
+        single.append(time.perf_counter() - started)
+    single.sort()
+
+    started = time.perf_counter()
+    for offset in range(0, len(texts), args.batch):
+        intents.classify_batch(texts[offset:offset + args.batch])
+    batch_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        'single': {
+            'utterances_per_s': round(len(single) / sum(single)),
+            'p50_us': round(percentile(single, 50) * 1e6, 1),
+            'p99_us': round(percentile(single, 99) * 1e6, 1)
+        },
+        'batched': {
+            'batch': args.batch,
+            'utterances_per_s': round(len(texts) / batch_seconds)
+        }
+    }, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Telephony transcoding throughput: PCM at TTS rates to 8 kHz mu-law frames.
+
+    python -m benchmarks.bench_transcode --seconds 60
+    python -m benchmarks.bench_transcode --rates 16000 44100 --chunk 1024
+
+Each input rate streams `--seconds` of synthetic speech-like audio (a
+gliding harmonic tone with syllable-rate amplitude modulation and noise)
+through one TelephonyTranscoder in `--chunk`-byte pieces, the way
+ElevenLabs delivers it. Runs on one core; reports 20 ms frames per second,
+the number of concurrent calls one core keeps up with (frames per second
+over 50, i.e. the real-time factor) and per-chunk latency.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.run_benchmarks import percentile
+from src.services.audio_transcode import FRAME_MS, TelephonyTranscoder, encode_ulaw
+
+FRAMES_PER_SECOND = 1000 // FRAME_MS
+
+def speech_like(rate: int, seconds: float, seed: int = 1) -> bytes:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(rate * seconds)) / rate
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voiced = sum(np.sin(h * phase) / h for h in range(1, 12))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    signal = 6000 * envelope * voiced + 300 * rng.standard_normal(len(t))
+    return np.clip(signal, -32768, 32767).astype('<i2').tobytes()
+
+def run(rate: int, audio: bytes, chunk: int) -> dict:
+    transcoder = TelephonyTranscoder(rate)
+    view = memoryview(audio)
+    frames, latencies = 0, []
+    started = time.perf_counter()
+    for offset in range(0, len(view), chunk):
+        chunk_started = time.perf_counter()
+        frames += sum(1 for _ in transcoder.feed(view[offset:offset + chunk]))
+        latencies.append(time.perf_counter() - chunk_started)
+    frames += sum(1 for _ in transcoder.flush())
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    frames_per_s = frames / elapsed
+    return {
+        'frames': frames,
+        'frames_per_s': round(frames_per_s),
+        'calls_per_core': round(frames_per_s / FRAMES_PER_SECOND),
+        'chunk_p50_us': round(percentile(latencies, 50) * 1e6, 1),
+        'chunk_p99_us': round(percentile(latencies, 99) * 1e6, 1)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rates', type=int, nargs='+', default=[8000, 16000, 22050, 24000, 44100])
+    parser.add_argument('--seconds', type=float, default=30.0, help='audio per rate')
+    parser.add_argument('--chunk', type=int, default=4096, help='bytes per incoming chunk')
+    args = parser.parse_args(argv)
+
+    report = {}
+    for rate in args.rates:
+        audio = speech_like(rate, args.seconds)
+        run(rate, audio[:rate * 2], args.chunk)  # warm up
+        report[str(rate)] = run(rate, audio, args.chunk)
+
+    pcm = np.frombuffer(speech_like(8000, args.seconds), dtype='<i2')
+    started = time.perf_counter()
+    encode_ulaw(pcm)
+    report['ulaw_encode_msamples_per_s'] = round(len(pcm) / (time.perf_counter() - started) / 1e6, 1)
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
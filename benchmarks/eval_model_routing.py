@@ -0,0 +1,186 @@
+"""Offline evaluation of intent-based model routing on a transcript corpus.
+
+    python -m benchmarks.eval_model_routing --corpus calls.jsonl --ai-config '{"model": "gpt-4o"}'
+    python -m benchmarks.eval_model_routing --database sqlite:///instance/voice_agent.db --limit 500 \\
+        --provider groq --ai-config '{"model_routing": {"languages": {"ar": "large"}}}'
+    python -m benchmarks.eval_model_routing --corpus calls.jsonl --live --sample 40
+
+Every customer turn is routed twice: once with routing disabled (the
+business's single model, today's behaviour) and once with the policy from
+--ai-config (default: DEFAULT_INTENT_TIERS). Prompt tokens are estimated
+from the system prompt and the conversation so far; completion tokens from
+the recorded AI reply, capped at the route's max_tokens. Cost uses the
+price table in src.services.tenant_limits. Latency is modeled as
+time-to-first-token plus completion tokens over output speed per model
+(MODEL_PROFILES, override with --profiles file.json). With --live the
+turns are sent to the real provider instead (keys from the environment)
+and measured latency and reported usage are used.
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+
+from benchmarks.replay import load_from_corpus, load_from_database
+from benchmarks.run_benchmarks import percentile
+from src.services import model_routing
+from src.services.provider_registry import PROVIDERS, providers
+from src.services.tenant_limits import estimate_cost
+
+# model -> (seconds to first token, output tokens per second); rough public medians
+MODEL_PROFILES = {
+    'gpt-4o': (0.45, 70),
+    'gpt-4o-mini': (0.35, 95),
+    'gpt-4.1-nano': (0.3, 130),
+    'llama3-70b-8192': (0.25, 280),
+    'llama3-8b-8192': (0.15, 750),
+    'claude-3-5-sonnet-20241022': (0.9, 65),
+    'claude-3-5-haiku-20241022': (0.6, 110),
+    'gemini-1.5-pro': (0.8, 60),
+    'gemini-1.5-flash': (0.4, 160),
+    'gemini-1.5-flash-8b': (0.35, 200),
+}
+DEFAULT_COMPLETION_TOKENS = 40
+SYSTEM_PROMPT = ("You are a helpful AI assistant for a business in Saudi Arabia. Answer questions about "
+                 "services, pricing and hours, help customers book appointments, and reply in the "
+                 "customer's language in at most two sentences.")
+
+def _tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+def turns_of(sessions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Flatten sessions into turns with their position and the conversation before them"""
+    turns = []
+    for session in sessions:
+        history_chars = 0
+        replies = session.get('replies') or []
+        for index, message in enumerate(session['turns']):
+            reply = replies[index] if index < len(replies) else None
+            turns.append({
+                'message': message,
+                'turn': index,
+                'history_chars': history_chars,
+                'reply_tokens': _tokens(reply) if reply else DEFAULT_COMPLETION_TOKENS,
+                'history': [(session['turns'][i], replies[i] if i < len(replies) else '') for i in range(index)]
+            })
+            history_chars += len(message) + len(reply or '')
+    return turns
+
+def modeled_turn(selected: model_routing.Route, turn: Dict[str, Any], system_tokens: int,
+                 profiles: Dict[str, Tuple[float, float]]) -> Tuple[float, int, int]:
+    model = selected.model or PROVIDERS[selected.provider]['model']
+    ttft, tokens_per_second = profiles.get(model, (0.5, 80))
+    prompt_tokens = system_tokens + turn['history_chars'] // 4 + _tokens(turn['message'])
+    completion_tokens = min(turn['reply_tokens'], selected.max_tokens)
+    return ttft + completion_tokens / tokens_per_second, prompt_tokens, completion_tokens
+
+def live_turn(selected: model_routing.Route, turn: Dict[str, Any]) -> Tuple[float, int, int]:
+    model = selected.model or PROVIDERS[selected.provider]['model']
+    messages = [{'role': 'system', 'content': SYSTEM_PROMPT}]
+    for customer, reply in turn['history'][-2:]:
+        messages.append({'role': 'user', 'content': customer})
+        if reply:
+            messages.append({'role': 'assistant', 'content': reply})
+    messages.append({'role': 'user', 'content': turn['message']})
+    started = time.perf_counter()
+    result = providers.call(selected.provider, model, messages, max_tokens=selected.max_tokens)
+    elapsed = time.perf_counter() - started
+    return elapsed, result['usage'].get('prompt_tokens', 0), result['usage'].get('completion_tokens', 0)
+
+def evaluate(turns: List[Dict[str, Any]], ai_config: Dict[str, Any], provider: str, live: bool,
+             system_tokens: int, profiles: Dict[str, Tuple[float, float]]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    cost = 0.0
+    tokens = Counter()
+    tiers = Counter()
+    by_intent: Dict[str, List[float]] = defaultdict(list)
+    for turn in turns:
+        intent = model_routing.detect_turn_intent(turn['message'])
+        selected = model_routing.route(intent, turn['message'], turn=turn['turn'], ai_config=ai_config,
+                                       default_provider=provider)
+        model = selected.model or PROVIDERS[selected.provider]['model']
+        if live:
+            latency, prompt_tokens, completion_tokens = live_turn(selected, turn)
+        else:
+            latency, prompt_tokens, completion_tokens = modeled_turn(selected, turn, system_tokens, profiles)
+        latencies.append(latency)
+        by_intent[intent].append(latency)
+        tokens['prompt'] += prompt_tokens
+        tokens['completion'] += completion_tokens
+        tiers[f"{selected.tier}:{model}"] += 1
+        cost += estimate_cost(model, prompt_tokens, completion_tokens)
+
+    ordered = sorted(latencies)
+    return {
+        'turns': len(turns),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 1),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 1),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0,
+        'prompt_tokens': tokens['prompt'],
+        'completion_tokens': tokens['completion'],
+        'cost_usd': round(cost, 6),
+        'cost_per_1k_turns_usd': round(cost / len(turns) * 1000, 4) if turns else 0,
+        'models': dict(tiers),
+        'mean_ms_by_intent': {intent: round(sum(values) / len(values) * 1000, 1)
+                              for intent, values in sorted(by_intent.items())}
+    }
+
+def _saving(before: float, after: float) -> Optional[float]:
+    return round((before - after) / before * 100, 1) if before else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--corpus', help='JSONL of {"to", "turns": [...], "replies": [...]} or {"to", "transcript"}')
+    source.add_argument('--database', help='SQLAlchemy URL to read call_logs transcripts from')
+    parser.add_argument('--business-id', type=int)
+    parser.add_argument('--limit', type=int, default=1000, help='calls to read from --database')
+    parser.add_argument('--provider', default='openai', choices=sorted(PROVIDERS))
+    parser.add_argument('--ai-config', default='{}', help="business ai_config JSON, e.g. its model_routing policy")
+    parser.add_argument('--system-tokens', type=int, default=350, help='system prompt size in tokens')
+    parser.add_argument('--profiles', help='JSON file of {model: [ttft_seconds, tokens_per_second]}')
+    parser.add_argument('--live', action='store_true', help='call the provider instead of modeling latency')
+    parser.add_argument('--sample', type=int, default=0, help='only evaluate the first N turns')
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    sessions = (load_from_database(args.database, args.business_id, args.limit) if args.database
+                else load_from_corpus(args.corpus))
+    turns = turns_of(sessions)
+    if args.sample:
+        turns = turns[:args.sample]
+    if not turns:
+        print("No customer turns found", file=sys.stderr)
+        return 1
+
+    profiles = dict(MODEL_PROFILES)
+    if args.profiles:
+        with open(args.profiles) as f:
+            profiles.update({model: tuple(values) for model, values in json.load(f).items()})
+    ai_config = json.loads(args.ai_config)
+    ai_config.setdefault('provider', args.provider)
+    single_model = {**ai_config, 'model_routing': False}
+
+    baseline = evaluate(turns, single_model, args.provider, args.live, args.system_tokens, profiles)
+    routed = evaluate(turns, ai_config, args.provider, args.live, args.system_tokens, profiles)
+    report = {
+        'mode': 'live' if args.live else 'modeled',
+        'provider': args.provider,
+        'single_model': baseline,
+        'routed': routed,
+        'savings': {
+            'p50_latency_pct': _saving(baseline['p50_ms'], routed['p50_ms']),
+            'mean_latency_pct': _saving(baseline['mean_ms'], routed['mean_ms']),
+            'cost_pct': _saving(baseline['cost_usd'], routed['cost_usd'])
+        }
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
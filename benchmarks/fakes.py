@@ -0,0 +1,265 @@
+"""Deterministic stand-ins for the OpenAI/Groq, ElevenLabs and Twilio clients.
+
+Each fake sleeps for a configurable latency and fails at a configurable
+rate from a seeded RNG, so two runs with the same settings see the same
+sequence of delays and errors.
+"""
+import inspect
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Iterator, Optional
+
+class FakeProviderError(Exception):
+    pass
+
+class _Seeded:
+    def __init__(self, error_rate: float, seed: int):
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+class FakeLLMClient(_Seeded):
+    """Mimics `client.chat.completions.create()` of the OpenAI and Groq SDKs"""
+
+    def __init__(self, ttft: float = 0.25, tokens_per_second: float = 80.0, error_rate: float = 0.0,
+                 reply: str = "Yes, we are open tomorrow from 9 AM to 5 PM. Would you like to book?",
+                 seed: int = 1):
+        super().__init__(error_rate, seed)
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.reply = reply
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _tokens(self, max_tokens: Optional[int]):
+        tokens = self.reply.split(' ')
+        return tokens[:max_tokens] if max_tokens else tokens
+
+    def create(self, model: str = '', messages=None, max_tokens: Optional[int] = None,
+               temperature: float = 0.0, stream: bool = False, **kwargs):
+        self.calls += 1
+        if self._should_fail():
+            time.sleep(self.ttft)
+            raise FakeProviderError(f"fake {model} failure")
+
+        tokens = self._tokens(max_tokens)
+        usage = SimpleNamespace(
+            prompt_tokens=sum(len(m.get('content', '')) // 4 for m in messages or []),
+            completion_tokens=len(tokens)
+        )
+        if stream:
+            include_usage = (kwargs.get('stream_options') or {}).get('include_usage', False)
+            return self._stream(tokens, usage if include_usage else None)
+
+        time.sleep(self.ttft + len(tokens) / self.tokens_per_second)
+        message = SimpleNamespace(content=' '.join(tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage, model=model)
+
+    def _stream(self, tokens, usage=None) -> Iterator[SimpleNamespace]:
+        time.sleep(self.ttft)
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(1 / self.tokens_per_second)
+            text = token if index == 0 else ' ' + token
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+        if usage is not None:
+            # Like OpenAI with stream_options={"include_usage": True}: a final chunk without choices
+            yield SimpleNamespace(choices=[], usage=usage)
+
+class FakeElevenLabs(_Seeded):
+    """Mimics `text_to_speech.convert()`/`stream()` and `voices.get_all()` of the ElevenLabs SDK.
+
+    Calls are bound against the installed SDK's own signatures, so code that
+    passes arguments the real client would reject fails here too.
+    """
+
+    def __init__(self, latency: float = 0.3, chars_per_second: float = 400.0, error_rate: float = 0.0,
+                 seed: int = 2, chunk_bytes: int = 4096):
+        super().__init__(error_rate, seed)
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.chunk_bytes = chunk_bytes
+        self.text_to_speech = SimpleNamespace(convert=self._convert, stream=self._stream)
+        self.voices = SimpleNamespace(get_all=lambda: SimpleNamespace(voices=[
+            SimpleNamespace(voice_id='fake_voice', name='Fake Voice')
+        ]))
+
+    @staticmethod
+    def _check(method: str, voice_id, **kwargs):
+        from elevenlabs.text_to_speech.client import TextToSpeechClient
+        inspect.signature(getattr(TextToSpeechClient, method)).bind(None, voice_id, **kwargs)
+
+    @staticmethod
+    def _audio(text: str, output_format: Optional[str]) -> bytes:
+        """Silence roughly the spoken length of the text, in the requested format"""
+        seconds = len(text) / 15
+        if output_format == 'ulaw_8000':
+            return b'\xff' * int(seconds * 8000)
+        rate = int(output_format.split('_')[1]) if output_format and output_format.startswith('pcm_') else 8000
+        return b'\x00\x00' * int(seconds * rate)
+
+    def _synthesize(self, method: str, voice_id: str, text: str, output_format: Optional[str], kwargs) -> bytes:
+        self._check(method, voice_id, text=text, output_format=output_format, **kwargs)
+        if self._should_fail():
+            raise FakeProviderError("fake TTS failure")
+        time.sleep(self.latency + len(text) / self.chars_per_second)
+        return self._audio(text, output_format)
+
+    def _convert(self, voice_id: str, *, text: str, output_format: Optional[str] = None, **kwargs) -> Iterator[bytes]:
+        return iter([self._synthesize('convert', voice_id, text, output_format, kwargs)])
+
+    def _stream(self, voice_id: str, *, text: str, output_format: Optional[str] = None, **kwargs) -> Iterator[bytes]:
+        audio = self._synthesize('stream', voice_id, text, output_format, kwargs)
+        return iter([audio[offset:offset + self.chunk_bytes] for offset in range(0, len(audio), self.chunk_bytes)])
+
+class FakeTwilioClient(_Seeded):
+    """Mimics `Client.messages.create()`; records what would have been sent"""
+
+    def __init__(self, latency: float = 0.15, error_rate: float = 0.0, seed: int = 3):
+        super().__init__(error_rate, seed)
+        self.latency = latency
+        self.sent = []
+        self.messages = SimpleNamespace(create=self._create_message)
+
+    def _create_message(self, to: str, from_: str, body: str, **kwargs):
+        time.sleep(self.latency)
+        if self._should_fail():
+            raise FakeProviderError("fake Twilio REST failure")
+        sid = f"SM{len(self.sent):032d}"
+        self.sent.append({'sid': sid, 'to': to, 'from': from_, 'body': body})
+        return SimpleNamespace(sid=sid, status='queued')
+
+class FakeTwilioServer(_Seeded):
+    """Local HTTP server speaking enough of the Twilio REST API for Messages.json.
+
+    A real twilio.rest.Client built by rest_twilio_client() sends to it, so
+    the whole REST path (auth, form encoding, pooled session, error
+    mapping) is exercised. Failures answer 503 with a Twilio error body.
+    `script()` queues outcomes for the next requests: an HTTP error status,
+    or 'drop' to accept the message and close the connection unanswered.
+    """
+
+    def __init__(self, latency: float = 0.15, error_rate: float = 0.0, seed: int = 4):
+        super().__init__(error_rate, seed)
+        self.latency = latency
+        self.sent = []
+        self.requests = 0
+        self._script = []
+        self._server = None
+
+    def script(self, *outcomes):
+        with self._lock:
+            self._script.extend(outcomes)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeTwilioServer':
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+                time.sleep(fake.latency)
+                if not self.path.endswith('/Messages.json'):
+                    return self._reply(404, {'code': 20404, 'message': 'The requested resource was not found', 'status': 404})
+                with fake._lock:
+                    fake.requests += 1
+                    outcome = fake._script.pop(0) if fake._script else None
+                if isinstance(outcome, int):
+                    return self._reply(outcome, {'code': 20000 + outcome, 'message': 'Scripted failure', 'status': outcome})
+                if outcome is None and fake._should_fail():
+                    return self._reply(503, {'code': 20500, 'message': 'Service unavailable', 'status': 503})
+                with fake._lock:
+                    sid = f"SM{len(fake.sent):032d}"
+                    fake.sent.append({'sid': sid, 'to': form.get('To'), 'from': form.get('From'),
+                                      'body': form.get('Body'), 'received_at': time.perf_counter()})
+                if outcome == 'drop':
+                    self.close_connection = True
+                    return
+                self._reply(201, {'sid': sid, 'status': 'queued', 'to': form.get('To'), 'from': form.get('From'),
+                                  'body': form.get('Body'), 'account_sid': ACCOUNT_SID})
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='fake-twilio', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+def rest_twilio_client(base_url: str):
+    """A real twilio.rest.Client whose requests go to a FakeTwilioServer instead of api.twilio.com"""
+    from twilio.rest import Client
+    from twilio.http.http_client import TwilioHttpClient
+    from src.services.http_pool import http_pools
+
+    class LocalHttpClient(TwilioHttpClient):
+        def request(self, method, url, *args, **kwargs):
+            url = re.sub(r'^https://[a-z.]*twilio\.com', base_url, url)
+            return super().request(method, url, *args, **kwargs)
+
+    http_client = LocalHttpClient(pool_connections=True, timeout=http_pools.timeout)
+    http_client.session = http_pools.twilio_session()  # the same session production sends through
+    return Client(ACCOUNT_SID, 'fake-auth-token', http_client=http_client)
+
+# Twilio webhook form payloads
+
+ACCOUNT_SID = 'AC' + '0' * 32
+
+def call_sid(n: int) -> str:
+    return f"CA{n:032d}"
+
+def message_sid(n: int) -> str:
+    return f"SM{n:032d}"
+
+def voice_call_form(sid: str, from_number: str, to_number: str) -> dict:
+    return {
+        'AccountSid': ACCOUNT_SID, 'ApiVersion': '2010-04-01', 'CallSid': sid,
+        'CallStatus': 'ringing', 'Direction': 'inbound', 'From': from_number,
+        'To': to_number, 'Caller': from_number, 'Called': to_number,
+        'FromCountry': 'SA', 'ToCountry': 'SA'
+    }
+
+def speech_form(sid: str, from_number: str, to_number: str, speech: str, confidence: float = 0.92) -> dict:
+    form = voice_call_form(sid, from_number, to_number)
+    form.update({'CallStatus': 'in-progress', 'SpeechResult': speech, 'Confidence': str(confidence)})
+    return form
+
+def status_form(sid: str, from_number: str, to_number: str, duration: int, status: str = 'completed') -> dict:
+    form = voice_call_form(sid, from_number, to_number)
+    form.update({'CallStatus': status, 'CallDuration': str(duration)})
+    return form
+
+def sms_form(sid: str, from_number: str, to_number: str, body: str) -> dict:
+    return {
+        'AccountSid': ACCOUNT_SID, 'ApiVersion': '2010-04-01', 'MessageSid': sid,
+        'SmsSid': sid, 'From': from_number, 'To': to_number, 'Body': body,
+        'NumMedia': '0', 'NumSegments': '1', 'FromCountry': 'SA', 'ToCountry': 'SA'
+    }
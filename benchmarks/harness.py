@@ -0,0 +1,94 @@
+"""Builds the app with fake providers wired in, for the benchmarks and for gunicorn.
+
+    gunicorn --worker-class gthread --workers 2 --threads 8 'benchmarks.harness:create_gunicorn_app()'
+
+Fake provider behaviour is read from BENCH_* environment variables so the
+same settings reach every gunicorn worker.
+"""
+import os
+import tempfile
+from unittest import mock
+from benchmarks.fakes import FakeLLMClient, FakeElevenLabs, FakeTwilioClient, rest_twilio_client
+
+BUSINESS_PHONE = '+966110000000'
+BUSINESS_HOURS = {
+    day: {"open": "09:00", "close": "17:00"}
+    for day in ('sunday', 'monday', 'tuesday', 'wednesday', 'thursday')
+}
+BUSINESS_HOURS.update({"friday": {"open": "14:00", "close": "18:00"}, "saturday": {"open": "09:00", "close": "13:00"}})
+SERVICES = [('General Consultation', 150.0, 30), ('Lab Tests', 80.0, 20), ('X-Ray', 250.0, 30)]
+
+def fakes_from_env():
+    env = os.environ
+    llm = FakeLLMClient(
+        ttft=float(env.get('BENCH_LLM_TTFT', '0.25')),
+        tokens_per_second=float(env.get('BENCH_LLM_TOKENS_PER_SECOND', '80')),
+        error_rate=float(env.get('BENCH_LLM_ERROR_RATE', '0')),
+        seed=int(env.get('BENCH_SEED', '1'))
+    )
+    tts = FakeElevenLabs(
+        latency=float(env.get('BENCH_TTS_LATENCY', '0.3')),
+        error_rate=float(env.get('BENCH_TTS_ERROR_RATE', '0')),
+        seed=int(env.get('BENCH_SEED', '1')) + 1
+    )
+    if env.get('BENCH_TWILIO_URL'):
+        # A FakeTwilioServer started by the benchmark runner, shared by every worker
+        twilio = rest_twilio_client(env['BENCH_TWILIO_URL'])
+    else:
+        twilio = FakeTwilioClient(
+            latency=float(env.get('BENCH_TWILIO_LATENCY', '0.15')),
+            error_rate=float(env.get('BENCH_TWILIO_ERROR_RATE', '0')),
+            seed=int(env.get('BENCH_SEED', '1')) + 2
+        )
+    return llm, tts, twilio
+
+def build_app(llm, tts, twilio, database_uri=None):
+    """Point the main app at a scratch database and swap every provider client for a fake"""
+    if database_uri is None:
+        fd, path = tempfile.mkstemp(prefix='voice-bench-', suffix='.db')
+        os.close(fd)
+        database_uri = f"sqlite:///{path}"
+    # src.main binds DATABASE_URL at import time
+    os.environ['DATABASE_URL'] = database_uri
+
+    # src.main probes the real providers and Twilio when imported; fail those probes offline
+    offline = ConnectionError('benchmark run: real providers are not called')
+    with mock.patch('src.services.provider_registry.ProviderRegistry.stream', side_effect=offline), \
+            mock.patch('twilio.rest.Client') as twilio_client:
+        twilio_client.return_value.api.accounts.list.side_effect = offline
+        import src.main as main
+    from src.models.voice_models import db, Service
+    from src.routes import voice_routes
+    from src.services.provider_registry import providers
+    from src.services.tenant_registry import tenants
+    from src.services.sms_outbox import sms_outbox
+
+    app = main.app
+    providers.register_client('openai', llm)
+    providers.default_provider = 'openai'
+    main.ai_provider = providers.label('openai')
+    main.twilio_client = twilio
+    if main.SMS_REPLY_MODE == 'async':
+        sms_outbox.start(twilio)
+    voice_routes.get_voice_processor().client = tts
+
+    with app.app_context():
+        if not tenants.get_by_phone(BUSINESS_PHONE):
+            business = tenants.create({
+                'name': 'Benchmark Clinic',
+                'phone': BUSINESS_PHONE,
+                'description': 'Family clinic in Riyadh. General consultation 150 SAR, lab tests 80 SAR, X-ray 250 SAR.',
+                'business_hours': BUSINESS_HOURS,
+                # Load runs far exceed one clinic's real budget; measure latency, not throttling
+                'ai_config': {"language_preference": "both",
+                              "rate_limits": {"requests_per_minute": 1000000, "tokens_per_minute": 1000000000}}
+            })
+            for name, price, minutes in SERVICES:
+                db.session.add(Service(business_id=business['id'], name=name, price=price,
+                                       duration_minutes=minutes, is_active=True))
+            db.session.commit()
+    return app
+
+def create_gunicorn_app():
+    llm, tts, twilio = fakes_from_env()
+    return build_app(llm, tts, twilio, os.environ.get('BENCH_DATABASE_URI'))
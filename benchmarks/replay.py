@@ -0,0 +1,228 @@
+"""Replay recorded conversations as concurrent phone calls against the voice webhooks.
+
+    # Sessions from stored call logs
+    python -m benchmarks.replay --database sqlite:///instance/voice_agent.db --rate 2 --calls 200 \\
+        --base-url http://127.0.0.1:8000
+
+    # Sessions from a JSONL corpus: {"to": "+9661...", "turns": ["...", "..."], "duration": 60}
+    python -m benchmarks.replay --corpus calls.jsonl --rate 5 --duration 120
+
+Each session posts the voice webhook, follows the <Gather action> from
+every TwiML reply with the next recorded caller utterance, and ends with a
+completed status callback. Calls arrive as a Poisson process at --rate
+per second. Per-turn latency and error rates are reported per webhook.
+DB contention comes from the server's own /metrics db_commit histogram,
+read before and after the run.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+import requests
+
+from benchmarks import fakes
+from benchmarks.run_benchmarks import summarize, GATHER_ACTION, FAILURE_TWIML
+
+CUSTOMER_LINE = re.compile(r'^Customer: (.*)$')
+AI_LINE = re.compile(r'^AI: (.*)$')
+STAGE_METRIC = re.compile(r'^voice_turn_stage_seconds_(sum|count|bucket)\{stage="db_commit"(?:,le="([^"]+)")?\} (\S+)$')
+
+def sessions_from_transcript(rows) -> List[Dict[str, Any]]:
+    sessions = []
+    for row in rows:
+        lines = (row['transcript'] or '').splitlines()
+        turns = [m.group(1) for m in map(CUSTOMER_LINE.match, lines) if m]
+        if turns:
+            sessions.append({
+                'from': row.get('from_number') or '+966500000000',
+                'to': row['to_number'],
+                'turns': turns,
+                'replies': [m.group(1) for m in map(AI_LINE.match, lines) if m],
+                'duration': row.get('duration') or 30 * len(turns)
+            })
+    return sessions
+
+def load_from_database(url: str, business_id: Optional[int], limit: int) -> List[Dict[str, Any]]:
+    from sqlalchemy import create_engine, text
+
+    query = ("SELECT c.from_number, b.phone AS to_number, c.transcript, c.duration "
+             "FROM call_logs c JOIN businesses b ON b.id = c.business_id "
+             "WHERE c.transcript IS NOT NULL")
+    params = {'limit': limit}
+    if business_id is not None:
+        query += " AND c.business_id = :business_id"
+        params['business_id'] = business_id
+    with create_engine(url).connect() as connection:
+        rows = connection.execute(text(query + " ORDER BY c.id DESC LIMIT :limit"), params).mappings().all()
+    return sessions_from_transcript([dict(row) for row in rows])
+
+def load_from_corpus(path: str) -> List[Dict[str, Any]]:
+    sessions = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'transcript' in record:
+                sessions.extend(sessions_from_transcript([{**record, 'to_number': record['to']}]))
+            else:
+                sessions.append({
+                    'from': record.get('from', '+966500000000'),
+                    'to': record['to'],
+                    'turns': record['turns'],
+                    'replies': record.get('replies', []),
+                    'duration': record.get('duration', 30 * len(record['turns']))
+                })
+    return sessions
+
+def scrape_db_commit(session: requests.Session, base_url: str) -> Optional[Dict[str, Any]]:
+    try:
+        body = session.get(f"{base_url}/metrics", timeout=5).text
+    except requests.RequestException:
+        return None
+    stats = {'sum': 0.0, 'count': 0.0, 'buckets': {}}
+    for line in body.splitlines():
+        match = STAGE_METRIC.match(line)
+        if not match:
+            continue
+        kind, le, value = match.groups()
+        if kind == 'bucket':
+            stats['buckets'][le] = float(value)
+        else:
+            stats[kind] = float(value)
+    return stats
+
+def db_contention(before, after) -> Optional[Dict[str, Any]]:
+    """Mean and approximate p95 of db_commit during the run, from histogram deltas"""
+    if not before or not after:
+        return None
+    count = after['count'] - before['count']
+    if count <= 0:
+        return {'commits': 0}
+    p95_bound = None
+    for le, cumulative in sorted(after['buckets'].items(), key=lambda item: float(item[0])):
+        if cumulative - before['buckets'].get(le, 0) >= 0.95 * count:
+            p95_bound = le
+            break
+    return {
+        'commits': int(count),
+        'mean_ms': round((after['sum'] - before['sum']) / count * 1000, 2),
+        'p95_upper_bound_s': p95_bound
+    }
+
+class Replayer:
+    def __init__(self, base_url: str, prefix: str, think_time: float, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.prefix = prefix.rstrip('/')
+        self.think_time = think_time
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {'voice': [], 'speech': [], 'status': []}
+        self.errors: Dict[str, int] = {'voice': 0, 'speech': 0, 'status': 0}
+        self.ended_early = 0
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def _post(self, kind: str, path: str, form: dict) -> str:
+        started = time.perf_counter()
+        ok, body = False, ''
+        try:
+            response = self._session().post(self.base_url + path, data=form, timeout=self.timeout)
+            body = response.text
+            ok = response.status_code == 200 and FAILURE_TWIML not in body
+        except requests.RequestException:
+            pass
+        with self.lock:
+            self.latencies[kind].append(time.perf_counter() - started)
+            self.errors[kind] += 0 if ok else 1
+        return body
+
+    def run_call(self, script: Dict[str, Any]):
+        sid = 'CA' + uuid.uuid4().hex
+        caller, business = script['from'], script['to']
+        body = self._post('voice', f"{self.prefix}/webhook/twilio/voice",
+                          fakes.voice_call_form(sid, caller, business))
+        for speech in script['turns']:
+            match = GATHER_ACTION.search(body)
+            if not match:
+                with self.lock:
+                    self.ended_early += 1
+                break
+            if self.think_time:
+                time.sleep(random.expovariate(1 / self.think_time))
+            body = self._post('speech', match.group(1).replace('&amp;', '&'),
+                              fakes.speech_form(sid, caller, business, speech))
+        self._post('status', f"{self.prefix}/webhook/twilio/status",
+                   fakes.status_form(sid, caller, business, int(script['duration'])))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--database', help='SQLAlchemy URL of a database with call_logs')
+    source.add_argument('--corpus', help='JSONL file of scripted calls')
+    parser.add_argument('--business-id', type=int, help='only replay calls of this business (database source)')
+    parser.add_argument('--limit', type=int, default=1000, help='max transcripts to load from the database')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--prefix', default='/api', help='URL prefix of the voice blueprint')
+    parser.add_argument('--rate', type=float, default=1.0, help='call arrivals per second (Poisson)')
+    parser.add_argument('--calls', type=int, help='number of calls to start')
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds to keep starting calls when --calls is not set')
+    parser.add_argument('--max-concurrency', type=int, default=64)
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean seconds between caller turns')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    scripts = (load_from_database(args.database, args.business_id, args.limit) if args.database
+               else load_from_corpus(args.corpus))
+    if not scripts:
+        print("No sessions with customer turns found", file=sys.stderr)
+        return 1
+
+    replayer = Replayer(args.base_url, args.prefix, args.think_time, args.timeout)
+    metrics_session = requests.Session()
+    before = scrape_db_commit(metrics_session, replayer.base_url)
+
+    started = time.perf_counter()
+    launched = 0
+    with ThreadPoolExecutor(max_workers=args.max_concurrency) as pool:
+        next_arrival = time.perf_counter()
+        while (launched < args.calls) if args.calls else (time.perf_counter() - started < args.duration):
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(replayer.run_call, scripts[launched % len(scripts)])
+            launched += 1
+            next_arrival += random.expovariate(args.rate)
+    wall = time.perf_counter() - started
+
+    report = {
+        'calls': launched,
+        'offered_rate_per_s': args.rate,
+        'achieved_rate_per_s': round(launched / wall, 2),
+        'ended_early': replayer.ended_early,
+        'turns': {kind: summarize(latencies, replayer.errors[kind], wall)
+                  for kind, latencies in replayer.latencies.items()},
+        'db_commit': db_contention(before, scrape_db_commit(metrics_session, replayer.base_url))
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""End-to-end turn latency benchmarks against fake providers.
+
+    python -m benchmarks.run_benchmarks --requests 200 --concurrency 8
+    python -m benchmarks.run_benchmarks --scenarios gunicorn --save before.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/before.json
+
+Scenarios:
+  process_with_ai       src.main.process_with_ai() called directly
+  conversation_engine   ConversationEngine.process_message() called directly
+  sms_webhook           POST /twilio/sms through the Flask test client, reply inline in TwiML
+  sms_async             async SMS replies: webhook ack time, then delivery time to a local
+                        fake Twilio REST server (SMS_REPLY_MODE=async)
+  voice_flow            voice webhook -> speech turns -> status callback, test client
+  gunicorn              SMS and voice flow over HTTP against 2 real gunicorn workers
+
+Results are written as JSON; --compare exits non-zero when any scenario's
+p95 regresses by more than --max-regression.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Any
+
+from benchmarks import fakes
+from benchmarks.harness import BUSINESS_PHONE, build_app, fakes_from_env
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+ALL_SCENARIOS = ('process_with_ai', 'conversation_engine', 'sms_webhook', 'sms_async', 'voice_flow', 'gunicorn')
+MESSAGES = [
+    "Are you open tomorrow?",
+    "هل أنتم مفتوحين غداً؟",
+    "How much is a consultation?",
+    "كم سعر الأشعة؟",
+    "I want to book an appointment for Sunday",
+    "أريد حجز موعد",
+    "What services do you offer?",
+]
+CALLER = '+966500000001'
+GATHER_ACTION = re.compile(r'<Gather[^>]*action="([^"]+)"')
+FAILURE_TWIML = 'technical difficulties'
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def summarize(latencies: List[float], errors: int, wall_seconds: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'errors': errors,
+        'error_rate': round(errors / len(ordered), 4) if ordered else 0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0,
+        'throughput_per_s': round(len(ordered) / wall_seconds, 2) if wall_seconds else 0
+    }
+
+def run_concurrently(job: Callable[[int], List[tuple]], total: int, concurrency: int) -> Dict[str, Any]:
+    """Run job(i) for i in range(total); each job returns (latency, ok) pairs for its turns"""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def worker(i):
+        nonlocal errors
+        for latency, ok in job(i):
+            with lock:
+                latencies.append(latency)
+                errors += 0 if ok else 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(total)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+def timed(fn: Callable[[], bool]) -> tuple:
+    started = time.perf_counter()
+    try:
+        ok = fn()
+    except Exception:
+        ok = False
+    return time.perf_counter() - started, ok
+
+# Scenarios
+
+def bench_process_with_ai(app, total, concurrency):
+    import src.main as main
+    from src.services.tenant_registry import tenants
+    with app.app_context():
+        business = tenants.get_by_phone(BUSINESS_PHONE)
+
+    def job(i):
+        with app.app_context():
+            return [timed(lambda: main.process_with_ai(MESSAGES[i % len(MESSAGES)], business)['powered_by'] != 'Smart Fallback')]
+    return run_concurrently(job, total, concurrency)
+
+def bench_conversation_engine(app, total, concurrency):
+    from src.routes.voice_routes import get_conversation_engine
+    conversation_engine = get_conversation_engine()
+    config = {"name": "Benchmark Clinic", "phone": BUSINESS_PHONE, "ai_config": {}}
+
+    def job(i):
+        return [timed(lambda: conversation_engine.process_message(
+            business_id=f"bench-{i}", message=MESSAGES[i % len(MESSAGES)], business_config=config
+        )['intent']['type'] != 'error')]
+    return run_concurrently(job, total, concurrency)
+
+def bench_sms_webhook(app, total, concurrency):
+    import src.main as main
+
+    def job(i):
+        client = app.test_client()
+        form = fakes.sms_form(fakes.message_sid(i), CALLER, BUSINESS_PHONE, MESSAGES[i % len(MESSAGES)])
+        return [timed(lambda: client.post('/twilio/sms', data=form).status_code == 200)]
+    previous, main.SMS_REPLY_MODE = main.SMS_REPLY_MODE, 'sync'
+    try:
+        return run_concurrently(job, total, concurrency)
+    finally:
+        main.SMS_REPLY_MODE = previous
+
+def bench_sms_async(app, total, concurrency):
+    import src.main as main
+    from src.services.sms_outbox import sms_outbox
+
+    server = fakes.FakeTwilioServer(
+        latency=float(os.environ.get('BENCH_TWILIO_LATENCY', '0.15')),
+        error_rate=float(os.environ.get('BENCH_TWILIO_ERROR_RATE', '0'))
+    ).start()
+    previous = main.twilio_client, main.SMS_REPLY_MODE, sms_outbox.client
+    main.twilio_client = fakes.rest_twilio_client(server.url)
+    main.SMS_REPLY_MODE = 'async'
+    sms_outbox.start(main.twilio_client)
+    posted_at = {}
+    try:
+        def job(i):
+            client = app.test_client()
+            caller = f"+9665{i:08d}"
+            form = fakes.sms_form(fakes.message_sid(2 * 10 ** 6 + i), caller, BUSINESS_PHONE, MESSAGES[i % len(MESSAGES)])
+            posted_at[caller] = time.perf_counter()
+            return [timed(lambda: client.post('/twilio/sms', data=form).status_code == 200)]
+        ack = run_concurrently(job, total, concurrency)
+        started = time.perf_counter()
+        drained = sms_outbox.drain(timeout=120)
+        delivered = [sent['received_at'] - posted_at[sent['to']] for sent in server.sent if sent['to'] in posted_at]
+        delivery = summarize(delivered, total - len(delivered), time.perf_counter() - started)
+        return {'ack': ack, 'delivery': delivery, 'drained': drained}
+    finally:
+        main.twilio_client, main.SMS_REPLY_MODE, sms_outbox.client = previous
+        server.stop()
+
+def voice_call(post: Callable[[str, dict], tuple], n: int, turns: int = 2) -> List[tuple]:
+    """One scripted call. post(path, form) returns (status_code, body)."""
+    sid = fakes.call_sid(n)
+    results = []
+    response = {}
+
+    def step(path, form):
+        status, body = post(path, form)
+        response['body'] = body
+        return status == 200 and FAILURE_TWIML not in body
+
+    results.append(timed(lambda: step('/api/webhook/twilio/voice', fakes.voice_call_form(sid, CALLER, BUSINESS_PHONE))))
+    for turn in range(turns):
+        match = GATHER_ACTION.search(response.get('body', ''))
+        if not match:
+            break
+        speech = MESSAGES[(n + turn) % len(MESSAGES)]
+        results.append(timed(lambda: step(match.group(1).replace('&amp;', '&'),
+                                          fakes.speech_form(sid, CALLER, BUSINESS_PHONE, speech))))
+    results.append(timed(lambda: post('/api/webhook/twilio/status',
+                                      fakes.status_form(sid, CALLER, BUSINESS_PHONE, 45))[0] == 200))
+    return results
+
+def bench_voice_flow(app, total, concurrency):
+    def job(i):
+        client = app.test_client()
+
+        def post(path, form):
+            response = client.post(path, data=form)
+            return response.status_code, response.get_data(as_text=True)
+        return voice_call(post, i)
+    return run_concurrently(job, total, concurrency)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def bench_gunicorn(app, total, concurrency):
+    import requests
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, BENCH_DATABASE_URI=app.config['SQLALCHEMY_DATABASE_URI'])
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', '2', '--threads', str(max(concurrency // 2, 1)),
+         '--bind', f'127.0.0.1:{port}', 'benchmarks.harness:create_gunicorn_app()'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        session = requests.Session()
+        deadline = time.time() + 60
+        while True:
+            try:
+                if session.get(f"{base_url}/health/live", timeout=1).status_code == 200:
+                    break
+            except requests.RequestException:
+                pass
+            if time.time() > deadline:
+                raise RuntimeError("gunicorn did not start within 60s")
+            time.sleep(0.2)
+
+        def post(path, form):
+            response = session.post(base_url + path, data=form, timeout=30)
+            return response.status_code, response.text
+
+        sms = run_concurrently(lambda i: [timed(lambda: post(
+            '/twilio/sms', fakes.sms_form(fakes.message_sid(10 ** 6 + i), CALLER, BUSINESS_PHONE,
+                                         MESSAGES[i % len(MESSAGES)]))[0] == 200)], total, concurrency)
+        voice = run_concurrently(lambda i: voice_call(post, 10 ** 6 + i), total, concurrency)
+        return {'sms_webhook': sms, 'voice_flow': voice}
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+SCENARIOS = {
+    'process_with_ai': bench_process_with_ai,
+    'conversation_engine': bench_conversation_engine,
+    'sms_webhook': bench_sms_webhook,
+    'sms_async': bench_sms_async,
+    'voice_flow': bench_voice_flow,
+    'gunicorn': bench_gunicorn,
+}
+
+def compare(results: Dict[str, Any], baseline_path: str, max_regression: float) -> List[str]:
+    """Names of scenarios whose p95 got worse than the baseline by more than max_regression"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['scenarios']
+
+    def flatten(scenarios, prefix=''):
+        for name, stats in scenarios.items():
+            if 'p95_ms' in stats:
+                yield prefix + name, stats
+            else:
+                yield from flatten(stats, f"{prefix}{name}.")
+
+    old = dict(flatten(baseline))
+    regressions = []
+    for name, stats in flatten(results['scenarios']):
+        if name in old and old[name]['p95_ms'] and stats['p95_ms'] > old[name]['p95_ms'] * (1 + max_regression):
+            regressions.append(f"{name}: p95 {old[name]['p95_ms']}ms -> {stats['p95_ms']}ms")
+    return regressions
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return 'unknown'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=ALL_SCENARIOS, default=list(ALL_SCENARIOS))
+    parser.add_argument('--requests', type=int, default=100, help='calls/messages per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--save', help='results file name (default: timestamped, in benchmarks/results)')
+    parser.add_argument('--compare', help='baseline results file to check for regressions')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='allowed p95 slowdown, 0.2 = 20%%')
+    args = parser.parse_args(argv)
+
+    fd, path = tempfile.mkstemp(prefix='voice-bench-', suffix='.db')
+    os.close(fd)
+    llm, tts, twilio = fakes_from_env()
+    app = build_app(llm, tts, twilio, f"sqlite:///{path}")
+
+    results = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'settings': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'fakes': {key: value for key, value in os.environ.items() if key.startswith('BENCH_')}
+        },
+        'scenarios': {}
+    }
+    for name in args.scenarios:
+        print(f"Running {name}...", flush=True)
+        results['scenarios'][name] = SCENARIOS[name](app, args.requests, args.concurrency)
+        print(json.dumps(results['scenarios'][name], indent=2), flush=True)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, args.save or f"{datetime.utcnow():%Y%m%dT%H%M%S}-{results['revision']}.json")
+    with open(out_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {out_path}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
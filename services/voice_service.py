@@ -1,13 +1,36 @@
 import os
 import json
 import logging
-from typing import Dict, Any, Optional
-from openai import OpenAI
+from typing import Dict, Any, Iterator, Optional, Tuple
 from elevenlabs import ElevenLabs
 import asyncio
+import time
+from src.services import metrics, fast_path, model_routing, phrase_audio, audio_transcode, business_index
+from src.services.http_pool import http_pools
+from src.services.provider_registry import providers, ProviderUnavailable, parse_ai_config
+from src.services.admission import Overloaded
+from src.services.call_sessions import CallSession
+from src.services.intent_classifier import intents
 
 logger = logging.getLogger(__name__)
 
+# Classifier label -> (intent type reported for the call, whether staff must act on it)
+ANALYZED_INTENTS = {
+    "booking": ("booking", True),
+    "pricing": ("pricing_inquiry", False),
+    "hours": ("hours_inquiry", False),
+    "services": ("service_inquiry", False),
+    "greeting": ("greeting", False),
+    "general": ("general_inquiry", False),
+}
+
+# Conversation outcome for each intent type, ranked so the strongest outcome wins
+OUTCOME_BY_INTENT = {
+    "booking": ("appointment_requested", 3),
+    "pricing_inquiry": ("pricing_provided", 2),
+    "service_inquiry": ("service_info_provided", 1),
+}
+
 class VoiceProcessor:
     """Simplified voice processing for Heroku deployment"""
     
@@ -17,7 +40,8 @@ class VoiceProcessor:
         
         if self.elevenlabs_key and self.elevenlabs_key != "demo_key_placeholder":
             try:
-                self.client = ElevenLabs(api_key=self.elevenlabs_key)
+                self.client = ElevenLabs(api_key=self.elevenlabs_key,
+                                         httpx_client=http_pools.httpx_client('elevenlabs'))
                 logger.info("ElevenLabs client initialized successfully")
             except Exception as e:
                 logger.warning(f"ElevenLabs initialization failed: {str(e)}")
@@ -25,26 +49,70 @@ class VoiceProcessor:
         else:
             logger.warning("ElevenLabs API key not configured - using mock responses")
     
-    def synthesize_speech(self, text: str, voice_id: str = "pNInz6obpgDQGcFmaJgB") -> Optional[bytes]:
-        """Convert text to speech using ElevenLabs"""
+    def synthesize_speech(self, text: str, voice_id: str = "pNInz6obpgDQGcFmaJgB",
+                          output_format: Optional[str] = None) -> Optional[bytes]:
+        """Convert text to speech using ElevenLabs; `output_format` e.g. 'ulaw_8000' (default MP3)"""
         try:
             if not self.client:
                 logger.warning("ElevenLabs not configured - returning None for speech synthesis")
                 return None
             
             # Generate speech
-            audio = self.client.generate(
-                text=text,
-                voice=voice_id,
-                model="eleven_multilingual_v2"
-            )
-            
-            return b''.join(audio)
+            options = {"output_format": output_format} if output_format else {}
+            with metrics.stage_timer('tts'):
+                audio = self.client.text_to_speech.convert(
+                    voice_id=voice_id,
+                    text=text,
+                    model_id="eleven_multilingual_v2",
+                    **options
+                )
+                return b''.join(audio)
             
         except Exception as e:
             logger.error(f"Speech synthesis error: {str(e)}")
             return None
     
+    def synthesize_telephony(self, text: str, voice_id: str = "pNInz6obpgDQGcFmaJgB") -> Optional[bytes]:
+        """8 kHz 16-bit mono WAV for a phone leg.
+        
+        Templated replies are stitched from the voice's phrase library
+        without a TTS request; anything else is synthesized as 8 kHz mu-law.
+        """
+        pcm = phrase_audio.render(voice_id, text)
+        if pcm is None:
+            audio = self.synthesize_speech(text, voice_id, output_format=phrase_audio.ELEVENLABS_FORMAT)
+            if not audio:
+                return None
+            pcm = audio_transcode.decode_ulaw(audio)
+        return phrase_audio.to_wav(pcm)
+    
+    def telephony_frames(self, text: str, voice_id: str = "pNInz6obpgDQGcFmaJgB",
+                         output_format: str = "pcm_16000") -> Iterator[memoryview]:
+        """20 ms 8 kHz mu-law frames for a media stream, transcoded while ElevenLabs streams"""
+        pcm = phrase_audio.render(voice_id, text)
+        if pcm is not None:
+            yield from audio_transcode.transcode([pcm.astype('<i2', copy=False)], phrase_audio.SAMPLE_RATE)
+            return
+        if not self.client:
+            logger.warning("ElevenLabs not configured - no audio frames for speech synthesis")
+            return
+        try:
+            with metrics.stage_timer('tts_first_chunk'):
+                chunks = iter(self.client.text_to_speech.stream(
+                    voice_id=voice_id,
+                    text=text,
+                    model_id="eleven_multilingual_v2",
+                    output_format=output_format
+                ))
+                first = next(chunks, b'')
+            transcoder = audio_transcode.TelephonyTranscoder(audio_transcode.PCM_FORMATS[output_format])
+            yield from transcoder.feed(first)
+            for chunk in chunks:
+                yield from transcoder.feed(chunk)
+            yield from transcoder.flush()
+        except Exception as e:
+            logger.error(f"Speech streaming error: {str(e)}")
+    
     def get_available_voices(self) -> list:
         """Get available voices from ElevenLabs"""
         try:
@@ -65,30 +133,28 @@ class ConversationEngine:
     """Simplified conversation engine for Heroku deployment"""
     
     def __init__(self):
-        self.openai_key = os.getenv("OPENAI_API_KEY")
-        self.client = None
-        
-        if self.openai_key and self.openai_key != "demo_key_placeholder":
-            try:
-                self.client = OpenAI(api_key=self.openai_key)
-                logger.info("OpenAI client initialized successfully")
-            except Exception as e:
-                logger.warning(f"OpenAI initialization failed: {str(e)}")
-                self.client = None
-        else:
-            logger.warning("OpenAI API key not configured - using mock responses")
+        # LLM clients are shared process-wide through the provider registry
+        if not providers.configured():
+            logger.warning("No AI provider configured - using mock responses")
         
         self.conversation_contexts = {}
     
-    def process_message(self, business_id: str, message: str, business_config: Dict[str, Any]) -> Dict[str, Any]:
-        """Process customer message and generate response"""
+    def process_message(self, business_id: str, message: str, business_config: Dict[str, Any],
+                        session: Optional[CallSession] = None, turn: Optional[int] = None) -> Dict[str, Any]:
+        """Process customer message; `session` carries state preloaded when the call was answered.
+
+        `turn` is the call's 1-based turn number (the Gather URL's `turn`);
+        the context here is shared by every call to the business, so its
+        length says nothing about how far one call has gone.
+        """
         try:
             # Get or create conversation context
             if business_id not in self.conversation_contexts:
                 self.conversation_contexts[business_id] = {
                     "messages": [],
                     "business_config": business_config,
-                    "intent_history": []
+                    "intent_history": [],
+                    "outcome": ("general_inquiry", 0)
                 }
             
             context = self.conversation_contexts[business_id]
@@ -99,13 +165,20 @@ class ConversationEngine:
                 "content": message
             })
             
-            # Generate response
-            if not self.client:
+            # Classify once; the fast path, model routing and the reported intent all use it
+            with metrics.stage_timer('intent_detection'):
+                classified = intents.classify(message)
+                intent = self._analyze_intent(message, classified)
+            
+            # Generate response: rule-based fast path first, then the LLM
+            fast = fast_path.answer_for_business(message, business_config.get("id"), classified)
+            if fast:
+                ai_response = fast["response"]
+            elif not providers.configured():
                 # Use mock response for testing
                 ai_response = self._generate_mock_response(message, business_config)
             else:
-                # Use OpenAI for real conversation
-                ai_response = self._generate_ai_response(context, business_config)
+                ai_response = self._generate_ai_response(context, business_config, session, turn, intent)
             
             # Add AI response to context
             context["messages"].append({
@@ -113,9 +186,12 @@ class ConversationEngine:
                 "content": ai_response
             })
             
-            # Analyze intent
-            intent = self._analyze_intent(message, ai_response)
+            metrics.INTENTS.inc(intent["type"])
+            metrics.BUSINESS_TURNS.inc(business_id, 'voice')
             context["intent_history"].append(intent)
+            outcome = OUTCOME_BY_INTENT.get(intent["type"])
+            if outcome and outcome[1] > context["outcome"][1]:
+                context["outcome"] = outcome
             
             return {
                 "response": ai_response,
@@ -123,6 +199,8 @@ class ConversationEngine:
                 "requires_action": intent.get("action_required", False)
             }
             
+        except Overloaded:
+            raise
         except Exception as e:
             logger.error(f"Error processing message: {str(e)}")
             return {
@@ -131,12 +209,14 @@ class ConversationEngine:
                 "requires_action": True
             }
     
-    def _generate_ai_response(self, context: Dict[str, Any], business_config: Dict[str, Any]) -> str:
-        """Generate AI response using OpenAI"""
-        try:
-            business_name = business_config.get("name", "Business")
-            
-            system_prompt = f"""You are a helpful AI assistant for {business_name}, a business in Saudi Arabia. 
+    def build_system_prompt(self, business_config: Dict[str, Any], caller: Optional[Dict[str, Any]] = None,
+                            message: str = '') -> str:
+        """System prompt for a business; `caller` adds a returning customer, `message` the details relevant to it"""
+        business_name = business_config.get("name", "Business")
+        facts = fast_path.facts_for(business_config["id"]) if business_config.get("id") else None
+        business_facts = fast_path.describe(facts) or "- Ask the customer to call for current prices and hours"
+        
+        system_prompt = f"""You are a helpful AI assistant for {business_name}, a business in Saudi Arabia. 
             You can communicate in both Arabic and English. Your role is to:
             
             1. Answer questions about services, pricing, and business hours
@@ -146,33 +226,63 @@ class ConversationEngine:
             
             Business Information:
             - Name: {business_name}
-            - Services: General consultation, treatments, and specialized care
-            - Hours: Sunday-Thursday 9AM-5PM, Friday 2PM-6PM, Saturday 9AM-1PM
-            - Pricing: Consultation 150 SAR, Basic treatment 200 SAR, Specialized care 300 SAR
+            {business_facts}
             
             Always be helpful and try to assist the customer with their needs."""
-            
-            messages = [
-                {"role": "system", "content": system_prompt}
-            ] + context["messages"]
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                max_tokens=300,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            logger.error(f"OpenAI API error: {str(e)}")
+        if caller:
+            system_prompt += f"\n\nCaller: {caller.get('name') or 'returning customer'}"
+            if caller.get("preferred_language"):
+                system_prompt += f" (prefers {caller['preferred_language']})"
+            for appointment in caller.get("appointments", []):
+                system_prompt += (f"\n- {appointment['status']} appointment on {appointment['date']}"
+                                  f" for {appointment['service'] or 'a service'}")
+        if message:
+            system_prompt += self._relevant_details(business_config, message)
+        return system_prompt
+    
+    def _relevant_details(self, business_config: Dict[str, Any], message: str) -> str:
+        """Retrieved business details for this message; the preloaded prompt is built without a message"""
+        details = business_index.relevant_context(business_config.get("id"), message)
+        return f"\n\nRelevant details:\n{details}" if details else ""
+    
+    def _generate_ai_response(self, context: Dict[str, Any], business_config: Dict[str, Any],
+                              session: Optional[CallSession] = None, turn: Optional[int] = None,
+                              intent: Optional[Dict[str, Any]] = None) -> str:
+        """Generate AI response with the tenant's provider, failing over to the mock responder.
+
+        `intent` is the turn's already analyzed intent; it is only classified here when not given.
+        """
+        prompt_started = time.perf_counter()
+        message = context["messages"][-1]["content"]
+        if session and session.prompt_prefix:
+            system_prompt = session.prompt_prefix + self._relevant_details(business_config, message)
+        else:
+            system_prompt = self.build_system_prompt(business_config, message=message)
+        
+        messages = [
+            {"role": "system", "content": system_prompt}
+        ] + context["messages"]
+        metrics.observe_stage('prompt_build', time.perf_counter() - prompt_started)
+        
+        # Model tier from the customer's intent and how many turns of this call came before
+        ai_config = parse_ai_config(business_config.get("ai_config"))
+        earlier_turns = turn - 1 if turn else len(context["messages"]) // 2
+        selected = model_routing.route((intent or self._analyze_intent(message))["type"], message,
+                                       turn=earlier_turns, ai_config=ai_config,
+                                       default_provider=providers.default_provider)
+        
+        try:
+            return providers.chat(messages, ai_config=model_routing.routed_config(ai_config, selected),
+                                  business_id=business_config.get("id"))["text"]
+        except ProviderUnavailable as e:
+            logger.error(f"AI provider error: {str(e)}")
             return self._generate_mock_response(context["messages"][-1]["content"], business_config)
     
     def _generate_mock_response(self, message: str, business_config: Dict[str, Any]) -> str:
         """Generate mock response for testing without OpenAI"""
         business_name = business_config.get("name", "Business")
         message_lower = message.lower()
+        facts = fast_path.facts_for(business_config["id"]) if business_config.get("id") else None
         
         # Arabic greeting detection
         if any(word in message_lower for word in ["مرحبا", "السلام", "أهلا", "صباح", "مساء"]):
@@ -184,19 +294,22 @@ class ConversationEngine:
         
         # Service inquiry
         elif any(word in message_lower for word in ["service", "services", "خدمة", "خدمات", "what do you offer"]):
-            return f"We offer several services at {business_name}:\n- General consultation (150 SAR)\n- Basic treatment (200 SAR)\n- Specialized care (300 SAR)\n\nWould you like to know more about any specific service or book an appointment?"
+            return (fast_path.answer_intent("services", message, facts)
+                    or f"We offer several services at {business_name}. Which service are you interested in, or would you like to book an appointment?")
         
         # Pricing inquiry
         elif any(word in message_lower for word in ["price", "cost", "how much", "سعر", "كم", "تكلفة", "pricing"]):
-            return "Our current pricing is:\n- Consultation: 150 SAR\n- Basic treatment: 200 SAR\n- Specialized care: 300 SAR\n\nWould you like to book an appointment?"
+            return (fast_path.answer_intent("pricing", message, facts)
+                    or "Prices depend on the service. Which service would you like a price for?")
         
         # Booking inquiry
         elif any(word in message_lower for word in ["book", "appointment", "schedule", "حجز", "موعد", "reserve"]):
-            return "I'd be happy to help you book an appointment! What service would you like to schedule, and what date and time work best for you? We're available:\n- Sunday-Thursday: 9 AM to 5 PM\n- Friday: 2 PM to 6 PM\n- Saturday: 9 AM to 1 PM"
+            return "I'd be happy to help you book an appointment! What service would you like to schedule, and what date and time work best for you?"
         
         # Hours inquiry
         elif any(word in message_lower for word in ["hours", "open", "close", "time", "ساعات", "مفتوح", "وقت", "when"]):
-            return f"Our business hours are:\n- Sunday to Thursday: 9 AM to 5 PM\n- Friday: 2 PM to 6 PM\n- Saturday: 9 AM to 1 PM\n\nWhen would you like to visit {business_name}?"
+            return (fast_path.answer_intent("hours", message, facts)
+                    or f"Please contact {business_name} directly for today's opening hours. Would you like to book an appointment?")
         
         # Location inquiry
         elif any(word in message_lower for word in ["where", "location", "address", "أين", "موقع", "عنوان"]):
@@ -206,64 +319,20 @@ class ConversationEngine:
         else:
             return f"Thank you for contacting {business_name}. I'm here to help with:\n- Information about our services and pricing\n- Booking appointments\n- Business hours and location\n- Any other questions you may have\n\nHow can I assist you today?"
     
-    def _analyze_intent(self, customer_message: str, ai_response: str) -> Dict[str, Any]:
-        """Analyze customer intent from the conversation"""
-        message_lower = customer_message.lower()
-        
-        # Booking intent
-        if any(word in message_lower for word in ["book", "appointment", "schedule", "حجز", "موعد", "reserve"]):
-            return {
-                "type": "booking",
-                "confidence": 0.9,
-                "action_required": True,
-                "extracted_info": {
-                    "service_requested": "general",
-                    "urgency": "normal"
-                }
-            }
-        
-        # Pricing intent
-        elif any(word in message_lower for word in ["price", "cost", "how much", "سعر", "كم", "تكلفة"]):
-            return {
-                "type": "pricing_inquiry",
-                "confidence": 0.8,
-                "action_required": False,
-                "extracted_info": {
-                    "service_interest": "general"
-                }
-            }
-        
-        # Hours intent
-        elif any(word in message_lower for word in ["hours", "open", "close", "time", "ساعات", "مفتوح", "وقت"]):
-            return {
-                "type": "hours_inquiry",
-                "confidence": 0.8,
-                "action_required": False
-            }
-        
-        # Service inquiry
-        elif any(word in message_lower for word in ["service", "services", "خدمة", "خدمات", "what do you offer"]):
-            return {
-                "type": "service_inquiry",
-                "confidence": 0.7,
-                "action_required": False
-            }
-        
-        # Greeting
-        elif any(word in message_lower for word in ["hello", "hi", "مرحبا", "السلام", "أهلا"]):
-            return {
-                "type": "greeting",
-                "confidence": 0.9,
-                "action_required": False
-            }
-        
-        # Default
-        else:
-            return {
-                "type": "general_inquiry",
-                "confidence": 0.5,
-                "action_required": False
-            }
+    def _analyze_intent(self, customer_message: str, classified: Optional[Tuple[str, float]] = None) -> Dict[str, Any]:
+        """Analyze customer intent; `classified` is intents.classify(customer_message) when already computed"""
+        label, confidence = classified or intents.classify(customer_message)
+        intent_type, action_required = ANALYZED_INTENTS.get(label, ("general_inquiry", False))
+        intent = {
+            "type": intent_type,
+            "confidence": round(confidence, 3),
+            "action_required": action_required
+        }
+        if intent_type == "booking":
+            intent["extracted_info"] = {"service_requested": "general", "urgency": "normal"}
+        elif intent_type == "pricing_inquiry":
+            intent["extracted_info"] = {"service_interest": "general"}
+        return intent
     
     def get_conversation_summary(self, business_id: str) -> Dict[str, Any]:
         """Get conversation summary"""
@@ -273,15 +342,8 @@ class ConversationEngine:
         context = self.conversation_contexts[business_id]
         intents = context.get("intent_history", [])
         
-        # Determine primary intent and outcome
-        if any(intent["type"] == "booking" for intent in intents):
-            outcome = "appointment_requested"
-        elif any(intent["type"] == "pricing_inquiry" for intent in intents):
-            outcome = "pricing_provided"
-        elif any(intent["type"] == "service_inquiry" for intent in intents):
-            outcome = "service_info_provided"
-        else:
-            outcome = "general_inquiry"
+        # Outcome is maintained incrementally by process_message()
+        outcome, _ = context.get("outcome", ("general_inquiry", 0))
         
         return {
             "summary": f"Customer conversation with {len(context['messages'])} messages",
@@ -0,0 +1,78 @@
+from datetime import datetime
+from src.models.voice_models import db
+
+class CallRollup(db.Model):
+    """Per-business call counters for one hour or day bucket"""
+    __tablename__ = 'call_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('business_id', 'granularity', 'bucket_start', name='uq_call_rollup_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False, index=True)
+    granularity = db.Column(db.String(10), nullable=False)  # 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    calls = db.Column(db.Integer, nullable=False, default=0)
+    completed_calls = db.Column(db.Integer, nullable=False, default=0)
+    failed_calls = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)
+    booking_requests = db.Column(db.Integer, nullable=False, default=0)
+    booking_conversions = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'bucket_start': self.bucket_start.isoformat(),
+            'calls': self.calls,
+            'completed_calls': self.completed_calls,
+            'failed_calls': self.failed_calls,
+            'total_duration': self.total_duration,
+            'average_duration': round(self.total_duration / self.calls, 1) if self.calls else 0,
+            'booking_requests': self.booking_requests,
+            'booking_conversions': self.booking_conversions
+        }
+
+class CallDimensionRollup(db.Model):
+    """Per-business call counts broken down by intent or outcome"""
+    __tablename__ = 'call_dimension_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('business_id', 'granularity', 'bucket_start', 'dimension', 'value',
+                            name='uq_call_dimension_rollup_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False, index=True)
+    granularity = db.Column(db.String(10), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    dimension = db.Column(db.String(20), nullable=False)  # 'intent' or 'outcome'
+    value = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class LlmUsageRollup(db.Model):
+    """Per-business LLM requests, tokens and estimated cost for one hour, by provider and model"""
+    __tablename__ = 'llm_usage_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('business_id', 'bucket_start', 'provider', 'model', name='uq_llm_usage_rollup_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False, index=True)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    provider = db.Column(db.String(20), nullable=False)
+    model = db.Column(db.String(100), nullable=False)
+    requests = db.Column(db.Integer, nullable=False, default=0)
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+    cost_usd = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'bucket_start': self.bucket_start.isoformat(),
+            'provider': self.provider,
+            'model': self.model,
+            'requests': self.requests,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cost_usd': round(self.cost_usd, 6)
+        }
@@ -0,0 +1,94 @@
+from datetime import datetime
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+
+class Business(db.Model):
+    """A tenant: one phone number, its hours and its AI configuration"""
+    __tablename__ = 'businesses'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    phone = db.Column(db.String(20), unique=True)
+    email = db.Column(db.String(100))
+    description = db.Column(db.Text)
+    business_hours = db.Column(db.Text)  # JSON
+    ai_config = db.Column(db.Text)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    services = db.relationship('Service', backref='business', lazy=True)
+
+    def __repr__(self):
+        return f'<Business {self.name}>'
+
+class Customer(db.Model):
+    __tablename__ = 'customers'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100))
+    phone = db.Column(db.String(20), index=True)
+    email = db.Column(db.String(100))
+    preferred_language = db.Column(db.String(10))
+    preferences = db.Column(db.Text)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Customer {self.phone}>'
+
+class Service(db.Model):
+    __tablename__ = 'services'
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text)
+    price = db.Column(db.Float)
+    duration_minutes = db.Column(db.Integer)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Service {self.name}>'
+
+class CallLog(db.Model):
+    __tablename__ = 'call_logs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'))
+    call_sid = db.Column(db.String(100), unique=True)
+    from_number = db.Column(db.String(20))
+    to_number = db.Column(db.String(20))
+    direction = db.Column(db.String(10))  # 'inbound' or 'outbound'
+    status = db.Column(db.String(20))
+    duration = db.Column(db.Integer)  # seconds
+    transcript = db.Column(db.Text)
+    intent_detected = db.Column(db.String(50))
+    outcome = db.Column(db.String(50))
+    booking_requested = db.Column(db.Boolean, default=False)  # latched once any turn asks to book
+    started_at = db.Column(db.DateTime)
+    ended_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CallLog {self.call_sid}>'
+
+class Appointment(db.Model):
+    __tablename__ = 'appointments'
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('businesses.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id'))
+    appointment_date = db.Column(db.DateTime, nullable=False)
+    duration_minutes = db.Column(db.Integer)
+    status = db.Column(db.String(20), default='scheduled')
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Appointment {self.appointment_date}>'
@@ -1,21 +1,32 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db, User
+from src.services import pagination
 import os
 
 business_bp = Blueprint('business', __name__)
 
+BUSINESS_FIELDS = ('id', 'name', 'email')
+
+def _business(user):
+    return {'id': user.id, 'name': user.username, 'email': user.email}
+
 @business_bp.route('/businesses', methods=['GET'])
 def get_businesses():
     try:
-        users = User.query.all()
-        return jsonify({
-            'success': True,
-            'businesses': [{
-                'id': u.id,
-                'name': u.username,
-                'email': u.email
-            } for u in users]
-        })
+        fields = pagination.parse_fields(BUSINESS_FIELDS)
+        after_id = pagination.decode_id_cursor(request.args.get('cursor'))
+        limit = pagination.parse_limit()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        users, next_cursor = pagination.split_page(
+            pagination.keyset(User.query, User.id, after_id, limit), limit, lambda u: u.id)
+        return pagination.stream_page(
+            'businesses',
+            ({field: value for field, value in _business(u).items() if field in fields} for u in users),
+            next_cursor,
+            limit
+        )
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -38,11 +49,7 @@ def create_business():
         return jsonify({
             'success': True,
             'message': 'Business created successfully',
-            'business': {
-                'id': user.id,
-                'name': user.username,
-                'email': user.email
-            }
+            'business': _business(user)
         })
         
     except Exception as e:
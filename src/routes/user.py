@@ -1,12 +1,28 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.services import pagination
 
 user_bp = Blueprint('user', __name__)
 
+USER_FIELDS = ('id', 'username', 'email')
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """One page of users in id order: ?limit=, ?cursor= (next_cursor of the previous page), ?fields=id,username"""
+    try:
+        fields = pagination.parse_fields(USER_FIELDS)
+        after_id = pagination.decode_id_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    limit = pagination.parse_limit()
+    users, next_cursor = pagination.split_page(
+        pagination.keyset(User.query, User.id, after_id, limit), limit, lambda u: u.id)
+    return pagination.stream_page(
+        'users',
+        ({field: value for field, value in user.to_dict().items() if field in fields} for user in users),
+        next_cursor,
+        limit
+    )
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -1,16 +1,44 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for, current_app
 from src.models.voice_models import db, Business, Service, Customer, Appointment, CallLog
-from src.services.voice_service import ConversationEngine, VoiceProcessor
+from services.voice_service import ConversationEngine, VoiceProcessor
+from src.services import call_analytics, transcript_search, metrics, pagination
+from src.services.tracing import tracer
+from src.services.tenant_registry import tenants
+from src.services.idempotency import webhook_results
+from src.services.admission import Overloaded, overloaded_response
+from src.services.tenant_limits import tenant_limiter
+from src.services.call_sessions import call_sessions
+from sqlalchemy.orm import load_only
 import logging
 from datetime import datetime, timedelta
 import json
+import threading
+import time
+from xml.sax.saxutils import escape as xml_escape
 
 voice_bp = Blueprint('voice', __name__)
 logger = logging.getLogger(__name__)
 
-# Initialize services
-conversation_engine = ConversationEngine()
-voice_processor = VoiceProcessor()
+# Built on first use rather than at import, and shared by every request in the process
+_conversation_engine = None
+_voice_processor = None
+_services_lock = threading.Lock()
+
+def get_conversation_engine() -> ConversationEngine:
+    global _conversation_engine
+    if _conversation_engine is None:
+        with _services_lock:
+            if _conversation_engine is None:
+                _conversation_engine = ConversationEngine()
+    return _conversation_engine
+
+def get_voice_processor() -> VoiceProcessor:
+    global _voice_processor
+    if _voice_processor is None:
+        with _services_lock:
+            if _voice_processor is None:
+                _voice_processor = VoiceProcessor()
+    return _voice_processor
 
 @voice_bp.route('/voice/test', methods=['POST'])
 def test_voice_processing():
@@ -24,18 +52,12 @@ def test_voice_processing():
             return jsonify({"error": "business_id and message are required"}), 400
         
         # Get business configuration
-        business = Business.query.get(business_id)
-        if not business:
+        business_config = tenants.get(int(business_id))
+        if not business_config:
             return jsonify({"error": "Business not found"}), 404
         
-        business_config = {
-            "name": business.name,
-            "phone": business.phone,
-            "ai_config": json.loads(business.ai_config) if business.ai_config else {}
-        }
-        
         # Process the message
-        result = conversation_engine.process_message(
+        result = get_conversation_engine().process_message(
             business_id=str(business_id),
             message=message,
             business_config=business_config
@@ -43,13 +65,15 @@ def test_voice_processing():
         
         return jsonify({
             "success": True,
-            "business_name": business.name,
+            "business_name": business_config["name"],
             "customer_message": message,
             "ai_response": result["response"],
             "intent": result["intent"],
             "requires_action": result["requires_action"]
         })
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Error in voice test: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -65,8 +89,11 @@ def synthesize_speech():
         if not text:
             return jsonify({"error": "text is required"}), 400
         
-        # Generate speech
-        audio_data = voice_processor.synthesize_speech(text, voice_id)
+        # Generate speech; telephony audio comes from the phrase library when it can
+        if data.get('telephony'):
+            audio_data = get_voice_processor().synthesize_telephony(text, voice_id)
+        else:
+            audio_data = get_voice_processor().synthesize_speech(text, voice_id)
         
         if audio_data:
             # In a real implementation, you'd return the audio file
@@ -93,7 +120,7 @@ def synthesize_speech():
 def get_available_voices():
     """Get available voices for speech synthesis"""
     try:
-        voices = voice_processor.get_available_voices()
+        voices = get_voice_processor().get_available_voices()
         return jsonify({
             "success": True,
             "voices": voices,
@@ -108,7 +135,7 @@ def get_available_voices():
 def get_conversation_summary(business_id):
     """Get conversation summary for a business"""
     try:
-        summary = conversation_engine.get_conversation_summary(business_id)
+        summary = get_conversation_engine().get_conversation_summary(business_id)
         return jsonify({
             "success": True,
             "business_id": business_id,
@@ -123,8 +150,8 @@ def get_conversation_summary(business_id):
 def clear_conversation(business_id):
     """Clear conversation context for a business"""
     try:
-        if business_id in conversation_engine.conversation_contexts:
-            del conversation_engine.conversation_contexts[business_id]
+        if business_id in get_conversation_engine().conversation_contexts:
+            del get_conversation_engine().conversation_contexts[business_id]
         
         return jsonify({
             "success": True,
@@ -135,62 +162,149 @@ def clear_conversation(business_id):
         logger.error(f"Error clearing conversation: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-# Twilio webhook endpoints (simplified for Heroku)
-@voice_bp.route('/webhook/twilio/voice', methods=['POST'])
-def twilio_voice_webhook():
-    """Handle incoming Twilio voice calls"""
+@voice_bp.route('/voice/analytics/<int:business_id>', methods=['GET'])
+def get_call_analytics(business_id):
+    """Get call metrics for a business from the precomputed rollups"""
     try:
-        # Get call information from Twilio
-        from_number = request.form.get('From', '')
-        to_number = request.form.get('To', '')
-        call_sid = request.form.get('CallSid', '')
-        
-        logger.info(f"Incoming call: {from_number} -> {to_number} (SID: {call_sid})")
+        granularity = request.args.get('granularity', 'day')
+        start = request.args.get('start')
+        end = request.args.get('end')
+        
+        metrics = call_analytics.get_business_metrics(
+            business_id,
+            granularity=granularity,
+            start=datetime.fromisoformat(start) if start else None,
+            end=datetime.fromisoformat(end) if end else None
+        )
+        return jsonify({
+            "success": True,
+            "business_id": business_id,
+            "metrics": metrics
+        })
         
-        # Find business by phone number
-        business = Business.query.filter_by(phone=to_number).first()
-        if not business:
-            # Return TwiML for unknown number
-            return '''<?xml version="1.0" encoding="UTF-8"?>
-            <Response>
-                <Say voice="alice" language="en">Sorry, this number is not configured for AI assistance.</Say>
-                <Hangup/>
-            </Response>''', 200, {'Content-Type': 'text/xml'}
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error getting call analytics: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@voice_bp.route('/voice/usage/<int:business_id>', methods=['GET'])
+def get_llm_usage(business_id):
+    """Get LLM requests, tokens and estimated cost for a business, by hour"""
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
         
-        # Create or find customer
-        customer = Customer.query.filter_by(phone=from_number).first()
-        if not customer:
-            customer = Customer(
-                phone=from_number,
-                preferred_language='ar'  # Default to Arabic for Saudi numbers
-            )
-            db.session.add(customer)
-            db.session.commit()
+        usage = tenant_limiter.usage(
+            business_id,
+            start=datetime.fromisoformat(start) if start else None,
+            end=datetime.fromisoformat(end) if end else None
+        )
+        return jsonify({
+            "success": True,
+            "business_id": business_id,
+            "usage": usage
+        })
         
-        # Create call log
-        call_log = CallLog(
-            business_id=business.id,
-            customer_id=customer.id,
-            call_sid=call_sid,
-            from_number=from_number,
-            to_number=to_number,
-            direction='inbound',
-            status='in-progress'
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error getting LLM usage: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@voice_bp.route('/voice/transcripts/search', methods=['GET'])
+def search_transcripts():
+    """Full-text search over call transcripts"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "q is required"}), 400
+        
+        start = request.args.get('start')
+        end = request.args.get('end')
+        results = transcript_search.search(
+            query,
+            business_id=request.args.get('business_id', type=int),
+            intent=request.args.get('intent'),
+            start=datetime.fromisoformat(start) if start else None,
+            end=datetime.fromisoformat(end) if end else None,
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', 20, type=int)
         )
-        db.session.add(call_log)
-        db.session.commit()
+        return jsonify({
+            "success": True,
+            "query": query,
+            **results
+        })
         
-        # Return TwiML response
-        business_name = business.name
-        return f'''<?xml version="1.0" encoding="UTF-8"?>
-        <Response>
-            <Say voice="alice" language="ar">مرحباً بك في {business_name}. مساعدي الذكي سيساعدك الآن.</Say>
-            <Say voice="alice" language="en">Welcome to {business_name}. Our AI assistant will help you now.</Say>
-            <Gather input="speech" action="/api/voice/webhook/twilio/process/{call_log.id}" method="POST" speechTimeout="3" language="ar-SA,en-US">
-                <Say voice="alice" language="ar">كيف يمكنني مساعدتك اليوم؟</Say>
-                <Say voice="alice" language="en">How can I help you today?</Say>
-            </Gather>
-        </Response>''', 200, {'Content-Type': 'text/xml'}
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error searching transcripts: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# Response field -> CallLog column; transcript is only sent when asked for in ?fields=
+CALL_FIELDS = {
+    'id': 'id', 'business_id': 'business_id', 'customer_id': 'customer_id', 'call_sid': 'call_sid',
+    'from_number': 'from_number', 'to_number': 'to_number', 'direction': 'direction', 'status': 'status',
+    'duration': 'duration', 'intent': 'intent_detected', 'outcome': 'outcome', 'started_at': 'started_at',
+    'ended_at': 'ended_at', 'created_at': 'created_at', 'transcript': 'transcript'
+}
+DEFAULT_CALL_FIELDS = [field for field in CALL_FIELDS if field != 'transcript']
+
+@voice_bp.route('/calls', methods=['GET'])
+def list_calls():
+    """Call logs, newest first, one page at a time: ?limit=, ?cursor=, ?fields=, ?business_id=, ?status=, ?intent=, ?start=, ?end="""
+    try:
+        fields = pagination.parse_fields(list(CALL_FIELDS), DEFAULT_CALL_FIELDS)
+        before_id = pagination.decode_id_cursor(request.args.get('cursor'))
+        start = request.args.get('start')
+        end = request.args.get('end')
+        calls = CallLog.query.options(load_only(*(getattr(CallLog, CALL_FIELDS[f]) for f in fields)))
+        if start:
+            calls = calls.filter(CallLog.created_at >= datetime.fromisoformat(start))
+        if end:
+            calls = calls.filter(CallLog.created_at < datetime.fromisoformat(end))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    business_id = request.args.get('business_id', type=int)
+    if business_id is not None:
+        calls = calls.filter(CallLog.business_id == business_id)
+    if request.args.get('status'):
+        calls = calls.filter(CallLog.status == request.args['status'])
+    if request.args.get('intent'):
+        calls = calls.filter(CallLog.intent_detected == request.args['intent'])
+
+    limit = pagination.parse_limit()
+    rows, next_cursor = pagination.split_page(
+        pagination.keyset(calls, CallLog.id, before_id, limit, descending=True), limit, lambda c: c.id)
+    return pagination.stream_page(
+        'calls',
+        ({field: _call_value(call, CALL_FIELDS[field]) for field in fields} for call in rows),
+        next_cursor,
+        limit
+    )
+
+def _call_value(call_log: CallLog, column: str):
+    value = getattr(call_log, column)
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _gather_action(call_log_id: int, turn: int) -> str:
+    """Gather callback URL for the next turn, escaped for use inside a TwiML attribute"""
+    url = url_for('voice.process_twilio_speech', call_log_id=call_log_id, turn=turn,
+                  traceparent=tracer.current_traceparent())
+    return xml_escape(url, {'"': '&quot;'})
+
+# Twilio webhook endpoints (simplified for Heroku)
+@voice_bp.route('/webhook/twilio/voice', methods=['POST'])
+@tracer.trace_webhook('twilio.voice', root=True)
+def twilio_voice_webhook():
+    """Handle incoming Twilio voice calls"""
+    try:
+        # A retried webhook must not log the call twice; replay the first answer
+        call_sid = request.form.get('CallSid', '')
+        return webhook_results.run(f"voice:{call_sid}" if call_sid else None, _answer_call)
         
     except Exception as e:
         logger.error(f"Error in Twilio voice webhook: {str(e)}")
@@ -200,73 +314,75 @@ def twilio_voice_webhook():
             <Hangup/>
         </Response>''', 200, {'Content-Type': 'text/xml'}
 
+def _answer_call():
+    # Get call information from Twilio
+    from_number = request.form.get('From', '')
+    to_number = request.form.get('To', '')
+    call_sid = request.form.get('CallSid', '')
+    
+    logger.info(f"Incoming call: {from_number} -> {to_number} (SID: {call_sid})")
+    
+    # Find business by phone number
+    business = tenants.get_by_phone(to_number)
+    if not business:
+        # Return TwiML for unknown number
+        return '''<?xml version="1.0" encoding="UTF-8"?>
+        <Response>
+            <Say voice="alice" language="en">Sorry, this number is not configured for AI assistance.</Say>
+            <Hangup/>
+        </Response>''', 200, {'Content-Type': 'text/xml'}
+    
+    # Create or find customer
+    customer = Customer.query.filter_by(phone=from_number).first()
+    returning = customer is not None
+    if not customer:
+        customer = Customer(
+            phone=from_number,
+            preferred_language='ar'  # Default to Arabic for Saudi numbers
+        )
+        db.session.add(customer)
+        db.session.commit()
+    
+    # Create call log
+    call_log = CallLog(
+        business_id=business["id"],
+        customer_id=customer.id,
+        call_sid=call_sid,
+        from_number=from_number,
+        to_number=to_number,
+        direction='inbound',
+        status='in-progress'
+    )
+    db.session.add(call_log)
+    db.session.commit()
+    
+    # Prepare the first turn while the greeting plays
+    call_sessions.start(current_app._get_current_object(), call_log.id, call_sid, business,
+                        customer.id if returning else None, get_conversation_engine().build_system_prompt)
+    
+    # Return TwiML response
+    business_name = xml_escape(business["name"])
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+    <Response>
+        <Say voice="alice" language="ar">مرحباً بك في {business_name}. مساعدي الذكي سيساعدك الآن.</Say>
+        <Say voice="alice" language="en">Welcome to {business_name}. Our AI assistant will help you now.</Say>
+        <Gather input="speech" action="{_gather_action(call_log.id, 1)}" method="POST" speechTimeout="3" language="ar-SA,en-US">
+            <Say voice="alice" language="ar">كيف يمكنني مساعدتك اليوم؟</Say>
+            <Say voice="alice" language="en">How can I help you today?</Say>
+        </Gather>
+    </Response>''', 200, {'Content-Type': 'text/xml'}
+
 @voice_bp.route('/webhook/twilio/process/<int:call_log_id>', methods=['POST'])
+@tracer.trace_webhook('twilio.gather')
 def process_twilio_speech(call_log_id):
     """Process speech input from Twilio"""
     try:
-        # Get speech result from Twilio
-        speech_result = request.form.get('SpeechResult', '')
-        confidence = request.form.get('Confidence', '0')
-        
-        logger.info(f"Speech received for call {call_log_id}: {speech_result} (confidence: {confidence})")
-        
-        # Get call log and business
-        call_log = CallLog.query.get(call_log_id)
-        if not call_log:
-            return '''<?xml version="1.0" encoding="UTF-8"?>
-            <Response>
-                <Say voice="alice" language="en">Sorry, call not found.</Say>
-                <Hangup/>
-            </Response>''', 200, {'Content-Type': 'text/xml'}
-        
-        business = Business.query.get(call_log.business_id)
-        if not business:
-            return '''<?xml version="1.0" encoding="UTF-8"?>
-            <Response>
-                <Say voice="alice" language="en">Sorry, business not found.</Say>
-                <Hangup/>
-            </Response>''', 200, {'Content-Type': 'text/xml'}
-        
-        # Process the speech with AI
-        business_config = {
-            "name": business.name,
-            "phone": business.phone,
-            "ai_config": json.loads(business.ai_config) if business.ai_config else {}
-        }
-        
-        result = conversation_engine.process_message(
-            business_id=str(business.id),
-            message=speech_result,
-            business_config=business_config
-        )
-        
-        # Update call log
-        call_log.transcript = (call_log.transcript or '') + f"\nCustomer: {speech_result}\nAI: {result['response']}"
-        call_log.intent_detected = result['intent']['type']
-        db.session.commit()
-        
-        # Generate TwiML response
-        ai_response = result['response']
-        
-        # Determine if we need to continue the conversation
-        if result['requires_action'] and result['intent']['type'] == 'booking':
-            # For booking, gather more information
-            return f'''<?xml version="1.0" encoding="UTF-8"?>
-            <Response>
-                <Say voice="alice" language="ar">{ai_response}</Say>
-                <Gather input="speech" action="/api/voice/webhook/twilio/process/{call_log_id}" method="POST" speechTimeout="5" language="ar-SA,en-US">
-                    <Say voice="alice" language="ar">يرجى تحديد التاريخ والوقت المفضل لديك.</Say>
-                </Gather>
-            </Response>''', 200, {'Content-Type': 'text/xml'}
-        else:
-            # End the call with the response
-            return f'''<?xml version="1.0" encoding="UTF-8"?>
-            <Response>
-                <Say voice="alice" language="ar">{ai_response}</Say>
-                <Say voice="alice" language="ar">شكراً لاتصالك بنا. نتطلع لخدمتك قريباً.</Say>
-                <Say voice="alice" language="en">Thank you for calling. We look forward to serving you soon.</Say>
-                <Hangup/>
-            </Response>''', 200, {'Content-Type': 'text/xml'}
+        # Key on the call and the turn number carried in the Gather URL, so a
+        # retried turn replays its TwiML without a second LLM call or transcript append
+        call_sid = request.form.get('CallSid', '')
+        turn = request.args.get('turn', type=int)
+        key = f"gather:{call_sid or call_log_id}:{turn}" if turn else None
+        return webhook_results.run(key, lambda: _answer_speech(call_log_id, turn or 1))
         
     except Exception as e:
         logger.error(f"Error processing Twilio speech: {str(e)}")
@@ -276,7 +392,82 @@ def process_twilio_speech(call_log_id):
             <Hangup/>
         </Response>''', 200, {'Content-Type': 'text/xml'}
 
+def _answer_speech(call_log_id, turn):
+    # Get speech result from Twilio
+    with metrics.stage_timer('webhook_parse'):
+        speech_result = request.form.get('SpeechResult', '')
+        confidence = request.form.get('Confidence', '0')
+    
+    logger.info(f"Speech received for call {call_log_id}: {speech_result} (confidence: {confidence})")
+    
+    # Get call log and business
+    lookup_started = time.perf_counter()
+    call_log = CallLog.query.get(call_log_id)
+    if not call_log:
+        return '''<?xml version="1.0" encoding="UTF-8"?>
+        <Response>
+            <Say voice="alice" language="en">Sorry, call not found.</Say>
+            <Hangup/>
+        </Response>''', 200, {'Content-Type': 'text/xml'}
+    
+    business_config = tenants.get(call_log.business_id)
+    if not business_config:
+        return '''<?xml version="1.0" encoding="UTF-8"?>
+        <Response>
+            <Say voice="alice" language="en">Sorry, business not found.</Say>
+            <Hangup/>
+        </Response>''', 200, {'Content-Type': 'text/xml'}
+    metrics.observe_stage('business_lookup', time.perf_counter() - lookup_started)
+    
+    # Process the speech with AI, using whatever was preloaded when the call was answered
+    result = get_conversation_engine().process_message(
+        business_id=str(business_config["id"]),
+        message=speech_result,
+        business_config=business_config,
+        session=call_sessions.get(call_log_id, business_config, call_log.customer_id,
+                                  get_conversation_engine().build_system_prompt),
+        turn=turn
+    )
+    
+    # Update call log
+    previous = call_analytics.snapshot_call(call_log)
+    call_log.transcript = (call_log.transcript or '') + f"\nCustomer: {speech_result}\nAI: {result['response']}"
+    call_log.intent_detected = result['intent']['type']
+    if result['intent']['type'] == 'booking':
+        call_log.booking_requested = True
+    call_analytics.record_call_update(call_log, previous)
+    transcript_search.index_turn(call_log, speech_result, result['response'])
+    with metrics.stage_timer('db_commit'):
+        db.session.commit()
+    
+    # Generate TwiML response
+    ai_response = xml_escape(result['response'])  # may carry service names and other stored text
+    render_started = time.perf_counter()
+    
+    # Determine if we need to continue the conversation
+    if result['requires_action'] and result['intent']['type'] == 'booking':
+        # For booking, gather more information
+        twiml = f'''<?xml version="1.0" encoding="UTF-8"?>
+        <Response>
+            <Say voice="alice" language="ar">{ai_response}</Say>
+            <Gather input="speech" action="{_gather_action(call_log_id, turn + 1)}" method="POST" speechTimeout="5" language="ar-SA,en-US">
+                <Say voice="alice" language="ar">يرجى تحديد التاريخ والوقت المفضل لديك.</Say>
+            </Gather>
+        </Response>'''
+    else:
+        # End the call with the response
+        twiml = f'''<?xml version="1.0" encoding="UTF-8"?>
+        <Response>
+            <Say voice="alice" language="ar">{ai_response}</Say>
+            <Say voice="alice" language="ar">شكراً لاتصالك بنا. نتطلع لخدمتك قريباً.</Say>
+            <Say voice="alice" language="en">Thank you for calling. We look forward to serving you soon.</Say>
+            <Hangup/>
+        </Response>'''
+    metrics.observe_stage('twiml_render', time.perf_counter() - render_started)
+    return twiml, 200, {'Content-Type': 'text/xml'}
+
 @voice_bp.route('/webhook/twilio/status', methods=['POST'])
+@tracer.trace_webhook('twilio.status')
 def twilio_status_webhook():
     """Handle Twilio call status updates"""
     try:
@@ -289,12 +480,16 @@ def twilio_status_webhook():
         # Update call log
         call_log = CallLog.query.filter_by(call_sid=call_sid).first()
         if call_log:
+            previous = call_analytics.snapshot_call(call_log)
             call_log.status = call_status
             call_log.duration = int(call_duration) if call_duration.isdigit() else 0
-            if call_status in ['completed', 'failed', 'busy', 'no-answer']:
+            if call_status in call_analytics.TERMINAL_STATUSES:
                 call_log.ended_at = datetime.utcnow()
                 call_log.outcome = 'completed' if call_status == 'completed' else 'failed'
+            call_analytics.record_call_update(call_log, previous)
             db.session.commit()
+        if call_status in call_analytics.TERMINAL_STATUSES:
+            call_sessions.end(call_sid)
         
         return jsonify({"success": True}), 200
         
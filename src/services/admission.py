@@ -0,0 +1,230 @@
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from flask import jsonify, request
+from src.services import metrics
+
+logger = logging.getLogger(__name__)
+
+LIVE = 'live'        # callers on the phone and customers texting
+DEFAULT = 'default'  # everything not classified
+TEST = 'test'        # dashboard and API test traffic
+
+@dataclass
+class ClassPolicy:
+    priority: int            # lower is served first
+    max_in_flight: int       # HTTP requests of this class running at once
+    max_llm: int             # LLM calls of this class running at once
+    max_queued: int          # LLM waiters allowed before new ones are shed
+    max_queue_wait: float    # seconds to wait for an LLM slot
+    headroom: int = 0        # LLM slots this class must leave free for higher classes
+    shed: bool = False       # answer 503 when overloaded instead of falling back
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+LLM_CAPACITY = _env_int('LLM_CONCURRENCY', 8)
+POLICIES = {
+    LIVE: ClassPolicy(priority=0, max_in_flight=_env_int('LIVE_MAX_IN_FLIGHT', 64), max_llm=LLM_CAPACITY,
+                      max_queued=64, max_queue_wait=_env_float('LIVE_LLM_QUEUE_SECONDS', 2.0)),
+    DEFAULT: ClassPolicy(priority=1, max_in_flight=32, max_llm=LLM_CAPACITY, max_queued=16,
+                         max_queue_wait=1.0, headroom=1),
+    TEST: ClassPolicy(priority=2, max_in_flight=_env_int('TEST_MAX_IN_FLIGHT', 4),
+                      max_llm=_env_int('TEST_LLM_CONCURRENCY', 2), max_queued=4,
+                      max_queue_wait=_env_float('TEST_LLM_QUEUE_SECONDS', 0.25), headroom=2, shed=True),
+}
+
+class Overloaded(Exception):
+    """Raised for shedding classes that could not be admitted; answered with 503"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+_current_class: contextvars.ContextVar[str] = contextvars.ContextVar('request_class', default=DEFAULT)
+
+def current_class() -> str:
+    return _current_class.get()
+
+@contextmanager
+def request_class(name: str):
+    """Run a block (e.g. a worker thread's job) as traffic of class `name`"""
+    token = _current_class.set(name)
+    try:
+        yield
+    finally:
+        _current_class.reset(token)
+
+class _Waiter:
+    __slots__ = ('name', 'event', 'granted')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.event = threading.Event()
+        self.granted = False
+
+class LlmScheduler:
+    """Priority-ordered LLM concurrency limiter.
+
+    At most `capacity` LLM calls run at once and at most `max_llm` of them
+    per class. A freed slot goes to the highest-priority waiter whose class
+    still has room, and lower classes never take the last `headroom`
+    slots, so a burst of test traffic can't make a live caller queue.
+    Waiters give up after their class's `max_queue_wait`.
+    """
+
+    def __init__(self, capacity: int, policies: Dict[str, ClassPolicy]):
+        self.capacity = capacity
+        self.policies = policies
+        self._running = {name: 0 for name in policies}
+        self._queued = {name: 0 for name in policies}
+        self._waiters: List = []  # heap of (priority, seq, waiter)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _can_run(self, name: str) -> bool:
+        policy = self.policies[name]
+        in_use = sum(self._running.values())
+        return in_use < self.capacity - policy.headroom and self._running[name] < policy.max_llm
+
+    def waiting(self, names: Iterable[str]) -> int:
+        return sum(self._queued[name] for name in names)
+
+    def acquire(self, name: str) -> float:
+        """Take a slot for class `name`; returns seconds spent queued. Raises Overloaded when shed."""
+        policy = self.policies[name]
+        with self._lock:
+            ahead = any(self.policies[w.name].priority <= policy.priority for _, _, w in self._waiters)
+            if not ahead and self._can_run(name):
+                self._running[name] += 1
+                metrics.ADMISSION.inc(name, 'llm_admitted')
+                return 0.0
+            if self._queued[name] >= policy.max_queued:
+                metrics.ADMISSION.inc(name, 'llm_shed')
+                raise Overloaded(f"{self._queued[name]} {name} requests already waiting for the LLM")
+            waiter = _Waiter(name)
+            heapq.heappush(self._waiters, (policy.priority, next(self._seq), waiter))
+            self._queued[name] += 1
+
+        started = time.perf_counter()
+        waiter.event.wait(policy.max_queue_wait)
+        with self._lock:
+            if not waiter.granted:
+                self._waiters = [entry for entry in self._waiters if entry[2] is not waiter]
+                heapq.heapify(self._waiters)
+                self._queued[name] -= 1
+                metrics.ADMISSION.inc(name, 'llm_timeout')
+                raise Overloaded(f"No LLM slot for {name} traffic within {policy.max_queue_wait}s")
+        waited = time.perf_counter() - started
+        metrics.ADMISSION.inc(name, 'llm_admitted')
+        return waited
+
+    def release(self, name: str):
+        with self._lock:
+            self._running[name] -= 1
+            self._grant()
+
+    def _grant(self):
+        # Walk waiters in priority order; one whose class is at its limit does not block lower ones
+        skipped = []
+        while self._waiters and sum(self._running.values()) < self.capacity:
+            entry = heapq.heappop(self._waiters)
+            waiter = entry[2]
+            if self._can_run(waiter.name):
+                self._running[waiter.name] += 1
+                self._queued[waiter.name] -= 1
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    @contextmanager
+    def slot(self, name: Optional[str] = None):
+        name = name or current_class()
+        waited = self.acquire(name)
+        metrics.observe_stage('llm_queue', waited)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+class AdmissionController:
+    """Per-class limits on concurrent HTTP requests, checked before the view runs.
+
+    Shedding classes are also turned away while higher-priority traffic is
+    queued for the LLM, so they fail fast instead of adding to the queue.
+    The counts are per process: a worker that serves one request at a time
+    never has anything to rank, which is why the Procfile runs gunicorn's
+    threaded (gthread) workers.
+    """
+
+    def __init__(self, scheduler: LlmScheduler, policies: Dict[str, ClassPolicy]):
+        self.scheduler = scheduler
+        self.policies = policies
+        self._in_flight = {name: 0 for name in policies}
+        self._lock = threading.Lock()
+
+    def admit(self, name: str):
+        policy = self.policies[name]
+        higher = [other for other, p in self.policies.items() if p.priority < policy.priority]
+        with self._lock:
+            if policy.shed and self.scheduler.waiting(higher):
+                metrics.ADMISSION.inc(name, 'shed')
+                raise Overloaded(f"Shedding {name} traffic while higher-priority calls are waiting")
+            if self._in_flight[name] >= policy.max_in_flight:
+                metrics.ADMISSION.inc(name, 'shed')
+                raise Overloaded(f"{self._in_flight[name]} {name} requests already in flight")
+            self._in_flight[name] += 1
+        metrics.ADMISSION.inc(name, 'admitted')
+
+    def done(self, name: str):
+        with self._lock:
+            self._in_flight[name] = max(self._in_flight[name] - 1, 0)
+
+    def install(self, app, classes: Dict[str, str]):
+        """Classify requests by endpoint name ({'twilio_sms': LIVE, ...}) and enforce the limits"""
+
+        @app.before_request
+        def _admit():
+            name = classes.get(request.endpoint, DEFAULT)
+            request.environ['admission.class'] = name
+            request.environ['admission.token'] = _current_class.set(name)
+            try:
+                self.admit(name)
+            except Overloaded as e:
+                request.environ['admission.class'] = None
+                return overloaded_response(e)
+            return None
+
+        @app.teardown_request
+        def _release(exc=None):
+            name = request.environ.pop('admission.class', None)
+            if name:
+                self.done(name)
+            token = request.environ.pop('admission.token', None)
+            if token is not None:
+                try:
+                    _current_class.reset(token)
+                except ValueError:
+                    pass  # set in a different context (streamed response)
+
+def overloaded_response(error: Overloaded):
+    response = jsonify({'success': False, 'error': 'Server busy, please retry shortly', 'detail': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+llm_scheduler = LlmScheduler(LLM_CAPACITY, POLICIES)
+admission = AdmissionController(llm_scheduler, POLICIES)
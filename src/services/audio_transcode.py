@@ -0,0 +1,192 @@
+"""Streaming transcoding to telephony audio: 8 kHz G.711 mu-law in 20 ms frames.
+
+TTS audio arrives as 16-bit little-endian PCM at 16-44.1 kHz in chunks of
+any size (ElevenLabs `pcm_*` output formats; MP3 would need a decoder, so
+ask for PCM). `TelephonyTranscoder.feed()` takes each chunk as bytes or a
+memoryview and yields 160-byte mu-law frames as soon as they are complete.
+
+Chunks are read with np.frombuffer (no copy) straight into one reusable
+float32 work buffer that also holds the filter history, and the polyphase
+low-pass resampler reads that buffer through a sliding-window view
+instead of copying it per chunk. mu-law encoding is a single lookup in a
+64 K-entry table indexed by the raw sample bits. Frames are memoryviews
+into the chunk's encoded output, which stays valid for as long as a
+frame is referenced.
+"""
+import math
+from fractions import Fraction
+from typing import Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TELEPHONY_RATE = 8000
+FRAME_MS = 20
+FILTER_SPAN = 16  # low-pass length in output sample periods; longer is a sharper cutoff
+KAISER_BETA = 8.0
+PASSBAND = 0.9  # of the lower Nyquist frequency
+ULAW_SILENCE = 0xFF
+ULAW_BIAS = 0x84
+ULAW_CLIP = 8159  # in 14-bit magnitude
+
+# ElevenLabs output formats this module can take
+PCM_FORMATS = {'pcm_16000': 16000, 'pcm_22050': 22050, 'pcm_24000': 24000, 'pcm_44100': 44100}
+
+Chunk = Union[bytes, bytearray, memoryview]
+
+def _ulaw_decode_table() -> np.ndarray:
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    magnitude = (((codes & 0x0F) << 3) + ULAW_BIAS << exponent) - ULAW_BIAS
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+def _ulaw_encode_table() -> np.ndarray:
+    """mu-law byte for every int16 value, indexed by the sample's uint16 bits (ITU g711.c rounding)"""
+    samples = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(samples < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(samples), ULAW_CLIP) + (ULAW_BIAS >> 2)
+    segment = np.maximum(np.floor(np.log2(magnitude)).astype(np.int32) - 5, 0)
+    code = np.where(segment >= 8, 0x7F, segment << 4 | (magnitude >> (segment + 1)) & 0x0F)
+    return (code ^ mask).astype(np.uint8)
+
+ULAW_DECODE = _ulaw_decode_table()
+ULAW_ENCODE = _ulaw_encode_table()
+
+def decode_ulaw(data: Chunk) -> np.ndarray:
+    """G.711 mu-law bytes to int16 PCM"""
+    return ULAW_DECODE[np.frombuffer(data, dtype=np.uint8)]
+
+def encode_ulaw(pcm: np.ndarray) -> np.ndarray:
+    """int16 PCM to G.711 mu-law bytes (uint8)"""
+    return ULAW_ENCODE[pcm.astype(np.int16, copy=False).view(np.uint16)]
+
+class Resampler:
+    """Streaming rational resampler: upsample by L, low-pass, keep every M-th sample.
+
+    Implemented polyphase, so only the taps that land on real input
+    samples are computed. `process()` takes float32 samples preceded by
+    `history` samples of the previous chunk (the caller's work buffer
+    layout) and returns the output samples those inputs complete.
+    """
+
+    def __init__(self, input_rate: int, output_rate: int, span: int = FILTER_SPAN):
+        ratio = Fraction(output_rate, input_rate)
+        self.up, self.down = ratio.numerator, ratio.denominator
+        taps_per_phase = math.ceil(span * max(input_rate / output_rate, 1))
+        self.taps = taps_per_phase
+        self.history = taps_per_phase - 1
+        self.consumed = 0  # input samples seen
+        self.produced = 0  # output samples emitted
+
+        length = self.up * taps_per_phase
+        cutoff = PASSBAND * min(input_rate, output_rate) / 2 / (input_rate * self.up)  # cycles per sample
+        n = np.arange(length) - (length - 1) / 2
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, KAISER_BETA)
+        prototype *= self.up / prototype.sum()
+        # phases[p, k] weighs input x[i - k] for output phase p; reversed to match window order
+        phases = prototype.reshape(taps_per_phase, self.up).T
+        self.phases = np.ascontiguousarray(phases[:, ::-1], dtype=np.float32)
+
+    def process(self, work: np.ndarray, count: int) -> np.ndarray:
+        """Outputs for the `count` new samples in work[history:history + count]"""
+        end = -(-(self.consumed + count) * self.up // self.down)
+        positions = np.arange(self.produced, end, dtype=np.int64) * self.down
+        newest = positions // self.up - self.consumed  # window index in this chunk
+        windows = sliding_window_view(work[:self.history + count], self.taps)
+        if self.up == 1:
+            out = windows[newest[0]:newest[-1] + 1:self.down] @ self.phases[0] if len(newest) else \
+                np.zeros(0, dtype=np.float32)
+        else:
+            out = np.einsum('nk,nk->n', windows[newest], self.phases[positions % self.up])
+        self.consumed += count
+        self.produced = end
+        return out
+
+class TelephonyTranscoder:
+    """PCM chunks at any rate in, 20 ms 8 kHz mu-law frames out.
+
+        transcoder = TelephonyTranscoder(24000)
+        for chunk in tts_stream:
+            for frame in transcoder.feed(chunk):
+                websocket.send(frame)
+        for frame in transcoder.flush():
+            websocket.send(frame)
+    """
+
+    def __init__(self, input_rate: int, output_rate: int = TELEPHONY_RATE, frame_ms: int = FRAME_MS):
+        self.input_rate = input_rate
+        self.frame_bytes = output_rate * frame_ms // 1000
+        self.resampler = Resampler(input_rate, output_rate) if input_rate != output_rate else None
+        self.history = self.resampler.history if self.resampler else 0
+        self._work = np.zeros(self.history + 4096, dtype=np.float32)
+        self._odd_byte: Optional[int] = None  # a sample split across two chunks
+        self._partial = b''  # encoded bytes short of a whole frame
+
+    def feed(self, chunk: Chunk) -> Iterator[memoryview]:
+        """Frames completed by `chunk`; the chunk is consumed even if they aren't iterated"""
+        view = memoryview(chunk).cast('B')
+        offset = 0
+        count = (len(view) + (self._odd_byte is not None)) // 2
+        if count == 0:
+            if len(view):
+                self._odd_byte = view[0]
+            return iter(())
+        work = self._reserve(count)
+        start = self.history
+        if self._odd_byte is not None:
+            work[start] = int.from_bytes(bytes((self._odd_byte, view[0])), 'little', signed=True)
+            start, offset, count = start + 1, 1, count - 1
+        samples = np.frombuffer(view, dtype='<i2', count=count, offset=offset)
+        work[start:start + count] = samples
+        consumed = offset + 2 * count
+        self._odd_byte = view[consumed] if consumed < len(view) else None
+        return iter(self._emit(start + count - self.history))
+
+    def flush(self) -> Iterator[memoryview]:
+        """Push out the filter tail and the last frame, padded with mu-law silence"""
+        frames = []
+        if self.resampler:
+            work = self._reserve(self.history)
+            work[self.history:2 * self.history] = 0
+            frames = self._emit(self.history)
+        if self._partial:
+            frames.append(memoryview(self._partial + bytes([ULAW_SILENCE]) * (self.frame_bytes - len(self._partial))))
+            self._partial = b''
+        return iter(frames)
+
+    def _reserve(self, count: int) -> np.ndarray:
+        if len(self._work) < self.history + count:
+            grown = np.zeros(self.history + count, dtype=np.float32)
+            grown[:self.history] = self._work[:self.history]
+            self._work = grown
+        return self._work
+
+    def _emit(self, count: int) -> List[memoryview]:
+        work = self._work
+        if self.resampler:
+            out = self.resampler.process(work, count)
+            work[:self.history] = work[count:count + self.history]  # filter history for the next chunk
+        else:
+            out = work[:count]
+        encoded = ULAW_ENCODE[np.clip(np.rint(out), -32768, 32767).astype(np.int16).view(np.uint16)]
+        view = memoryview(encoded)
+        frames, start = [], 0
+        if self._partial:
+            start = self.frame_bytes - len(self._partial)
+            if len(view) < start:
+                self._partial += view.tobytes()
+                return frames
+            frames.append(memoryview(self._partial + view[:start].tobytes()))
+            self._partial = b''
+        whole = start + (len(view) - start) // self.frame_bytes * self.frame_bytes
+        frames.extend(view[position:position + self.frame_bytes] for position in range(start, whole, self.frame_bytes))
+        if whole < len(view):
+            self._partial = view[whole:].tobytes()
+        return frames
+
+def transcode(chunks: Iterable[Chunk], input_rate: int) -> Iterator[memoryview]:
+    """mu-law frames for a whole PCM stream, flushed at the end"""
+    transcoder = TelephonyTranscoder(input_rate)
+    for chunk in chunks:
+        yield from transcoder.feed(chunk)
+    yield from transcoder.flush()
@@ -0,0 +1,179 @@
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+from src.services import metrics
+from src.services.text_normalization import normalize_arabic
+
+logger = logging.getLogger(__name__)
+
+INDEX_TTL = 300.0  # services can change without the business row changing
+TOP_K = 3
+MAX_CHUNK_CHARS = 320
+BM25_K1 = 1.2
+BM25_B = 0.75
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+SENTENCE_END = re.compile(r'(?<=[.!?؟])\s+|\n+')
+ARABIC_DEFINITE_ARTICLE = 'ال'
+# Plural 'es' follows a sibilant ('boxes', 'branches', 'classes'); elsewhere only the 's'
+# goes ('services', 'nurses'), so a plural and its singular index as the same token
+SIBILANT_ENDINGS = ('ss', 'x', 'z', 'ch', 'sh')
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'at', 'be', 'do', 'does', 'for', 'from', 'have', 'how', 'i', 'in', 'is', 'it',
+    'me', 'my', 'of', 'on', 'or', 'our', 'the', 'to', 'we', 'what', 'with', 'you', 'your',
+    'في', 'من', 'على', 'الى', 'عن', 'هل', 'ما', 'هو', 'هي', 'انا', 'انتم', 'لو', 'و',
+}
+
+def _singular(token: str) -> str:
+    """'doctors' -> 'doctor', 'services' -> 'service', 'branches' -> 'branch'; 'business' stays"""
+    if token.endswith('es') and token[:-2].endswith(SIBILANT_ENDINGS):
+        return token[:-2]
+    if token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased, normalize_arabic()'d words without stopwords; 'الاشعه' and 'اشعه' match"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(normalize_arabic(text.lower())):
+        if token in STOPWORDS:
+            continue
+        if token.startswith(ARABIC_DEFINITE_ARTICLE) and len(token) > 4:
+            token = token[2:]
+        elif token.isascii() and len(token) > 3:
+            token = _singular(token)
+        tokens.append(token)
+    return tokens
+
+def chunk_description(description: str) -> List[str]:
+    """Split a description into sentence groups of at most MAX_CHUNK_CHARS"""
+    chunks, current = [], ''
+    for sentence in SENTENCE_END.split(description or ''):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + len(sentence) + 1 > MAX_CHUNK_CHARS:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _service_snippet(name: str, price: Optional[float], duration: Optional[int], description: Optional[str]) -> str:
+    details = [f"{price:g} SAR" if price is not None else None, f"{duration} min" if duration else None]
+    snippet = f"Service: {name}"
+    if any(details):
+        snippet += f" ({', '.join(d for d in details if d)})"
+    if description:
+        snippet += f" - {description}"
+    return snippet
+
+class BusinessIndex:
+    """BM25 over one business's description chunks, services and FAQs.
+
+    Each posting stores its finished BM25 weight, so a query is a dict
+    lookup per query token and a sum: microseconds for a clinic-sized
+    index. The first chunk of the description is the business overview
+    and is always returned first, even when nothing else matches.
+    """
+
+    def __init__(self, snippets: List[str]):
+        self.snippets = snippets
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        documents = [Counter(tokenize(snippet)) for snippet in snippets]
+        if not documents:
+            return
+        lengths = [sum(document.values()) for document in documents]
+        average = sum(lengths) / len(lengths) or 1.0
+        frequency = Counter(token for document in documents for token in document)
+        postings = defaultdict(list)
+        for index, (document, length) in enumerate(zip(documents, lengths)):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average)
+            for token, tf in document.items():
+                idf = math.log(1 + (len(documents) - frequency[token] + 0.5) / (frequency[token] + 0.5))
+                postings[token].append((index, idf * tf * (BM25_K1 + 1) / (tf + norm)))
+        self.postings = dict(postings)
+
+    def search(self, query: str, k: int = TOP_K) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            for index, weight in self.postings.get(token, ()):
+                scores[index] += weight
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def context(self, query: str, k: int = TOP_K, overview: bool = True) -> List[str]:
+        """Overview plus the top-k snippets for `query`, in index order"""
+        picked = {index for index, _ in self.search(query, k)}
+        if overview and self.snippets:
+            picked.add(0)
+        return [self.snippets[index] for index in sorted(picked)]
+
+def build(description: str, services: List[Tuple[str, Optional[float], Optional[int], Optional[str]]],
+          faqs: Optional[List[Dict[str, str]]] = None) -> BusinessIndex:
+    snippets = chunk_description(description)
+    snippets.extend(_service_snippet(*service) for service in services)
+    for faq in faqs or []:
+        if isinstance(faq, dict) and faq.get('question') and faq.get('answer'):
+            snippets.append(f"Q: {faq['question']} A: {faq['answer']}")
+    return BusinessIndex(list(dict.fromkeys(snippets)))
+
+_indexes: Dict[int, Tuple[float, Optional[str], BusinessIndex]] = {}
+_indexes_lock = threading.Lock()
+
+def index_for(business_id: int) -> Optional[BusinessIndex]:
+    """The business's index, rebuilt after its row changes or INDEX_TTL passes"""
+    from src.services.tenant_registry import tenants
+    business = tenants.get(business_id)
+    if not business:
+        return None
+    cached = _indexes.get(business_id)
+    if cached and cached[0] > time.monotonic() and cached[1] == business['version']:
+        metrics.record_cache('business_index', True)
+        return cached[2]
+    metrics.record_cache('business_index', False)
+
+    from src.models.voice_models import Service
+    started = time.perf_counter()
+    services = (Service.query.filter_by(business_id=business_id, is_active=True)
+                .order_by(Service.name).all())
+    index = build(business['description'],
+                  [(s.name, s.price, s.duration_minutes, getattr(s, 'description', None)) for s in services],
+                  business['ai_config'].get('faqs'))
+    metrics.observe_stage('index_build', time.perf_counter() - started)
+    with _indexes_lock:
+        _indexes[business_id] = (time.monotonic() + INDEX_TTL, business['version'], index)
+    return index
+
+def invalidate(business_id: Optional[int] = None):
+    """Drop cached indexes after a business or its services change"""
+    with _indexes_lock:
+        if business_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(business_id, None)
+
+def relevant_context(business_id: Optional[int], message: str, fallback: str = '', k: int = TOP_K) -> str:
+    """Description snippets relevant to `message`, one per line, for the prompt.
+
+    Businesses that aren't in the registry (ad-hoc test configs) get
+    `fallback`, normally their full description, as before.
+    """
+    if not business_id:
+        return fallback
+    started = time.perf_counter()
+    try:
+        index = index_for(business_id)
+    except Exception as e:
+        logger.error(f"Could not build retrieval index for business {business_id}: {str(e)}")
+        return fallback
+    if index is None:
+        return fallback
+    snippets = index.context(message, k)
+    metrics.observe_stage('retrieval', time.perf_counter() - started)
+    return '\n'.join(f"- {snippet}" for snippet in snippets) or fallback
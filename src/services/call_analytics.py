@@ -0,0 +1,200 @@
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from src.models.voice_models import db, Appointment, CallLog
+from src.models.analytics_models import CallRollup, CallDimensionRollup
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('hour', 'day')
+TERMINAL_STATUSES = ('completed', 'failed', 'busy', 'no-answer', 'canceled')
+COUNTER_FIELDS = ('calls', 'completed_calls', 'failed_calls', 'total_duration',
+                  'booking_requests', 'booking_conversions')
+
+def upgrade_schema():
+    """Add call_logs.booking_requested to databases created before it existed"""
+    columns = {column['name'] for column in inspect(db.engine).get_columns('call_logs')}
+    if 'booking_requested' not in columns:
+        with db.engine.begin() as connection:
+            connection.execute(text('ALTER TABLE call_logs ADD COLUMN booking_requested BOOLEAN DEFAULT FALSE'))
+        logger.info("Added call_logs.booking_requested")
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its hour or day bucket"""
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def snapshot_call(call_log: CallLog) -> Dict[str, Any]:
+    """Capture the fields of a call log that feed the rollups.
+
+    Take a snapshot before mutating the row and pass it to
+    record_call_update() so only the difference is applied.
+    """
+    return {
+        'business_id': call_log.business_id,
+        'customer_id': call_log.customer_id,
+        'status': call_log.status,
+        'duration': call_log.duration or 0,
+        'intent': call_log.intent_detected,
+        # Older rows predate the latch; their last intent is all there is to go on
+        'booking': bool(call_log.booking_requested) or call_log.intent_detected == 'booking',
+        'outcome': call_log.outcome,
+        'started_at': call_log.started_at or call_log.created_at
+    }
+
+def _booking_converted(snapshot: Dict[str, Any]) -> bool:
+    """A booking call converts when the caller ends up with an appointment made during the call"""
+    if not snapshot['customer_id'] or not snapshot['started_at']:
+        return False
+    return db.session.query(Appointment.id).filter(
+        Appointment.business_id == snapshot['business_id'],
+        Appointment.customer_id == snapshot['customer_id'],
+        Appointment.created_at >= snapshot['started_at']
+    ).first() is not None
+
+def _contribution(snapshot: Optional[Dict[str, Any]]):
+    """Counters a call contributes to its buckets. Calls only count once they end."""
+    counters = dict.fromkeys(COUNTER_FIELDS, 0)
+    dimensions = Counter()
+    if not snapshot or snapshot['status'] not in TERMINAL_STATUSES:
+        return counters, dimensions
+
+    is_booking = snapshot['booking']
+    counters['calls'] = 1
+    counters['completed_calls'] = 1 if snapshot['status'] == 'completed' else 0
+    counters['failed_calls'] = 0 if snapshot['status'] == 'completed' else 1
+    counters['total_duration'] = snapshot['duration']
+    counters['booking_requests'] = 1 if is_booking else 0
+    counters['booking_conversions'] = 1 if is_booking and _booking_converted(snapshot) else 0
+    dimensions[('intent', snapshot['intent'] or 'unknown')] += 1
+    dimensions[('outcome', snapshot['outcome'] or 'unknown')] += 1
+    return counters, dimensions
+
+def _increment_rollup(business_id: int, granularity: str, start: datetime, deltas: Dict[str, int]):
+    """Add deltas to a bucket row in SQL so concurrent workers never lose an update"""
+    filters = dict(business_id=business_id, granularity=granularity, bucket_start=start)
+    values = {getattr(CallRollup, field): getattr(CallRollup, field) + delta for field, delta in deltas.items()}
+    if CallRollup.query.filter_by(**filters).update(values, synchronize_session=False):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(CallRollup(**filters, **{field: deltas.get(field, 0) for field in COUNTER_FIELDS}))
+    except IntegrityError:
+        # Another worker created the bucket first
+        CallRollup.query.filter_by(**filters).update(values, synchronize_session=False)
+
+def _increment_dimension(business_id: int, granularity: str, start: datetime, dimension: str, value: str, delta: int):
+    filters = dict(business_id=business_id, granularity=granularity, bucket_start=start,
+                   dimension=dimension, value=value)
+    values = {CallDimensionRollup.count: CallDimensionRollup.count + delta}
+    if CallDimensionRollup.query.filter_by(**filters).update(values, synchronize_session=False):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(CallDimensionRollup(**filters, count=delta))
+    except IntegrityError:
+        CallDimensionRollup.query.filter_by(**filters).update(values, synchronize_session=False)
+
+def _apply(snapshot: Dict[str, Any], counters: Dict[str, int], dimensions: Counter):
+    deltas = {field: delta for field, delta in counters.items() if delta}
+    dimension_deltas = {key: delta for key, delta in dimensions.items() if delta}
+    if not deltas and not dimension_deltas:
+        return
+
+    started_at = snapshot['started_at'] or datetime.utcnow()
+    for granularity in GRANULARITIES:
+        start = bucket_start(started_at, granularity)
+        if deltas:
+            _increment_rollup(snapshot['business_id'], granularity, start, deltas)
+        for (dimension, value), delta in dimension_deltas.items():
+            _increment_dimension(snapshot['business_id'], granularity, start, dimension, value, delta)
+
+def record_call_update(call_log: CallLog, previous: Optional[Dict[str, Any]] = None):
+    """Apply the change between a call's previous and current state to its rollups.
+
+    Runs inside the caller's transaction; the caller commits. Replayed status
+    callbacks produce a zero delta, so the update is idempotent.
+    """
+    current = snapshot_call(call_log)
+    old_counters, old_dimensions = _contribution(previous)
+    new_counters, new_dimensions = _contribution(current)
+
+    if previous and previous['started_at'] != current['started_at']:
+        # The call moved buckets: retract from the old ones, add to the new ones
+        _apply(previous, {k: -v for k, v in old_counters.items()}, Counter({k: -v for k, v in old_dimensions.items()}))
+        _apply(current, new_counters, new_dimensions)
+        return
+
+    counters = {field: new_counters[field] - old_counters[field] for field in COUNTER_FIELDS}
+    dimensions = Counter(new_dimensions)
+    dimensions.subtract(old_dimensions)
+    _apply(current, counters, dimensions)
+
+def rebuild_rollups(business_id: Optional[int] = None, batch_size: int = 500) -> int:
+    """Recompute rollups from call_logs. Only needed for backfills or repairs."""
+    rollups = CallRollup.query
+    dimension_rollups = CallDimensionRollup.query
+    calls = CallLog.query.filter(CallLog.status.in_(TERMINAL_STATUSES))
+    if business_id is not None:
+        rollups = rollups.filter_by(business_id=business_id)
+        dimension_rollups = dimension_rollups.filter_by(business_id=business_id)
+        calls = calls.filter_by(business_id=business_id)
+    rollups.delete(synchronize_session=False)
+    dimension_rollups.delete(synchronize_session=False)
+
+    processed = 0
+    for call_log in calls.order_by(CallLog.id).yield_per(batch_size):
+        record_call_update(call_log)
+        processed += 1
+    db.session.commit()
+    logger.info(f"Rebuilt call rollups from {processed} calls")
+    return processed
+
+def get_business_metrics(business_id: int, granularity: str = 'day',
+                         start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+    """Read dashboard metrics from the precomputed buckets"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    end = end or datetime.utcnow()
+    start = start or end - (timedelta(days=1) if granularity == 'hour' else timedelta(days=30))
+    start = bucket_start(start, granularity)
+
+    rows = CallRollup.query.filter(
+        CallRollup.business_id == business_id,
+        CallRollup.granularity == granularity,
+        CallRollup.bucket_start >= start,
+        CallRollup.bucket_start <= end
+    ).order_by(CallRollup.bucket_start).all()
+    dimension_rows = CallDimensionRollup.query.filter(
+        CallDimensionRollup.business_id == business_id,
+        CallDimensionRollup.granularity == granularity,
+        CallDimensionRollup.bucket_start >= start,
+        CallDimensionRollup.bucket_start <= end
+    ).all()
+
+    totals = dict.fromkeys(COUNTER_FIELDS, 0)
+    for row in rows:
+        for field in COUNTER_FIELDS:
+            totals[field] += getattr(row, field)
+    breakdown = {'intent': Counter(), 'outcome': Counter()}
+    for row in dimension_rows:
+        breakdown.setdefault(row.dimension, Counter())[row.value] += row.count
+
+    totals['average_duration'] = round(totals['total_duration'] / totals['calls'], 1) if totals['calls'] else 0
+    totals['booking_conversion_rate'] = (
+        round(totals['booking_conversions'] / totals['booking_requests'], 3) if totals['booking_requests'] else 0
+    )
+    return {
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'totals': totals,
+        'intents': dict(breakdown['intent']),
+        'outcomes': dict(breakdown['outcome']),
+        'buckets': [row.to_dict() for row in rows]
+    }
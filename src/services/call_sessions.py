@@ -0,0 +1,182 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional
+from src.services import metrics, fast_path, business_index
+from src.services.http_pool import http_pools
+from src.services.provider_registry import providers
+
+logger = logging.getLogger(__name__)
+
+WARM_INTERVAL = 20.0  # a pooled connection used this recently is still open
+RECENT_APPOINTMENTS = 3
+
+@dataclass
+class CallSession:
+    call_log_id: int
+    call_sid: str
+    business_id: int
+    customer_id: Optional[int]
+    started_at: float = field(default_factory=time.monotonic)
+    ready: threading.Event = field(default_factory=threading.Event)
+    caller: Optional[Dict[str, Any]] = None
+    prompt_prefix: Optional[str] = None
+    warmed: List[str] = field(default_factory=list)
+
+def load_caller(customer_id: Optional[int], business_id: int) -> Optional[Dict[str, Any]]:
+    """The caller's name, language and latest appointments with this business"""
+    if not customer_id:
+        return None
+    from src.models.voice_models import db, Customer, Appointment, Service
+
+    customer = Customer.query.get(customer_id)
+    if not customer:
+        return None
+    rows = (db.session.query(Appointment.appointment_date, Appointment.status, Service.name)
+            .outerjoin(Service, Service.id == Appointment.service_id)
+            .filter(Appointment.customer_id == customer_id, Appointment.business_id == business_id)
+            .order_by(Appointment.appointment_date.desc())
+            .limit(RECENT_APPOINTMENTS).all())
+    if not customer.name and not rows:
+        return None
+    return {
+        'name': customer.name,
+        'preferred_language': customer.preferred_language,
+        'appointments': [
+            {'date': date.isoformat() if date else None, 'status': status, 'service': service}
+            for date, status, service in rows
+        ]
+    }
+
+class CallSessionCache:
+    """Per-call state prepared while the caller listens to the greeting.
+
+    `start()` runs at the voice webhook and hands the preload to a small
+    thread pool: the business's fast-path facts and retrieval index are
+    warmed, the caller's record and recent appointments are loaded, the
+    system prompt is built and the provider connection is opened. The
+    first speech turn picks the session up with `get()`; if the preload
+    is still running it waits at most `wait` seconds, and on a miss the
+    caller's record is loaded inline (one indexed query) so a slow or
+    skipped preload never costs the personalization. Sessions are
+    dropped when the call ends or after `ttl` seconds.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 64, ttl: float = 900.0,
+                 max_entries: int = 2000, wait: float = 0.05):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait = wait
+        self._sessions: "OrderedDict[int, CallSession]" = OrderedDict()
+        self._warmed_at: Dict[str, float] = {}
+        self._pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def start(self, app, call_log_id: int, call_sid: str, business: Dict[str, Any],
+              customer_id: Optional[int], build_prompt: Callable[..., str]) -> Optional[CallSession]:
+        session = CallSession(call_log_id, call_sid, business['id'], customer_id)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                metrics.CALL_PRELOAD.inc('skipped')
+                return None
+            self._pending += 1
+            self._evict_expired(session.started_at)
+            self._sessions[call_log_id] = session
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='call-preload')
+            executor = self._executor
+        executor.submit(self._preload, app, session, business, build_prompt)
+        return session
+
+    def get(self, call_log_id: int, business: Optional[Dict[str, Any]] = None, customer_id: Optional[int] = None,
+            build_prompt: Optional[Callable[..., str]] = None) -> Optional[CallSession]:
+        """The preloaded session; on a miss, one built inline from `business` and `customer_id` if given"""
+        session = self._sessions.get(call_log_id)
+        if session is not None and time.monotonic() - session.started_at > self.ttl:
+            with self._lock:
+                self._sessions.pop(call_log_id, None)
+            session = None
+        hit = session is not None and session.ready.wait(self.wait)
+        metrics.record_cache('call_session', hit)
+        if hit:
+            return session
+        if not business or not customer_id:
+            return None
+        return self._load_inline(call_log_id, session, business, customer_id, build_prompt)
+
+    def end(self, call_sid: str):
+        with self._lock:
+            for call_log_id, session in list(self._sessions.items()):
+                if session.call_sid == call_sid:
+                    del self._sessions[call_log_id]
+
+    def reset(self):
+        """After fork: the pool's threads and the parent's sessions don't carry over"""
+        self._sessions = OrderedDict()
+        self._warmed_at = {}
+        self._pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _load_inline(self, call_log_id: int, pending: Optional[CallSession], business: Dict[str, Any],
+                     customer_id: int, build_prompt: Optional[Callable[..., str]]) -> Optional[CallSession]:
+        started = time.perf_counter()
+        caller = load_caller(customer_id, business['id'])
+        metrics.observe_stage('call_session_inline', time.perf_counter() - started)
+        if not caller:
+            return None
+        metrics.CALL_PRELOAD.inc('inline')
+        session = CallSession(call_log_id, pending.call_sid if pending else '', business['id'], customer_id,
+                              caller=caller, prompt_prefix=build_prompt(business, caller) if build_prompt else None)
+        session.ready.set()
+        return session
+
+    def _evict_expired(self, now: float):
+        # Sessions are kept in start order, so the expired ones are at the front
+        while self._sessions:
+            call_log_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.started_at <= self.ttl:
+                break
+            del self._sessions[call_log_id]
+
+    def _preload(self, app, session: CallSession, business: Dict[str, Any], build_prompt: Callable[..., str]):
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                fast_path.facts_for(session.business_id)
+                business_index.index_for(session.business_id)
+                session.caller = load_caller(session.customer_id, session.business_id)
+                session.prompt_prefix = build_prompt(business, session.caller)
+            provider = business['ai_config'].get('provider') or providers.default_provider
+            if provider and self._should_warm(provider):
+                http_pools.warm(provider)
+                session.warmed.append(provider)
+            metrics.CALL_PRELOAD.inc('ready')
+        except Exception as e:
+            metrics.CALL_PRELOAD.inc('failed')
+            logger.error(f"Preloading call {session.call_sid} failed: {str(e)}")
+        finally:
+            metrics.observe_stage('call_preload', time.perf_counter() - started)
+            with self._lock:
+                self._pending -= 1
+            session.ready.set()
+
+    def _should_warm(self, provider: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._warmed_at.get(provider, 0.0) < WARM_INTERVAL:
+                return False
+            self._warmed_at[provider] = now
+        return True
+
+call_sessions = CallSessionCache(workers=int(os.getenv('CALL_PRELOAD_WORKERS', '4')))
+os.register_at_fork(after_in_child=call_sessions.reset)
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker with an adaptive timeout for one provider.
+
+    Closed: calls go through and their outcome and latency are recorded.
+    Open: calls are refused immediately so the caller can fall back without
+    waiting for a timeout. After `open_seconds` one probe call is let
+    through (half-open); its outcome closes or re-opens the breaker.
+
+    The timeout handed to the provider is the p99 of recent successful
+    latencies times `timeout_multiplier`, clamped to [floor, ceiling].
+    """
+
+    def __init__(self, name: str, window_seconds: float = 60.0, min_requests: int = 10,
+                 failure_threshold: float = 0.5, open_seconds: float = 30.0,
+                 timeout_floor: float = 2.0, timeout_ceiling: float = 20.0, timeout_multiplier: float = 1.5):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.timeout_floor = timeout_floor
+        self.timeout_ceiling = timeout_ceiling
+        self.timeout_multiplier = timeout_multiplier
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._calls = deque()  # (timestamp, ok, latency)
+        self._failures = 0
+        self._timeout = timeout_ceiling
+        self._since_timeout_update = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"Circuit {self.name} half-open, probing provider")
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def timeout(self) -> float:
+        return self._timeout
+
+    def record_success(self, latency: float):
+        self._record(True, latency)
+
+    def record_failure(self, latency: float = 0.0):
+        self._record(False, latency)
+
+    def _record(self, ok: bool, latency: float):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if ok:
+                    self._close()
+                else:
+                    self._open(now)
+                    return
+
+            self._calls.append((now, ok, latency))
+            self._failures += 0 if ok else 1
+            self._expire(now)
+
+            self._since_timeout_update += 1
+            if self._since_timeout_update >= 10:
+                self._update_timeout()
+
+            if (self.state == CLOSED and len(self._calls) >= self.min_requests
+                    and self._failures / len(self._calls) >= self.failure_threshold):
+                self._open(now)
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            _, ok, _ = self._calls.popleft()
+            self._failures -= 0 if ok else 1
+
+    def _update_timeout(self):
+        self._since_timeout_update = 0
+        latencies = sorted(latency for _, ok, latency in self._calls if ok)
+        if len(latencies) < self.min_requests:
+            self._timeout = self.timeout_ceiling
+            return
+        p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+        self._timeout = min(max(p99 * self.timeout_multiplier, self.timeout_floor), self.timeout_ceiling)
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self._opened_at = now
+        logger.warning(f"Circuit {self.name} opened "
+                       f"({self._failures}/{len(self._calls)} failures in {self.window_seconds:.0f}s)")
+
+    def _close(self):
+        self.state = CLOSED
+        self._calls.clear()
+        self._failures = 0
+        logger.info(f"Circuit {self.name} closed")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = len(self._calls)
+            return {
+                'state': self.state,
+                'calls_in_window': calls,
+                'failure_rate': round(self._failures / calls, 3) if calls else 0.0,
+                'timeout_seconds': round(self._timeout, 2)
+            }
+
+class BreakerRegistry:
+    """One breaker per provider name, shared by every code path in the process"""
+
+    def __init__(self, **defaults):
+        self.defaults = defaults
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(name, **self.defaults))
+        return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.snapshot() for name, breaker in list(self._breakers.items())}
+
+breakers = BreakerRegistry()
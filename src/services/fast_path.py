@@ -0,0 +1,328 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from src.services import metrics
+from src.services.text_normalization import normalize_arabic, is_arabic
+from src.services.intent_classifier import intents, HOURS, PRICING, SERVICES
+
+logger = logging.getLogger(__name__)
+
+SAUDI_TZ = ZoneInfo('Asia/Riyadh')
+MIN_CONFIDENCE = float(os.getenv('FAST_PATH_MIN_CONFIDENCE', '0.85'))  # calibrated classifier probability
+MAX_WORDS = 12  # longer messages usually carry more than one question
+FAST_PATH_INTENTS = (HOURS, PRICING, SERVICES)
+FACTS_TTL = 60.0
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+DAYS_EN = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DAYS_AR = ['الاثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت', 'الأحد']
+DAYS_AR_NORMALIZED = [normalize_arabic(day) for day in DAYS_AR]
+WEEKEND = [4, 5]  # Friday and Saturday in Saudi Arabia
+
+# Matched after normalize_arabic(), so the Arabic words are written normalized
+TOMORROW_WORDS = ['tomorrow', 'غدا', 'بكره', 'بكرا']
+WEEKEND_WORDS = ['weekend', 'weekends', 'ويكند', 'الويكند', 'نهايه الاسبوع']
+# Anything that needs a conversation (booking, complaints, people) goes to the LLM,
+# however confident the classifier is about the rest of the message
+DECLINE_WORDS = ['book', 'appointment', 'schedule', 'reserve', 'cancel', 'doctor', 'insurance',
+                 'موعد', 'حجز', 'احجز', 'الغاء', 'دكتور', 'طبيب', 'تامين']
+# A message naming more than one of these topics is a multi-part question for the LLM,
+# even when the classifier is confident about one of them
+TOPIC_WORDS = {
+    PRICING: ['price', 'prices', 'cost', 'how much', 'fee', 'fees', 'سعر', 'اسعار', 'الاسعار', 'السعر',
+              'تكلفه', 'بكم', 'كم يكلف'],
+    HOURS: ['hours', 'open', 'opening', 'closed', 'close', 'ساعات', 'الدوام', 'دوام', 'مفتوح', 'مفتوحين',
+            'مغلق', 'مسكر', 'تفتحون', 'تقفلون', 'مواعيد العمل'],
+    SERVICES: ['services', 'what do you offer', 'what do you do', 'خدمات', 'الخدمات', 'وش تقدمون', 'ماذا تقدمون'],
+}
+# Asking for the price list rather than one price; a price asked for a service
+# the business doesn't list is left to the LLM instead of answered with every price
+PRICE_LIST_WORDS = ['prices', 'price list', 'fees', 'rates', 'اسعار', 'الاسعار', 'اسعاركم', 'قائمه الاسعار']
+STOPWORDS = {'and', 'the', 'for', 'with', 'general', 'basic', 'of', 'a'}
+UNKNOWN = 'unknown'  # a day whose stored hours can't be read; never answered from templates
+
+def _normalize(text: str) -> str:
+    return normalize_arabic(text.lower())
+
+def _contains(text: str, keyword: str) -> bool:
+    if ' ' in keyword:
+        return keyword in text
+    # Arabic attaches "and", "with", "so" and "for" to the word: والاسعار, بكم
+    return re.search(rf'(?<!\w)[وبفل]?{re.escape(keyword)}(?!\w)', text) is not None
+
+def classify(message: str, classified: Optional[Tuple[str, float]] = None) -> Tuple[Optional[str], float]:
+    """Intent and confidence for the fast path; (None, 0.0) when it should not answer.
+
+    `classified` is intents.classify(message) when the caller already has it.
+    """
+    text = _normalize(message)
+    if len(text.split()) > MAX_WORDS or any(_contains(text, word) for word in DECLINE_WORDS):
+        return None, 0.0
+    topics = [topic for topic, words in TOPIC_WORDS.items() if any(_contains(text, word) for word in words)]
+    if len(topics) > 1:
+        return None, 0.0
+    intent, confidence = classified or intents.classify(message)
+    if intent not in FAST_PATH_INTENTS:
+        return None, 0.0
+    return intent, confidence
+
+def _parse_time(value) -> Optional[str]:
+    """"9:00" or "09:30" -> "HH:MM"; None for anything else ("9am", "noon")"""
+    match = re.fullmatch(r'\s*(\d{1,2})(?::(\d{2}))?\s*', str(value))
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if hour > 24 or minute > 59 or (hour == 24 and minute):
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+def _parse_hours(raw) -> Optional[Dict[str, Any]]:
+    """business_hours JSON -> {day: (open, close), None when closed or UNKNOWN when unreadable};
+    None when unusable"""
+    if not raw:
+        return None
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    hours = {}
+    for day in DAYS:
+        entry = data.get(day) or data.get(day.capitalize())
+        if isinstance(entry, dict) and entry.get('open') and entry.get('close') and not entry.get('closed'):
+            opens, closes = _parse_time(entry['open']), _parse_time(entry['close'])
+            hours[day] = (opens, closes) if opens and closes else UNKNOWN
+        else:
+            hours[day] = None
+    return hours if any(isinstance(slot, tuple) for slot in hours.values()) else None
+
+def build_facts(name: str, business_hours, services: List[Tuple[str, Optional[float], Optional[int]]]) -> Dict[str, Any]:
+    return {
+        'name': name,
+        'hours': _parse_hours(business_hours),
+        'services': [
+            {'name': service_name, 'price': price, 'minutes': minutes,
+             'tokens': {t for t in re.findall(r'\w+', _normalize(service_name)) if len(t) > 2 and t not in STOPWORDS}}
+            for service_name, price, minutes in services
+        ]
+    }
+
+_facts_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+_facts_lock = threading.Lock()
+
+def facts_for(business_id: int) -> Optional[Dict[str, Any]]:
+    """Hours and active services of a business, cached for FACTS_TTL seconds"""
+    entry = _facts_cache.get(business_id)
+    if entry and entry[0] > time.monotonic():
+        metrics.record_cache('fast_path_facts', True)
+        return entry[1]
+    metrics.record_cache('fast_path_facts', False)
+
+    from src.models.voice_models import Service
+    from src.services.tenant_registry import tenants
+    business = tenants.get(business_id)
+    if not business:
+        return None
+    services = (Service.query.filter_by(business_id=business_id, is_active=True)
+                .order_by(Service.name).all())
+    facts = build_facts(business['name'], business['business_hours'],
+                        [(s.name, s.price, s.duration_minutes) for s in services])
+    with _facts_lock:
+        _facts_cache[business_id] = (time.monotonic() + FACTS_TTL, facts)
+    return facts
+
+def invalidate(business_id: Optional[int] = None):
+    """Drop cached facts after a business or its services change"""
+    with _facts_lock:
+        if business_id is None:
+            _facts_cache.clear()
+        else:
+            _facts_cache.pop(business_id, None)
+
+# Templates
+
+def _format_price(price: float) -> str:
+    return f"{price:g}"
+
+def _format_time(value: str, arabic: bool) -> str:
+    hour, _, minute = value.partition(':')
+    hour, minute = int(hour), int(minute or 0)
+    suffix = ('صباحاً' if hour < 12 else 'مساءً') if arabic else ('AM' if hour < 12 else 'PM')
+    return f"{hour % 12 or 12}:{minute:02d} {suffix}"
+
+def _named_days(text: str) -> List[int]:
+    """Weekday indexes named in a normalized message, "weekend" meaning Friday and Saturday"""
+    days = [index for index, (english, arabic) in enumerate(zip(DAYS, DAYS_AR_NORMALIZED))
+            if re.search(rf'(?<!\w){english}s?(?!\w)', text) or re.search(rf'(?<!\w)[وبفل]?{arabic}(?!\w)', text)]
+    if any(_contains(text, word) for word in WEEKEND_WORDS):
+        days.extend(day for day in WEEKEND if day not in days)
+    return days
+
+def _day_label(day: int, offset: int, arabic: bool) -> str:
+    if arabic:
+        return {0: f"اليوم ({DAYS_AR[day]})", 1: f"غداً ({DAYS_AR[day]})"}.get(offset, f"يوم {DAYS_AR[day]}")
+    return {0: f"today ({DAYS_EN[day]})", 1: f"tomorrow ({DAYS_EN[day]})"}.get(offset, f"on {DAYS_EN[day]}")
+
+def _answer_hours(facts: Dict[str, Any], text: str, now: datetime, arabic: bool) -> Optional[str]:
+    hours = facts['hours']
+    if not hours:
+        return None
+    today = now.weekday()
+    tomorrow = any(_contains(text, word) for word in TOMORROW_WORDS)
+    named = _named_days(text)
+    if not named:
+        named = [(today + 1) % 7 if tomorrow else today]
+    elif tomorrow and named != [(today + 1) % 7]:
+        return None  # "tomorrow" and a different day: let the LLM ask which one
+    if len(named) > 1:
+        return _answer_days(hours, sorted(named, key=lambda day: (day - today) % 7), arabic)
+
+    day = named[0]
+    when = _day_label(day, (day - today) % 7, arabic)
+    slot = hours[DAYS[day]]
+    if slot == UNKNOWN:
+        return None
+    if slot:
+        if arabic:
+            return f"نعم، نحن مفتوحون {when} من {_format_time(slot[0], True)} إلى {_format_time(slot[1], True)}."
+        return f"Yes, we're open {when} from {_format_time(slot[0], False)} to {_format_time(slot[1], False)}."
+
+    # Closed that day: point to the next open day
+    for offset in range(1, 8):
+        next_day = (day + offset) % 7
+        next_slot = hours[DAYS[next_day]]
+        if next_slot == UNKNOWN:
+            return None
+        if next_slot:
+            if arabic:
+                return (f"لا، نحن مغلقون {when}. نفتح يوم {DAYS_AR[next_day]} من "
+                        f"{_format_time(next_slot[0], True)} إلى {_format_time(next_slot[1], True)}.")
+            return (f"No, we're closed {when}. We're open {DAYS_EN[next_day]} from "
+                    f"{_format_time(next_slot[0], False)} to {_format_time(next_slot[1], False)}.")
+    return None
+
+def _answer_days(hours: Dict[str, Any], days: List[int], arabic: bool) -> Optional[str]:
+    """Hours for several days at once ("the weekend", "friday or saturday")"""
+    if any(hours[DAYS[day]] == UNKNOWN for day in days):
+        return None
+    if not any(hours[DAYS[day]] for day in days):
+        next_day = next((days[-1] + offset) % 7 for offset in range(1, 8) if hours[DAYS[(days[-1] + offset) % 7]])
+        slot = hours[DAYS[next_day]]
+        if slot == UNKNOWN:
+            return None
+        if arabic:
+            return (f"لا، نحن مغلقون يوم {' و'.join(DAYS_AR[day] for day in days)}. نفتح يوم {DAYS_AR[next_day]} من "
+                    f"{_format_time(slot[0], True)} إلى {_format_time(slot[1], True)}.")
+        return (f"No, we're closed on {' and '.join(DAYS_EN[day] for day in days)}. We're open {DAYS_EN[next_day]} from "
+                f"{_format_time(slot[0], False)} to {_format_time(slot[1], False)}.")
+    parts = []
+    for day in days:
+        slot = hours[DAYS[day]]
+        if arabic:
+            parts.append(f"{DAYS_AR[day]} من {_format_time(slot[0], True)} إلى {_format_time(slot[1], True)}"
+                         if slot else f"{DAYS_AR[day]} مغلق")
+        else:
+            parts.append(f"{DAYS_EN[day]} from {_format_time(slot[0], False)} to {_format_time(slot[1], False)}"
+                         if slot else f"{DAYS_EN[day]} closed")
+    if arabic:
+        return f"مواعيدنا: {'، '.join(parts)}."
+    return f"Our hours: {', '.join(parts)}."
+
+def _match_service(facts: Dict[str, Any], text: str) -> Optional[Dict[str, Any]]:
+    words = set(re.findall(r'\w+', text))
+    best, best_score = None, 0.0
+    for service in facts['services']:
+        if not service['tokens']:
+            continue
+        score = len(service['tokens'] & words) / len(service['tokens'])
+        if score > best_score:
+            best, best_score = service, score
+    return best
+
+def _answer_pricing(facts: Dict[str, Any], text: str, arabic: bool) -> Optional[str]:
+    priced = [s for s in facts['services'] if s['price'] is not None]
+    if not priced:
+        return None
+    service = _match_service(facts, text)
+    if service and service['price'] is not None:
+        minutes = service['minutes']
+        if arabic:
+            duration = f" (المدة {minutes} دقيقة)" if minutes else ''
+            return f"سعر {service['name']} هو {_format_price(service['price'])} ريال{duration}. هل تود حجز موعد؟"
+        duration = f" ({minutes} minutes)" if minutes else ''
+        return f"The price for {service['name']} is {_format_price(service['price'])} SAR{duration}. Would you like to book an appointment?"
+    if not any(_contains(text, word) for word in PRICE_LIST_WORDS):
+        return None
+
+    listing = '، '.join if arabic else ', '.join
+    if arabic:
+        items = listing(f"{s['name']} {_format_price(s['price'])} ريال" for s in priced)
+        return f"أسعارنا: {items}. هل تود حجز موعد؟"
+    items = listing(f"{s['name']} {_format_price(s['price'])} SAR" for s in priced)
+    return f"Our prices: {items}. Would you like to book an appointment?"
+
+def _answer_services(facts: Dict[str, Any], arabic: bool) -> Optional[str]:
+    if not facts['services']:
+        return None
+    if arabic:
+        return f"نقدم في {facts['name']}: {'، '.join(s['name'] for s in facts['services'])}. كيف يمكنني مساعدتك؟"
+    return f"At {facts['name']} we offer: {', '.join(s['name'] for s in facts['services'])}. How can I help you?"
+
+def answer_intent(intent: str, message: str, facts: Optional[Dict[str, Any]],
+                  now: Optional[datetime] = None) -> Optional[str]:
+    """Templated reply for an intent decided elsewhere; None when the data can't answer it"""
+    if not facts:
+        return None
+    text = _normalize(message)
+    arabic = is_arabic(message)
+    if intent == 'hours':
+        return _answer_hours(facts, text, now or datetime.now(SAUDI_TZ), arabic)
+    if intent == 'pricing':
+        return _answer_pricing(facts, text, arabic)
+    if intent == 'services':
+        return _answer_services(facts, arabic)
+    return None
+
+def describe(facts: Optional[Dict[str, Any]]) -> str:
+    """The business's real hours and prices as prompt lines for the LLM"""
+    if not facts:
+        return ''
+    lines = []
+    if facts['services']:
+        lines.append('- Services: ' + ', '.join(
+            f"{s['name']} ({_format_price(s['price'])} SAR)" if s['price'] is not None else s['name']
+            for s in facts['services']))
+    if facts['hours']:
+        lines.append('- Hours: ' + ', '.join(
+            f"{DAYS_EN[i]} {slot[0]}-{slot[1]}" if slot else f"{DAYS_EN[i]} closed"
+            for i, slot in ((i, facts['hours'][day]) for i, day in enumerate(DAYS)) if slot != UNKNOWN))
+    return '\n'.join(lines)
+
+def answer(message: str, facts: Optional[Dict[str, Any]], now: Optional[datetime] = None,
+           classified: Optional[Tuple[str, float]] = None) -> Optional[Dict[str, Any]]:
+    """Templated answer from the business's own data, or None to hand the turn to the LLM"""
+    if not facts or not message:
+        return None
+    started = time.perf_counter()
+    intent, confidence = classify(message, classified)
+    response = None
+    if intent and confidence >= MIN_CONFIDENCE:
+        response = answer_intent(intent, message, facts, now)
+    metrics.observe_stage('fast_path', time.perf_counter() - started)
+    metrics.FAST_PATH.inc(intent or 'none', 'answered' if response else 'declined')
+    if not response:
+        return None
+    return {'response': response, 'intent': intent, 'confidence': confidence}
+
+def answer_for_business(message: str, business_id: Optional[int],
+                        classified: Optional[Tuple[str, float]] = None) -> Optional[Dict[str, Any]]:
+    if not business_id:
+        return None
+    return answer(message, facts_for(business_id), classified=classified)
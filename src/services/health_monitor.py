@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Any, Optional, Tuple
+import requests
+
+logger = logging.getLogger(__name__)
+
+CheckResult = Tuple[bool, str]
+
+class HealthMonitor:
+    """Runs health checks on a background thread and caches the results.
+
+    Probe endpoints only read the cached snapshot, so they cost a dict copy
+    and never make outbound calls themselves. Critical checks decide
+    readiness; non-critical ones (provider reachability) only mark the
+    instance as degraded because the rule-based fallback still answers.
+    """
+
+    def __init__(self, interval: float = 15.0, stale_after: Optional[float] = None):
+        self.interval = interval
+        self.stale_after = stale_after or interval * 3
+        self.checks: Dict[str, Tuple[Callable[[], CheckResult], bool]] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._last_run = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def register_check(self, name: str, check: Callable[[], CheckResult], critical: bool = True):
+        self.checks[name] = (check, critical)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_checks()
+            self._stop.wait(self.interval)
+
+    def run_checks(self):
+        results = {}
+        for name, (check, critical) in list(self.checks.items()):
+            started = time.perf_counter()
+            try:
+                ok, detail = check()
+            except Exception as e:
+                ok, detail = False, str(e)
+            results[name] = {
+                'ok': ok,
+                'critical': critical,
+                'detail': detail,
+                'latency_ms': round((time.perf_counter() - started) * 1000, 1)
+            }
+            if not ok:
+                logger.warning(f"Health check {name} failed: {detail}")
+
+        with self._lock:
+            self._results = results
+            self._last_run = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            results = dict(self._results)
+            last_run = self._last_run
+
+        age = time.time() - last_run if last_run else None
+        if age is None:
+            status = 'starting'
+        elif age > self.stale_after:
+            status = 'stale'
+        elif any(not r['ok'] and r['critical'] for r in results.values()):
+            status = 'unavailable'
+        elif any(not r['ok'] for r in results.values()):
+            status = 'degraded'
+        else:
+            status = 'ok'
+
+        return {
+            'status': status,
+            'ready': status in ('ok', 'degraded'),
+            'checked_seconds_ago': round(age, 1) if age is not None else None,
+            'checks': results
+        }
+
+_probe_session = requests.Session()
+
+def http_reachability_check(url: str, timeout: float = 3.0) -> Callable[[], CheckResult]:
+    """Reachable means any HTTP answer at all; 401/404 still prove the host and TLS work"""
+    def check() -> CheckResult:
+        response = _probe_session.head(url, timeout=timeout, allow_redirects=False)
+        if response.status_code >= 500:
+            return False, f"HTTP {response.status_code}"
+        return True, f"HTTP {response.status_code}"
+    return check
+
+def database_write_check(get_engine: Callable[[], Any]) -> Callable[[], CheckResult]:
+    """Open a transaction, write to a temp table and roll back"""
+    from sqlalchemy import text
+
+    def check() -> CheckResult:
+        with get_engine().connect() as connection:
+            transaction = connection.begin()
+            try:
+                connection.execute(text("CREATE TEMP TABLE IF NOT EXISTS health_probe (checked_at FLOAT)"))
+                connection.execute(text("INSERT INTO health_probe (checked_at) VALUES (:t)"), {'t': time.time()})
+            finally:
+                transaction.rollback()
+        return True, 'writable'
+    return check
@@ -0,0 +1,167 @@
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Base URLs, used for connection warming and the pool benchmark
+PROVIDER_BASE_URLS = {
+    'openai': 'https://api.openai.com/v1/models',
+    'groq': 'https://api.groq.com/openai/v1/models',
+    'anthropic': 'https://api.anthropic.com/v1/messages',
+    'elevenlabs': 'https://api.elevenlabs.io/v1/models',
+    'twilio': 'https://api.twilio.com/2010-04-01',
+}
+
+# Per-host pool sizing: (max connections, keep-alive connections). LLM calls
+# are long-lived streams, so they get the most headroom.
+POOL_LIMITS = {
+    'openai': (32, 16),
+    'groq': (32, 16),
+    'anthropic': (16, 8),
+    'elevenlabs': (16, 8),
+}
+DEFAULT_POOL_LIMITS = (8, 4)
+KEEPALIVE_EXPIRY = 120.0
+DNS_CACHE_ENTRIES = 256
+
+class _DnsCache:
+    """TTL cache in front of socket.getaddrinfo, opt-in with DNS_CACHE_TTL.
+
+    Provider hosts resolve to the same addresses for minutes at a time, so a
+    lookup per new connection is wasted latency on the turn that opens it.
+    It replaces getaddrinfo for the whole process, so it is off unless
+    asked for, and holds at most `max_entries` lookups (least recently
+    used go first).
+    """
+
+    def __init__(self, ttl: float, max_entries: int = DNS_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, list]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._original = socket.getaddrinfo
+
+    def getaddrinfo(self, host, port, *args, **kwargs):
+        key = (host, port, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+        result = self._original(host, port, *args, **kwargs)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def install(self):
+        socket.getaddrinfo = self.getaddrinfo
+
+class HttpPoolRegistry:
+    """Process-wide owner of every outbound HTTP connection pool.
+
+    Provider SDK clients are handed a shared httpx.Client (HTTP/2 when h2 is
+    installed, keep-alive otherwise) per provider host. Plain requests
+    callers share one requests.Session that retries connection failures,
+    and 502/503/504 only for idempotent methods. Twilio gets a session of
+    its own that never retries: the SMS outbox decides whether a message
+    may be sent again, and two retry layers would multiply the attempts.
+    Pools are created lazily and dropped in forked children so workers
+    never share sockets.
+    """
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._clients: Dict[str, httpx.Client] = {}
+        self._session: Optional[requests.Session] = None
+        self._twilio_session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    def httpx_client(self, provider: str) -> httpx.Client:
+        client = self._clients.get(provider)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(provider)
+                if client is None:
+                    max_connections, keepalive = POOL_LIMITS.get(provider, DEFAULT_POOL_LIMITS)
+                    client = httpx.Client(
+                        http2=HTTP2_AVAILABLE,
+                        limits=httpx.Limits(max_connections=max_connections,
+                                            max_keepalive_connections=keepalive,
+                                            keepalive_expiry=KEEPALIVE_EXPIRY),
+                        timeout=httpx.Timeout(self.timeout, connect=5.0)
+                    )
+                    self._clients[provider] = client
+        return client
+
+    @staticmethod
+    def _new_session(retries) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=retries)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def requests_session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._new_session(
+                        Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504]))
+        return self._session
+
+    def twilio_session(self) -> requests.Session:
+        if self._twilio_session is None:
+            with self._lock:
+                if self._twilio_session is None:
+                    self._twilio_session = self._new_session(0)
+        return self._twilio_session
+
+    def twilio_http_client(self):
+        """A TwilioHttpClient that sends through the shared, non-retrying Twilio session"""
+        from twilio.http.http_client import TwilioHttpClient
+        http_client = TwilioHttpClient(pool_connections=True, timeout=self.timeout)
+        http_client.session = self.twilio_session()
+        return http_client
+
+    def warm(self, provider: str):
+        """Open (or refresh) a pooled connection so the next real request skips the handshake"""
+        url = PROVIDER_BASE_URLS.get(provider)
+        if not url:
+            return
+        try:
+            self.httpx_client(provider).head(url, timeout=3.0)
+        except httpx.HTTPError as e:
+            logger.debug(f"Connection warm-up for {provider} failed: {str(e)}")
+
+    def reset(self):
+        """Forget pools inherited from a parent process"""
+        self._clients = {}
+        self._session = None
+        self._twilio_session = None
+        self._lock = threading.Lock()
+
+http_pools = HttpPoolRegistry()
+os.register_at_fork(after_in_child=http_pools.reset)
+
+if float(os.getenv('DNS_CACHE_TTL', '0')) > 0:
+    _DnsCache(float(os.environ['DNS_CACHE_TTL']),
+              int(os.getenv('DNS_CACHE_ENTRIES', str(DNS_CACHE_ENTRIES)))).install()
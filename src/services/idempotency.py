@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from src.services import metrics
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+class IdempotencyCache:
+    """Results of webhook handlers keyed by Twilio SID (plus turn), kept for `ttl` seconds.
+
+    Twilio retries a webhook that timed out or failed with the same
+    MessageSid/CallSid. `run(key, fn)` calls `fn` once per key: a retry
+    that arrives after the first attempt finished gets the stored result,
+    and one that arrives while it is still running waits for it (single
+    flight) instead of starting a second LLM call. Failures are not
+    stored, so a retry after an exception runs again. The cache is per
+    process; retries that land on another worker are not deduplicated.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10000, wait_timeout: float = 15.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: Optional[str], fn: Callable[[], Any]) -> Any:
+        if not key:
+            return fn()
+
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                metrics.IDEMPOTENCY.inc('replayed')
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            metrics.IDEMPOTENCY.inc('coalesced')
+            if not flight.done.wait(self.wait_timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight request {key}")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        metrics.IDEMPOTENCY.inc('executed')
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            self._store(key, flight.result)
+            return flight.result
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _store(self, key: str, result: Any):
+        with self._lock:
+            self._results[key] = (time.monotonic() + self.ttl, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+webhook_results = IdempotencyCache(ttl=float(os.getenv('WEBHOOK_IDEMPOTENCY_TTL', '300')))
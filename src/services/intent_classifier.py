@@ -0,0 +1,281 @@
+"""Intent classifier: hashed character n-grams scored against per-intent centroids.
+
+Text is lower-cased and normalize_arabic()'d, then every character 2-, 3-
+and 4-gram is hashed into one of DIM buckets (sublinear counts, L2
+normalized). An intent's centroid is the normalized mean of its training
+vectors, so scoring a batch is one gather and one segmented sum in
+NumPy: cosine similarity of every text to every centroid at once. Cosines are
+turned into probabilities by a softmax whose temperature is fitted on
+out-of-fold scores, so `confidence` means "right this often" and can gate
+the rule-based path against the LLM.
+
+The default model is trained from SEED_EXAMPLES on first use (tens of
+milliseconds). A model trained offline on real call
+transcripts is loaded instead when INTENT_MODEL_PATH points at one:
+
+    python -m src.services.intent_classifier train.jsonl --out instance/intent_model.npz
+
+where each line of train.jsonl is {"text": "...", "intent": "pricing"}.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.text_normalization import normalize_arabic
+
+logger = logging.getLogger(__name__)
+
+DIM_BITS = 16
+DIM = 1 << DIM_BITS
+NGRAMS = (2, 3, 4)
+_HASH_PRIME = np.uint64(1099511628211)
+_HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+_SEPARATOR = 0  # code point between texts in a batch; n-grams never span it
+
+GREETING = 'greeting'
+HOURS = 'hours'
+PRICING = 'pricing'
+SERVICES = 'services'
+BOOKING = 'booking'
+GENERAL = 'general'
+
+SEED_EXAMPLES: Dict[str, List[str]] = {
+    GREETING: [
+        'hello', 'hi', 'hi there', 'hey', 'good morning', 'good evening', 'good afternoon', 'hello, anyone there?',
+        'مرحبا', 'السلام عليكم', 'اهلا', 'اهلا وسهلا', 'صباح الخير', 'مساء الخير', 'هلا', 'السلام عليكم ورحمة الله',
+    ],
+    HOURS: [
+        'what are your hours', 'are you open today', 'are you open tomorrow', 'when do you open',
+        'when do you close', 'what time do you close today', 'are you closed on friday', 'opening hours please',
+        'is the clinic open now', 'what time do you open on sunday', 'are you open on the weekend',
+        'when are you open', 'what are your opening times', 'what time does the clinic close',
+        'until what time are you open', 'is the clinic open on saturday', 'what time do you open in the morning',
+        'what time do you close tonight',
+        'متى تفتحون', 'متى تقفلون', 'هل انتم مفتوحين اليوم', 'هل انتم مفتوحين غدا', 'ساعات العمل',
+        'ما هي ساعات الدوام', 'الدوام بكره', 'مفتوحين الحين', 'متى يبدا الدوام', 'هل العيادة مغلقة يوم الجمعة',
+        'مواعيد العمل', 'ما هي مواعيد العمل', 'مواعيد الدوام', 'اوقات الدوام', 'وش اوقات العمل عندكم',
+        'متى تسكرون', 'الى متى مفتوحين', 'هل تداومون يوم السبت', 'كم ساعة تشتغلون', 'مواعيد العمل يوم الخميس',
+        'متى ينتهي الدوام', 'هل تفتحون الجمعة', 'الساعة كم تقفلون',
+    ],
+    PRICING: [
+        'how much is a consultation', 'what is the price of an x-ray', 'how much does it cost', 'price list',
+        'what are your prices', 'how much for a cleaning', 'cost of lab tests', 'what is the fee for a check up',
+        'is it expensive', 'how much do you charge for whitening', 'what do you charge for a check up',
+        'what does a crown cost',
+        'كم السعر', 'كم سعر الكشف', 'كم سعر الاشعة', 'بكم التحليل', 'ما هي الاسعار', 'كم تكلفة الاستشارة',
+        'كم يكلف تنظيف الاسنان', 'الاسعار لو سمحت', 'كم سعر الجلسة',
+    ],
+    SERVICES: [
+        'what services do you offer', 'what do you do', 'do you do x-rays', 'do you offer lab tests',
+        'what treatments do you have', 'do you have a dentist', 'list of services', 'what can you help me with',
+        'do you do teeth whitening',
+        'ماذا تقدمون', 'وش تقدمون', 'ما هي خدماتكم', 'الخدمات المتوفرة', 'هل عندكم اشعة', 'هل تسوون تحاليل',
+        'هل يوجد طبيب اسنان', 'وش الخدمات عندكم',
+    ],
+    BOOKING: [
+        'i want to book an appointment', 'book me for tomorrow', 'can i schedule a visit', 'i need an appointment',
+        'reserve a slot for sunday at 5pm', 'can i come in tomorrow morning', 'i would like to make a booking',
+        'change my appointment', 'cancel my appointment', 'is there any availability this week',
+        'ابي احجز موعد', 'اريد حجز موعد', 'احجز لي بكره', 'ابغى موعد', 'ممكن موعد يوم الاحد',
+        'اريد الغاء الموعد', 'ابي اغير موعدي', 'هل فيه موعد متاح', 'حجز موعد مع الدكتور',
+        'please cancel my booking for tomorrow', 'can you book me in with the doctor', 'i need to reschedule', 'ابي الغي موعدي', 'ممكن اأجل الموعد',
+    ],
+    GENERAL: [
+        'do you accept insurance', 'i have a complaint', 'can i speak to a doctor', 'where are you located',
+        'my tooth hurts a lot what should i do', 'is parking available', 'i was charged twice',
+        'what is the weather like', 'tell me a joke', 'can you send me the results', 'thank you', 'ok',
+        'thanks a lot', 'i have a question about my bill',
+        'هل تقبلون التامين', 'عندي شكوى', 'ابي اكلم الدكتور', 'وين موقعكم', 'ضرسي يوجعني وش اسوي',
+        'شكرا', 'طيب', 'ابي النتائج', 'هل يوجد مواقف', 'عندي سؤال عن الفاتورة',
+    ],
+}
+
+def _codes(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Code points of all texts joined by separators, the separator mask and each position's text index"""
+    padded = [' ' + ' '.join(normalize_arabic(text.lower()).split()) + ' ' for text in texts]
+    joined = '\x00'.join(padded)
+    codes = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    separators = codes == _SEPARATOR
+    rows = np.cumsum(separators, dtype=np.uint64)
+    return codes, separators, rows
+
+def featurize(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sparse features for a batch: (row, bucket, weight) triples, rows L2-normalized"""
+    codes, separators, rows = _codes(texts)
+    seen_separators = np.concatenate(([0], np.cumsum(separators)))
+    keys = []
+    for n in NGRAMS:
+        count = len(codes) - n + 1
+        if count <= 0:
+            continue
+        hashed = np.full(count, n, dtype=np.uint64)
+        for offset in range(n):
+            hashed = hashed * _HASH_PRIME + codes[offset:offset + count]
+        valid = seen_separators[n:n + count] == seen_separators[:count]
+        buckets = (hashed[valid] * _HASH_MIX) >> np.uint64(64 - DIM_BITS)
+        keys.append(rows[:count][valid] * DIM + buckets)
+    if not keys:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.float32)
+    unique, counts = np.unique(np.concatenate(keys), return_counts=True)
+    row = (unique >> np.uint64(DIM_BITS)).astype(np.int64)
+    bucket = (unique & np.uint64(DIM - 1)).astype(np.int64)
+    weight = (1.0 + np.log(counts)).astype(np.float32)
+    norms = np.sqrt(np.bincount(row, weights=weight * weight, minlength=len(texts)))
+    weight /= norms[row].astype(np.float32)
+    return row, bucket, weight
+
+def _cosines(centroids: np.ndarray, texts: Sequence[str]) -> np.ndarray:
+    """(len(texts), intents) cosine similarities; centroids is (DIM, intents), unit columns"""
+    row, bucket, weight = featurize(texts)
+    scores = np.zeros((len(texts), centroids.shape[1]), dtype=np.float32)
+    if len(row):
+        # Rows come out of np.unique sorted, so each text's features are one contiguous segment
+        present = np.bincount(row, minlength=len(texts)) > 0
+        starts = np.searchsorted(row, np.flatnonzero(present))
+        scores[present] = np.add.reduceat(centroids[bucket] * weight[:, None], starts)
+    return scores
+
+def _softmax(scores: np.ndarray, temperature: float) -> np.ndarray:
+    logits = scores * temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+def _centroids(texts: Sequence[str], label_ids: np.ndarray, intents: int) -> np.ndarray:
+    row, bucket, weight = featurize(texts)
+    centroids = np.zeros((DIM, intents), dtype=np.float32)
+    np.add.at(centroids, (bucket, label_ids[row]), weight)
+    norms = np.linalg.norm(centroids, axis=0)
+    return centroids / np.where(norms > 0, norms, 1.0)
+
+class IntentClassifier:
+    def __init__(self, labels: Sequence[str], centroids: np.ndarray, temperature: float):
+        self.labels = list(labels)
+        self.centroids = centroids
+        self.temperature = temperature
+
+    @classmethod
+    def train(cls, examples: Iterable[Tuple[str, str]], folds: int = 5, seed: int = 0) -> 'IntentClassifier':
+        """Fit centroids on all examples and the softmax temperature on out-of-fold cosines"""
+        texts, intents = zip(*examples)
+        labels = sorted(set(intents))
+        label_ids = np.array([labels.index(intent) for intent in intents])
+        order = np.random.default_rng(seed).permutation(len(texts))
+        held_out = np.zeros((len(texts), len(labels)), dtype=np.float32)
+        for fold in range(folds):
+            test = order[fold::folds]
+            train = np.setdiff1d(order, test)
+            centroids = _centroids([texts[i] for i in train], label_ids[train], len(labels))
+            held_out[test] = _cosines(centroids, [texts[i] for i in test])
+
+        # Temperature with the lowest held-out log loss
+        best_temperature, best_loss = 1.0, float('inf')
+        for temperature in np.geomspace(1.0, 200.0, 80):
+            probabilities = _softmax(held_out, temperature)
+            loss = -np.mean(np.log(probabilities[np.arange(len(texts)), label_ids] + 1e-9))
+            if loss < best_loss:
+                best_temperature, best_loss = float(temperature), loss
+        return cls(labels, _centroids(texts, label_ids, len(labels)), best_temperature)
+
+    @classmethod
+    def load(cls, path: str) -> 'IntentClassifier':
+        with np.load(path) as data:
+            if int(data['dim']) != DIM:
+                raise ValueError(f"{path} was trained with {int(data['dim'])} buckets, expected {DIM}")
+            return cls([str(label) for label in data['labels']], data['centroids'], float(data['temperature']))
+
+    def save(self, path: str):
+        np.savez_compressed(path, labels=np.array(self.labels), centroids=self.centroids,
+                            temperature=self.temperature, dim=DIM)
+
+    def probabilities(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), len(labels)) calibrated intent probabilities"""
+        return _softmax(_cosines(self.centroids, texts), self.temperature)
+
+    def classify_batch(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        if not texts:
+            return []
+        probabilities = self.probabilities(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[index], float(probabilities[row, index])) for row, index in enumerate(best)]
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Most likely intent and its probability; empty text is GENERAL with no confidence"""
+        if not text or not text.strip():
+            return GENERAL, 0.0
+        return self.classify_batch([text])[0]
+
+    def ranked(self, text: str) -> List[Tuple[str, float]]:
+        probabilities = self.probabilities([text])[0]
+        return sorted(zip(self.labels, probabilities.tolist()), key=lambda item: -item[1])
+
+def seed_examples() -> List[Tuple[str, str]]:
+    return [(text, intent) for intent, texts in SEED_EXAMPLES.items() for text in texts]
+
+class _LazyClassifier:
+    """Trains or loads the process-wide model on first use, once"""
+
+    def __init__(self):
+        self._model: Optional[IntentClassifier] = None
+        self._lock = threading.Lock()
+
+    def model(self) -> IntentClassifier:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._build()
+        return self._model
+
+    def _build(self) -> IntentClassifier:
+        path = os.getenv('INTENT_MODEL_PATH')
+        if path:
+            try:
+                model = IntentClassifier.load(path)
+                logger.info(f"Loaded intent model from {path} ({len(model.labels)} intents)")
+                return model
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Could not load intent model {path}, training from seed examples: {str(e)}")
+        started = time.perf_counter()
+        model = IntentClassifier.train(seed_examples())
+        logger.info(f"Trained seed intent model in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return model
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        return self.model().classify(text)
+
+    def classify_batch(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        return self.model().classify_batch(texts)
+
+    def ranked(self, text: str) -> List[Tuple[str, float]]:
+        return self.model().ranked(text)
+
+intents = _LazyClassifier()
+
+def _read_examples(path: str) -> List[Tuple[str, str]]:
+    with open(path, encoding='utf-8') as f:
+        return [(record['text'], record['intent']) for record in map(json.loads, filter(str.strip, f))]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the intent classifier from labeled utterances')
+    parser.add_argument('examples', help='JSONL of {"text", "intent"}')
+    parser.add_argument('--out', required=True, help='model file to write (.npz)')
+    parser.add_argument('--with-seed', action='store_true', help='also train on SEED_EXAMPLES')
+    args = parser.parse_args(argv)
+
+    examples = _read_examples(args.examples) + (seed_examples() if args.with_seed else [])
+    started = time.perf_counter()
+    model = IntentClassifier.train(examples)
+    model.save(args.out)
+    print(f"{len(examples)} examples, {len(model.labels)} intents, temperature {model.temperature:.1f}, "
+          f"trained in {time.perf_counter() - started:.2f}s -> {args.out}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
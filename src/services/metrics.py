@@ -0,0 +1,358 @@
+import atexit
+import bisect
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Seconds; tuned for voice turns where anything above ~2s is audible silence
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    """Monotonic counter keyed by label values, passed positionally"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            return [[list(labelvalues), value] for labelvalues, value in self._values.items()]
+
+    def absorb(self, samples: list):
+        for labelvalues, value in samples:
+            self.inc(*labelvalues, amount=value)
+
+    def empty_copy(self) -> 'Counter':
+        return Counter(self.name, self.help_text, self.labelnames)
+
+    def reset(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {value}')
+        return lines
+
+class Histogram:
+    """Fixed-bucket histogram. observe() is one bisect and three additions under a lock."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> list:
+        with self._lock:
+            return [[list(labelvalues), list(series[0]), series[1], series[2]]
+                    for labelvalues, series in self._series.items()]
+
+    def absorb(self, samples: list):
+        with self._lock:
+            for labelvalues, counts, total, count in samples:
+                series = self._series.setdefault(tuple(labelvalues), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                series[0] = [mine + theirs for mine, theirs in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+
+    def empty_copy(self) -> 'Histogram':
+        return Histogram(self.name, self.help_text, self.labelnames, self.buckets)
+
+    def reset(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, *labelvalues):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        for labelvalues, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _format_labels(self.labelnames, labelvalues, 'le="' + le + '"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+        self.shared: Optional['SharedMetricsDir'] = None
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help_text, labelnames, buckets))
+
+    def samples(self) -> Dict[str, list]:
+        return {name: metric.samples() for name, metric in list(self.metrics.items())}
+
+    def absorb(self, samples: Dict[str, list]):
+        for name, metric_samples in samples.items():
+            metric = self.metrics.get(name)
+            if metric is not None:
+                metric.absorb(metric_samples)
+
+    def empty_copy(self) -> 'MetricsRegistry':
+        copy = MetricsRegistry()
+        copy.metrics = {name: metric.empty_copy() for name, metric in self.metrics.items()}
+        return copy
+
+    def share(self, directory: str, interval: float = 5.0):
+        """Report every process writing to `directory` from render(), not just this one"""
+        self.shared = SharedMetricsDir(self, directory, interval)
+        self.shared.start()
+
+    def render(self) -> str:
+        source = self.shared.collect() if self.shared else self
+        lines = []
+        for metric in list(source.metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """After fork: the child starts from zero, since the parent's counts are the parent's to report"""
+        for metric in list(self.metrics.values()):
+            metric.reset()
+        if self.shared:
+            self.shared.start()
+
+class SharedMetricsDir:
+    """Multi-process metrics through a directory every worker can write to.
+
+    Each process writes its samples to its own JSON file every `interval`
+    seconds, on exit and before rendering, and /metrics on any worker sums
+    every file. Files of processes that have exited (gunicorn recycles
+    workers after --max-requests) are folded into one archive file under a
+    lock so the totals stay monotonic without the directory growing.
+    Clear the directory when the server is deployed, as with
+    prometheus_client's multiprocess mode.
+    """
+
+    ARCHIVE = 'metrics-archive.json'
+
+    def __init__(self, registry: MetricsRegistry, directory: str, interval: float = 5.0):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self.path = ''
+        self._stop = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.write)
+
+    def start(self):
+        """(Re)start flushing for the current process under a file named after its pid"""
+        self.path = os.path.join(self.directory, f"metrics-{os.getpid()}-{time.time_ns()}.json")
+        self._stop = threading.Event()
+        threading.Thread(target=self._run, args=(self._stop,), name='metrics-flush', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        atexit.unregister(self.write)
+
+    def _run(self, stop: threading.Event):
+        while not stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning(f"Writing metrics to {self.directory} failed: {str(e)}")
+
+    def write(self):
+        self._dump(self.path, self.registry.samples())
+
+    def collect(self) -> MetricsRegistry:
+        """This process's samples plus every other process's latest file"""
+        self.write()
+        merged = self.registry.empty_copy()
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive_path = os.path.join(self.directory, self.ARCHIVE)
+            archive = self.registry.empty_copy()
+            archive.absorb(self._load(archive_path))
+            dead = [path for path in glob.glob(os.path.join(self.directory, 'metrics-*-*.json'))
+                    if path != self.path and not _alive(path)]
+            for path in dead:
+                archive.absorb(self._load(path))
+            if dead:
+                self._dump(archive_path, archive.samples())
+                for path in dead:
+                    os.unlink(path)
+            merged.absorb(archive.samples())
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*-*.json')):
+                merged.absorb(self._load(path))
+        return merged
+
+    @staticmethod
+    def _load(path: str) -> Dict[str, list]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _dump(path: str, samples: Dict[str, list]):
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(samples, f)
+        os.replace(temporary, path)  # readers never see a half-written file
+
+def _alive(path: str) -> bool:
+    pid = int(os.path.basename(path).split('-')[1])
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+registry = MetricsRegistry()
+if os.getenv('METRICS_MULTIPROC_DIR'):
+    registry.share(os.environ['METRICS_MULTIPROC_DIR'])
+os.register_at_fork(after_in_child=registry.reset)
+
+TURN_STAGE_SECONDS = registry.histogram(
+    'voice_turn_stage_seconds',
+    'Time spent in each stage of a call or message turn',
+    ['stage']
+)
+LLM_REQUESTS = registry.counter(
+    'llm_requests_total',
+    'LLM requests by provider and outcome',
+    ['provider', 'outcome']
+)
+INTENTS = registry.counter(
+    'intents_detected_total',
+    'Detected intents',
+    ['intent']
+)
+BUSINESS_TURNS = registry.counter(
+    'business_turns_total',
+    'Conversation turns handled per business and channel',
+    ['business_id', 'channel']
+)
+FAST_PATH = registry.counter(
+    'fast_path_turns_total',
+    'Turns offered to the rule-based fast path by intent and outcome (answered or declined)',
+    ['intent', 'outcome']
+)
+SMS_OUTBOX = registry.counter(
+    'sms_outbox_total',
+    'Asynchronous SMS replies by outcome (queued, rejected, retried, sent, failed)',
+    ['outcome']
+)
+IDEMPOTENCY = registry.counter(
+    'webhook_idempotency_total',
+    'Webhook deliveries by outcome (executed, replayed from cache, coalesced with an in-flight duplicate)',
+    ['outcome']
+)
+ADMISSION = registry.counter(
+    'admission_decisions_total',
+    'Admission decisions by traffic class and outcome (admitted, shed, llm_admitted, llm_shed, llm_timeout)',
+    ['traffic_class', 'outcome']
+)
+TENANT_THROTTLED = registry.counter(
+    'tenant_llm_throttled_total',
+    'LLM calls refused by a per-business budget (requests or tokens) and answered by the fast path',
+    ['business_id', 'budget']
+)
+LLM_TOKENS = registry.counter(
+    'llm_tokens_total',
+    'LLM tokens used per business, provider and kind (prompt or completion)',
+    ['business_id', 'provider', 'kind']
+)
+LLM_COST = registry.counter(
+    'llm_cost_usd_total',
+    'Estimated LLM spend in USD per business and provider',
+    ['business_id', 'provider']
+)
+MODEL_ROUTES = registry.counter(
+    'llm_model_routes_total',
+    'LLM turns by model tier (fast or large) and routing intent',
+    ['tier', 'intent']
+)
+CALL_PRELOAD = registry.counter(
+    'call_preload_total',
+    'Call sessions preloaded at the voice webhook by outcome (ready, failed, skipped, inline)',
+    ['outcome']
+)
+CACHE_REQUESTS = registry.counter(
+    'cache_requests_total',
+    'Cache lookups by cache and result (hit or miss)',
+    ['cache', 'result']
+)
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time one turn stage: `with stage_timer('tts'): ...`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage duration; inside a traced call it also becomes a child span"""
+    TURN_STAGE_SECONDS.observe(seconds, stage)
+    tracer.record_span(stage, seconds)
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
@@ -0,0 +1,116 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+from src.services import metrics
+from src.services.intent_classifier import intents
+from src.services.text_normalization import is_arabic
+
+logger = logging.getLogger(__name__)
+
+FAST = 'fast'
+LARGE = 'large'
+
+# Fast-tier model per provider. The large tier is the business's own model
+# (ai_config "model", else the provider default), so routing only ever moves
+# turns to something cheaper unless a tier in ai_config names a model. Each
+# fast model must differ from the provider default in PROVIDERS, or the fast
+# tier only changes max_tokens
+TIER_MODELS = {
+    FAST: {
+        'openai': 'gpt-4.1-nano',
+        'groq': 'llama3-8b-8192',
+        'anthropic': 'claude-3-5-haiku-20241022',
+        'gemini': 'gemini-1.5-flash-8b',
+    },
+    LARGE: {},
+}
+TIER_MAX_TOKENS = {FAST: 80, LARGE: 150}
+
+# The detectors in main, VoiceService and ConversationEngine name intents differently
+INTENT_ALIASES = {
+    'hours_tomorrow': 'hours',
+    'hours_inquiry': 'hours',
+    'time_query': 'hours',
+    'pricing_inquiry': 'pricing',
+    'service_inquiry': 'services',
+    'general_inquiry': 'general',
+}
+# Short factual answers the small model gets right; everything else needs the large one
+DEFAULT_INTENT_TIERS = {
+    'greeting': FAST,
+    'hours': FAST,
+    'pricing': FAST,
+    'services': FAST,
+    'off_topic': FAST,
+    'booking': LARGE,
+    'general': LARGE,
+}
+LONG_CONVERSATION_TURNS = 6
+
+@dataclass(frozen=True)
+class Route:
+    tier: str
+    provider: Optional[str]
+    model: Optional[str]
+    max_tokens: int
+    reason: str
+
+def normalize_intent(intent: Optional[str]) -> str:
+    intent = (intent or 'general').lower()
+    return INTENT_ALIASES.get(intent, intent)
+
+def detect_turn_intent(message: str) -> str:
+    """Routing intent for a message when the caller has none of its own (offline evaluation)"""
+    return intents.classify(message)[0]
+
+def route(intent: Optional[str], message: str = '', turn: int = 0, ai_config: Optional[Dict[str, Any]] = None,
+          default_provider: Optional[str] = None) -> Route:
+    """Pick the tier, model and max_tokens for one turn.
+
+    The tier comes from ai_config["model_routing"] when the business set
+    one ({"intents": {"pricing": "large"}, "languages": {"ar": "large"},
+    "long_conversation_turns": 4, "tiers": {"fast": {"provider", "model",
+    "max_tokens"}}}), otherwise from DEFAULT_INTENT_TIERS. Conversations
+    past `long_conversation_turns` always use the large tier, since a
+    long exchange usually means the small answers weren't enough. Setting
+    "model_routing": false keeps the business on its single model.
+    """
+    config = ai_config or {}
+    policy = config.get('model_routing', {})
+    intent = normalize_intent(intent)
+    provider = config.get('provider') or default_provider
+    if policy is False:
+        return Route(LARGE, provider, config.get('model'), config.get('max_tokens') or TIER_MAX_TOKENS[LARGE], 'disabled')
+    policy = policy or {}
+
+    language = 'ar' if message and is_arabic(message) else 'en'
+    long_after = policy.get('long_conversation_turns', LONG_CONVERSATION_TURNS)
+    if turn >= long_after:
+        tier, reason = LARGE, 'long_conversation'
+    elif language in policy.get('languages', {}):
+        tier, reason = policy['languages'][language], f'language:{language}'
+    else:
+        tier = policy.get('intents', {}).get(intent) or DEFAULT_INTENT_TIERS.get(intent, LARGE)
+        reason = f'intent:{intent}'
+    if tier not in TIER_MODELS:
+        logger.warning(f"Unknown model tier {tier!r} in model_routing, using {LARGE}")
+        tier = LARGE
+
+    settings = policy.get('tiers', {}).get(tier, {})
+    provider = settings.get('provider') or provider
+    model = settings.get('model') or TIER_MODELS[tier].get(provider) or config.get('model')
+    max_tokens = settings.get('max_tokens') or TIER_MAX_TOKENS[tier]
+    if tier == LARGE and not settings.get('max_tokens'):
+        max_tokens = config.get('max_tokens') or max_tokens
+    metrics.MODEL_ROUTES.inc(tier, intent)
+    return Route(tier, provider, model, max_tokens, reason)
+
+def routed_config(ai_config: Optional[Dict[str, Any]], selected: Route) -> Dict[str, Any]:
+    """ai_config for providers.chat() with the route's provider, model and max_tokens"""
+    config = dict(ai_config or {})
+    if selected.provider:
+        config['provider'] = selected.provider
+    if selected.model:
+        config['model'] = selected.model
+    config['max_tokens'] = selected.max_tokens
+    return config
@@ -0,0 +1,89 @@
+import base64
+import binascii
+import json
+from urllib.parse import urlencode
+from typing import Dict, Any, Callable, Iterable, List, Optional, Sequence, Tuple
+from flask import Response, request, stream_with_context
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+CHUNK_ITEMS = 50  # items serialized per chunk written to the socket
+
+def encode_cursor(key: Any) -> str:
+    """Opaque cursor for the last item of a page; clients pass it back unchanged"""
+    raw = json.dumps(key, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Any:
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('cursor is not valid')
+
+def decode_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Cursor of a list ordered by integer primary key"""
+    key = decode_cursor(cursor)
+    if key is not None and (isinstance(key, bool) or not isinstance(key, int)):
+        raise ValueError('cursor is not valid')
+    return key
+
+def parse_limit(default: int = DEFAULT_LIMIT) -> int:
+    return min(max(request.args.get('limit', default, type=int), 1), MAX_LIMIT)
+
+def parse_fields(allowed: Sequence[str], default: Optional[Sequence[str]] = None) -> List[str]:
+    """?fields=id,name -> ['id', 'name']; every field in `allowed` (or `default`) when absent"""
+    raw = request.args.get('fields')
+    if not raw:
+        return list(default or allowed)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}")
+    if 'id' in allowed and 'id' not in fields:
+        fields.insert(0, 'id')  # the cursor is built from it
+    return fields
+
+def keyset(query, column, after: Any, limit: int, descending: bool = False) -> List[Any]:
+    """limit + 1 rows after the cursor value, seeking on an indexed unique column instead of OFFSET"""
+    if after is not None:
+        query = query.filter(column < after if descending else column > after)
+    return query.order_by(column.desc() if descending else column.asc()).limit(limit + 1).all()
+
+def split_page(rows: List[Any], limit: int, key: Callable[[Any], Any]) -> Tuple[List[Any], Optional[str]]:
+    """Rows were fetched with limit + 1; the extra row only says whether a next page exists"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key(rows[-1]))
+
+def stream_page(collection: str, items: Iterable[Dict[str, Any]], next_cursor: Optional[str],
+                limit: int, extra: Optional[Dict[str, Any]] = None) -> Response:
+    """Stream {"success", <collection>: [...], "next_cursor", "limit"} without building the body in memory.
+
+    The next page is also advertised in a Link header (rel="next") so clients
+    can page without parsing the body.
+    """
+    head = {'success': True, **(extra or {})}
+
+    def generate():
+        yield json.dumps(head, ensure_ascii=False)[:-1] + f', "{collection}": ['
+        chunk = []
+        first = True
+        for item in items:
+            chunk.append(json.dumps(item, ensure_ascii=False, default=str))
+            if len(chunk) >= CHUNK_ITEMS:
+                yield ('' if first else ',') + ','.join(chunk)
+                first = False
+                chunk = []
+        if chunk:
+            yield ('' if first else ',') + ','.join(chunk)
+        yield '], ' + json.dumps({'next_cursor': next_cursor, 'limit': limit})[1:]
+
+    headers = {}
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return Response(stream_with_context(generate()), mimetype='application/json', headers=headers)
@@ -0,0 +1,383 @@
+"""Pre-rendered phrase audio for templated replies.
+
+Fast-path replies are built from a handful of fixed phrases around
+weekdays, prices and times ("Yes, we're open today (Monday) from 9:00 AM to
+5:00 PM."). Instead of a TTS round-trip per reply, every fragment those
+templates can produce is synthesized once per voice, offline:
+
+    python -m src.services.phrase_audio VOICE_ID --extra service_names.txt
+
+The library holds fixed phrases and weekday names, numbers up to 9999 in
+Arabic and English, hours, minutes and AM/PM, plus any business-specific
+phrases (service and business names) from --extra. Fragments are kept as
+8 kHz 16-bit PCM with the silence trimmed off both ends. At runtime a
+reply is split into fragments with a longest-match over its words, and
+the pieces are joined with short equal-power crossfades and pauses at
+punctuation into one telephony-ready buffer. A reply with any word the
+library doesn't have returns None and goes to TTS as before.
+"""
+import argparse
+import io
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.services import metrics
+from src.services.audio_transcode import decode_ulaw
+from src.services.text_normalization import normalize_arabic, is_arabic
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 8000
+CROSSFADE_MS = 12
+EDGE_MS = 15  # kept on each side of a fragment when trimming silence
+SILENCE_THRESHOLD = 400  # int16 amplitude below which a fragment edge counts as silence
+PAUSES_MS = {',': 120, '،': 120, ':': 120, ';': 160, '.': 280, '!': 280, '?': 280, '؟': 280}
+MAX_NUMBER = 9999
+LIBRARY_DIR = os.getenv('PHRASE_AUDIO_DIR', os.path.join('instance', 'phrase_audio'))
+ELEVENLABS_FORMAT = 'ulaw_8000'
+
+# The fixed wording of the fast-path templates (src.services.fast_path), split
+# around their variable parts. Longer phrases win, so the common openings
+# are recorded whole and sound natural.
+PHRASES = {
+    'en': [
+        "Yes, we're open today", "Yes, we're open tomorrow", "No, we're closed today",
+        "No, we're closed tomorrow", "We're open", "today", "tomorrow", "from", "to",
+        "The price for", "is", "SAR", "minutes", "Would you like to book an appointment?",
+        "Our prices", "At", "we offer", "How can I help you?",
+        'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday',
+    ],
+    'ar': [
+        'نعم، نحن مفتوحون اليوم', 'نعم، نحن مفتوحون غداً', 'لا، نحن مغلقون اليوم',
+        'لا، نحن مغلقون غداً', 'نفتح يوم', 'اليوم', 'غداً', 'من', 'إلى', 'سعر', 'هو', 'ريال',
+        'المدة', 'دقيقة', 'هل تود حجز موعد؟', 'أسعارنا', 'نقدم في', 'كيف يمكنني مساعدتك؟',
+        'الاثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت', 'الأحد',
+    ],
+}
+
+EN_ONES = ['zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten',
+           'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen', 'eighteen',
+           'nineteen']
+EN_TENS = ['', '', 'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety']
+AR_ONES = ['صفر', 'واحد', 'اثنان', 'ثلاثة', 'أربعة', 'خمسة', 'ستة', 'سبعة', 'ثمانية', 'تسعة', 'عشرة',
+           'أحد عشر', 'اثنا عشر', 'ثلاثة عشر', 'أربعة عشر', 'خمسة عشر', 'ستة عشر', 'سبعة عشر',
+           'ثمانية عشر', 'تسعة عشر']
+AR_TENS = ['', '', 'عشرون', 'ثلاثون', 'أربعون', 'خمسون', 'ستون', 'سبعون', 'ثمانون', 'تسعون']
+AR_HUNDREDS = ['', 'مئة', 'مئتان', 'ثلاثمئة', 'أربعمئة', 'خمسمئة', 'ستمئة', 'سبعمئة', 'ثمانمئة', 'تسعمئة']
+AR_THOUSANDS = ['', 'ألف', 'ألفان', 'ثلاثة آلاف', 'أربعة آلاف', 'خمسة آلاف', 'ستة آلاف', 'سبعة آلاف',
+                'ثمانية آلاف', 'تسعة آلاف']
+AR_HOURS = ['الثانية عشرة', 'الواحدة', 'الثانية', 'الثالثة', 'الرابعة', 'الخامسة', 'السادسة', 'السابعة',
+            'الثامنة', 'التاسعة', 'العاشرة', 'الحادية عشرة', 'الثانية عشرة']
+AR_MINUTES = {15: 'والربع', 20: 'والثلث', 30: 'والنصف'}
+
+TOKEN_PATTERN = re.compile(
+    r"(?P<time>(\d{1,2}):(\d{2})\s*(am|pm|صباحا|مساء))"
+    r"|(?P<number>\d+(?:\.\d+)?)"
+    r"|(?P<word>[^\W\d_]+(?:'[^\W\d_]+)*)"
+    r"|(?P<pause>[.,،:;!?؟])"
+)
+
+def normalize(text: str) -> str:
+    return normalize_arabic(text.lower())
+
+def _en_below_100(n: int) -> str:
+    if n < 20:
+        return EN_ONES[n]
+    return EN_TENS[n // 10] + (f"-{EN_ONES[n % 10]}" if n % 10 else '')
+
+def _ar_below_100(n: int) -> str:
+    if n < 20:
+        return AR_ONES[n]
+    return (f"{AR_ONES[n % 10]} و" if n % 10 else '') + AR_TENS[n // 10]
+
+def inventory(extra_phrases: Iterable[str] = ()) -> Dict[str, str]:
+    """Every fragment key the library records, with the text sent to TTS for it"""
+    fragments = {}
+    for phrases in (*PHRASES.values(), extra_phrases):
+        for phrase in phrases:
+            words = _words(phrase)
+            if words:
+                fragments[f"say:{' '.join(words)}"] = phrase.strip()
+    for n in range(100):
+        fragments[f"en.num:{n}"] = _en_below_100(n)
+        fragments[f"ar.num:{n}"] = _ar_below_100(n)
+        if n:
+            fragments[f"ar.andnum:{n}"] = f"و{_ar_below_100(n)}"
+    for d in range(1, 10):
+        fragments[f"en.num:{d * 100}"] = f"{EN_ONES[d]} hundred"
+        fragments[f"en.num:{d * 1000}"] = f"{EN_ONES[d]} thousand"
+        fragments[f"ar.num:{d * 100}"] = AR_HUNDREDS[d]
+        fragments[f"ar.andnum:{d * 100}"] = f"و{AR_HUNDREDS[d]}"
+        fragments[f"ar.num:{d * 1000}"] = AR_THOUSANDS[d]
+    fragments['en.point:'] = 'point'
+    fragments['ar.point:'] = 'فاصلة'
+    for hour in range(1, 13):
+        fragments[f"en.hour:{hour}"] = EN_ONES[hour]
+        fragments[f"ar.hour:{hour}"] = AR_HOURS[hour]
+    for minute in range(1, 60):
+        fragments[f"en.minute:{minute}"] = f"oh {EN_ONES[minute]}" if minute < 10 else _en_below_100(minute)
+        if minute in AR_MINUTES:
+            fragments[f"ar.minute:{minute}"] = AR_MINUTES[minute]
+        else:
+            unit = 'دقائق' if 3 <= minute <= 10 else 'دقيقة'
+            fragments[f"ar.minute:{minute}"] = f"و{_ar_below_100(minute)} {unit}"
+    fragments['en.ampm:am'] = 'a.m.'
+    fragments['en.ampm:pm'] = 'p.m.'
+    fragments['ar.ampm:صباحا'] = 'صباحاً'
+    fragments['ar.ampm:مساء'] = 'مساءً'
+    return fragments
+
+def _words(text: str) -> List[str]:
+    return [match.group('word') for match in TOKEN_PATTERN.finditer(normalize(text)) if match.group('word')]
+
+def number_keys(lang: str, value: str) -> Optional[List[str]]:
+    """Fragment keys that read out a price like '1250' or '99.5'; None past MAX_NUMBER"""
+    whole, _, decimals = value.partition('.')
+    n = int(whole)
+    if n > MAX_NUMBER:
+        return None
+    parts = [part for part in (n // 1000 * 1000, n % 1000 // 100 * 100, n % 100) if part] or [0]
+    # Arabic joins the parts with 'wa': 'alf wa-khamsumi'a wa-khamsun'
+    keys = [f"{lang}.{'andnum' if lang == 'ar' and index else 'num'}:{part}" for index, part in enumerate(parts)]
+    if decimals:
+        keys.append(f"{lang}.point:")
+        keys.extend(f"{lang}.num:{digit}" for digit in decimals)
+    return keys
+
+def time_keys(lang: str, hour: int, minute: int, meridiem: str) -> List[str]:
+    keys = [f"{lang}.hour:{hour % 12 or 12}"]
+    if minute:
+        keys.append(f"{lang}.minute:{minute}")
+    keys.append(f"{lang}.ampm:{meridiem}")
+    return keys
+
+def trim_silence(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    loud = np.flatnonzero(np.abs(pcm.astype(np.int32)) > SILENCE_THRESHOLD)
+    if not len(loud):
+        return pcm[:0]
+    edge = sample_rate * EDGE_MS // 1000
+    return pcm[max(loud[0] - edge, 0):loud[-1] + edge + 1]
+
+def stitch(pieces: List[np.ndarray], sample_rate: int = SAMPLE_RATE,
+           crossfade_ms: int = CROSSFADE_MS) -> np.ndarray:
+    """Join int16 pieces into one buffer, overlapping neighbours with an equal-power crossfade"""
+    pieces = [piece for piece in pieces if len(piece)]
+    if not pieces:
+        return np.zeros(0, dtype=np.int16)
+    crossfade = sample_rate * crossfade_ms // 1000
+    overlaps = [min(crossfade, len(a) // 2, len(b) // 2) for a, b in zip(pieces, pieces[1:])] + [0]
+    out = np.zeros(sum(len(piece) for piece in pieces) - sum(overlaps), dtype=np.float32)
+    position, fade_in = 0, 0
+    for piece, fade_out in zip(pieces, overlaps):
+        chunk = piece.astype(np.float32)
+        if fade_in:
+            chunk[:fade_in] *= _ramp(fade_in)[::-1]
+        if fade_out:
+            chunk[-fade_out:] *= _ramp(fade_out)
+        out[position:position + len(chunk)] += chunk
+        position += len(chunk) - fade_out
+        fade_in = fade_out
+    return np.clip(out, -32768, 32767).astype(np.int16)
+
+_ramps: Dict[int, np.ndarray] = {}
+
+def _ramp(length: int) -> np.ndarray:
+    """cos() from 1 down to 0; reversed it is the matching sin() fade-in"""
+    ramp = _ramps.get(length)
+    if ramp is None:
+        ramp = _ramps[length] = np.cos(np.linspace(0, np.pi / 2, length, dtype=np.float32))
+    return ramp
+
+def to_wav(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.astype('<i2', copy=False).tobytes())
+    return buffer.getvalue()
+
+class PhraseLibrary:
+    """One voice's fragments, stored as a single PCM buffer with offsets"""
+
+    def __init__(self, voice_id: str, fragments: Dict[str, np.ndarray], sample_rate: int = SAMPLE_RATE):
+        self.voice_id = voice_id
+        self.fragments = fragments
+        self.sample_rate = sample_rate
+        self.phrases = {key[4:]: key for key in fragments if key.startswith('say:')}
+        self.max_words = max((phrase.count(' ') + 1 for phrase in self.phrases), default=0)
+        self._silences = {char: np.zeros(sample_rate * ms // 1000, dtype=np.int16)
+                          for char, ms in PAUSES_MS.items()}
+
+    @classmethod
+    def load(cls, path: str, voice_id: Optional[str] = None) -> 'PhraseLibrary':
+        with np.load(path) as data:
+            pcm, offsets = data['pcm'], data['offsets']
+            fragments = {str(key): pcm[start:end]
+                         for key, start, end in zip(data['keys'], offsets[:-1], offsets[1:])}
+            return cls(voice_id or str(data['voice_id']), fragments, int(data['sample_rate']))
+
+    def save(self, path: str):
+        keys = list(self.fragments)
+        lengths = [len(self.fragments[key]) for key in keys]
+        np.savez_compressed(path, keys=np.array(keys), offsets=np.concatenate([[0], np.cumsum(lengths)]),
+                            pcm=np.concatenate([self.fragments[key] for key in keys]) if keys else
+                            np.zeros(0, dtype=np.int16),
+                            voice_id=self.voice_id, sample_rate=self.sample_rate)
+
+    def plan(self, text: str) -> Optional[List[str]]:
+        """Fragment keys (and pause marks) that read out `text`, or None if any part is missing"""
+        lang = 'ar' if is_arabic(text) else 'en'
+        tokens = [(match.lastgroup, match) for match in TOKEN_PATTERN.finditer(normalize(text))]
+        keys, i = [], 0
+        while i < len(tokens):
+            kind, match = tokens[i]
+            if kind == 'pause':
+                keys.append(match.group('pause'))
+                i += 1
+                continue
+            if kind == 'time':
+                found = time_keys(lang, int(match.group(2)), int(match.group(3)), match.group(4))
+                i += 1
+            elif kind == 'number':
+                found = number_keys(lang, match.group('number'))
+                i += 1
+            else:
+                key, i = self._match_phrase(tokens, i)
+                found = [key] if key else None
+            if not found or any(key not in self.fragments for key in found):
+                return None
+            keys.extend(found)
+        return keys
+
+    def render(self, text: str) -> Optional[np.ndarray]:
+        keys = self.plan(text)
+        while keys and keys[-1] in self._silences:
+            keys.pop()  # no pause after the last sentence
+        if not keys:
+            return None
+        return stitch([self._silences.get(key, self.fragments.get(key)) for key in keys], self.sample_rate)
+
+    def _match_phrase(self, tokens: List[Tuple[str, re.Match]], start: int) -> Tuple[Optional[str], int]:
+        """Longest recorded phrase at `start`; punctuation inside a phrase is part of its audio"""
+        words, ends = [], []
+        for j in range(start, len(tokens)):
+            kind, match = tokens[j]
+            if kind == 'word':
+                words.append(match.group('word'))
+                ends.append(j + 1)
+                if len(words) == self.max_words:
+                    break
+            elif kind != 'pause':
+                break
+        for n in range(len(words), 0, -1):
+            key = self.phrases.get(' '.join(words[:n]))
+            if key:
+                return key, ends[n - 1]
+        return None, start
+
+def build_library(voice_id: str, synthesize: Callable[[str], Optional[bytes]],
+                  extra_phrases: Iterable[str] = (), workers: int = 4) -> PhraseLibrary:
+    """Synthesize every fragment with `synthesize(text) -> mu-law 8 kHz bytes`"""
+    fragments = inventory(extra_phrases)
+
+    def render(item):
+        key, text = item
+        audio = synthesize(text)
+        if not audio:
+            raise RuntimeError(f"Synthesis failed for {key!r} ({text})")
+        return key, trim_silence(decode_ulaw(audio))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return PhraseLibrary(voice_id, dict(pool.map(render, fragments.items())))
+
+def library_path(voice_id: str, directory: str = LIBRARY_DIR) -> str:
+    if not re.fullmatch(r'[\w-]+', voice_id):
+        raise ValueError(f"Invalid voice id: {voice_id!r}")
+    return os.path.join(directory, f"{voice_id}.npz")
+
+_libraries: Dict[str, Optional[PhraseLibrary]] = {}
+_libraries_lock = threading.Lock()
+
+def library_for(voice_id: str) -> Optional[PhraseLibrary]:
+    """The voice's library, loaded once; None (also remembered) when it was never built"""
+    if voice_id in _libraries:
+        return _libraries[voice_id]
+    with _libraries_lock:
+        if voice_id not in _libraries:
+            library = None
+            try:
+                path = library_path(voice_id)
+                if os.path.exists(path):
+                    library = PhraseLibrary.load(path, voice_id)
+                    logger.info(f"Loaded {len(library.fragments)} phrase fragments for voice {voice_id}")
+            except Exception as e:
+                logger.error(f"Could not load phrase audio for voice {voice_id}: {str(e)}")
+            _libraries[voice_id] = library
+        return _libraries[voice_id]
+
+def render(voice_id: str, text: str) -> Optional[np.ndarray]:
+    """8 kHz int16 audio for a templated reply, or None when it needs TTS"""
+    library = library_for(voice_id)
+    if library is None:
+        return None
+    started = time.perf_counter()
+    pcm = library.render(text)
+    metrics.record_cache('phrase_audio', pcm is not None)
+    if pcm is not None:
+        metrics.observe_stage('phrase_stitch', time.perf_counter() - started)
+    return pcm
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the phrase audio library for a voice')
+    parser.add_argument('voice_id')
+    parser.add_argument('--extra', help='file of extra phrases, one per line (service and business names)')
+    parser.add_argument('--out-dir', default=LIBRARY_DIR)
+    parser.add_argument('--workers', type=int, default=4, help='concurrent TTS requests')
+    parser.add_argument('--check', action='append', default=[], help='reply text to test coverage for')
+    args = parser.parse_args(argv)
+
+    from services.voice_service import VoiceProcessor
+    processor = VoiceProcessor()
+    if not processor.client:
+        print("ELEVENLABS_API_KEY is not configured", file=sys.stderr)
+        return 1
+    extra = []
+    if args.extra:
+        with open(args.extra, encoding='utf-8') as f:
+            extra = [line.strip() for line in f if line.strip()]
+
+    started = time.perf_counter()
+    try:
+        library = build_library(args.voice_id,
+                                lambda text: processor.synthesize_speech(text, args.voice_id,
+                                                                         output_format=ELEVENLABS_FORMAT),
+                                extra, args.workers)
+    except RuntimeError as e:
+        print(f"No library written: {str(e)}", file=sys.stderr)
+        return 1
+    if not library.fragments:
+        print("No library written: no fragments were synthesized", file=sys.stderr)
+        return 1
+    os.makedirs(args.out_dir, exist_ok=True)
+    path = library_path(args.voice_id, args.out_dir)
+    library.save(path)
+    seconds = sum(len(pcm) for pcm in library.fragments.values()) / library.sample_rate
+    print(f"Wrote {len(library.fragments)} fragments ({seconds:.0f} s of audio) to {path} "
+          f"in {time.perf_counter() - started:.0f} s")
+    for text in args.check:
+        keys = library.plan(text)
+        print(f"{'covered' if keys else 'needs TTS'}: {text}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
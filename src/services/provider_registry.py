@@ -0,0 +1,259 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from src.services import metrics
+from src.services.admission import llm_scheduler, Overloaded, POLICIES, current_class
+from src.services.circuit_breaker import breakers
+from src.services.http_pool import http_pools
+from src.services.tenant_limits import tenant_limiter
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = {
+    'openai': {'label': 'OpenAI GPT-4o-mini', 'env': 'OPENAI_API_KEY', 'model': 'gpt-4o-mini'},
+    'groq': {'label': 'Groq Llama', 'env': 'GROQ_API_KEY', 'model': 'llama3-70b-8192'},
+    'anthropic': {'label': 'Anthropic Claude', 'env': 'ANTHROPIC_API_KEY', 'model': 'claude-3-5-sonnet-20241022'},
+    'gemini': {'label': 'Google Gemini', 'env': 'GOOGLE_API_KEY', 'model': 'gemini-1.5-flash'},
+}
+PROVIDER_ORDER = ('openai', 'groq', 'anthropic', 'gemini')
+DEFAULT_MAX_TOKENS = 150
+DEFAULT_TEMPERATURE = 0.3
+PLACEHOLDER_KEYS = ('', 'demo_key_placeholder')
+
+class ProviderUnavailable(Exception):
+    """No provider could answer: none configured, all breakers open, or all failed"""
+
+class BudgetExceeded(ProviderUnavailable):
+    """The business has used up its request or token budget; callers fall back like any outage"""
+
+def parse_ai_config(ai_config) -> Dict[str, Any]:
+    """ai_config is stored as JSON text on Business rows and as a dict elsewhere"""
+    if not ai_config:
+        return {}
+    if isinstance(ai_config, dict):
+        return ai_config
+    try:
+        return json.loads(ai_config)
+    except (TypeError, ValueError):
+        logger.warning("Ignoring malformed ai_config")
+        return {}
+
+def _split_system(messages: List[Dict[str, str]]) -> Tuple[str, List[Dict[str, str]]]:
+    system = '\n\n'.join(m['content'] for m in messages if m['role'] == 'system')
+    return system, [m for m in messages if m['role'] != 'system']
+
+class ProviderRegistry:
+    """Process-wide LLM clients behind one chat/stream interface.
+
+    Clients are built on first use (on the shared HTTP pools) and reused by
+    every caller. `chat()` picks the tenant's provider and model from
+    ai_config ({"provider", "model", "fallback_providers", "max_tokens",
+    "temperature"}) and fails over to the next configured provider when a
+    breaker is open or a call fails.
+    """
+
+    def __init__(self):
+        self._keys = {name: os.getenv(spec['env'], '') for name, spec in PROVIDERS.items()}
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.default_provider: Optional[str] = None
+
+    def configure(self, **keys):
+        for name, key in keys.items():
+            if name in PROVIDERS and key:
+                self._keys[name] = key
+
+    def register_client(self, name: str, client):
+        """Use an already-built client for a provider (benchmarks inject fakes here)"""
+        self._clients[name] = client
+
+    def configured(self) -> List[str]:
+        return [name for name in PROVIDER_ORDER
+                if name in self._clients or (self._keys.get(name) or '') not in PLACEHOLDER_KEYS]
+
+    def client(self, name: str):
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._build(name)
+                    self._clients[name] = client
+        return client
+
+    def _build(self, name: str):
+        key = self._keys.get(name) or ''
+        if key in PLACEHOLDER_KEYS:
+            raise ProviderUnavailable(f"{name} has no API key")
+        if name == 'openai':
+            from openai import OpenAI
+            return OpenAI(api_key=key, max_retries=0, http_client=http_pools.httpx_client('openai'))
+        if name == 'groq':
+            from groq import Groq
+            return Groq(api_key=key, max_retries=0, http_client=http_pools.httpx_client('groq'))
+        if name == 'anthropic':
+            import anthropic
+            return anthropic.Anthropic(api_key=key, max_retries=0, http_client=http_pools.httpx_client('anthropic'))
+        if name == 'gemini':
+            # The Gemini SDK keeps its key globally and has no pluggable HTTP client
+            import google.generativeai as genai
+            genai.configure(api_key=key)
+            return genai
+        raise ProviderUnavailable(f"Unknown provider {name}")
+
+    def candidates(self, ai_config=None) -> List[Tuple[str, str]]:
+        """(provider, model) pairs to try for a tenant, in order"""
+        config = parse_ai_config(ai_config)
+        configured = self.configured()
+        preferred = config.get('provider')
+        order = []
+        if preferred in configured:
+            order.append((preferred, config.get('model') or PROVIDERS[preferred]['model']))
+        for name in list(config.get('fallback_providers', [])) + [self.default_provider] + configured:
+            if name in configured and all(name != provider for provider, _ in order):
+                order.append((name, PROVIDERS[name]['model']))
+        return order
+
+    def chat(self, messages: List[Dict[str, str]], ai_config=None, max_tokens: Optional[int] = None,
+             temperature: Optional[float] = None, business_id: Optional[int] = None) -> Dict[str, Any]:
+        """Complete `messages` with failover across providers.
+
+        Returns {'text', 'usage', 'provider', 'model'}; raises
+        ProviderUnavailable when no candidate answered. The call waits for
+        an LLM slot of the current traffic class; classes that shed load
+        get Overloaded when none frees up in time, the others
+        ProviderUnavailable so they fall back to the rule-based answers.
+        With a `business_id` the tenant's budgets are checked first
+        (BudgetExceeded) and the tokens used are metered against it.
+        """
+        config = parse_ai_config(ai_config)
+        exhausted = tenant_limiter.allow(business_id, config)
+        if exhausted:
+            raise BudgetExceeded(f"business {business_id} is over its LLM {exhausted} budget")
+
+        traffic_class = current_class()
+        try:
+            with llm_scheduler.slot(traffic_class):
+                result = self._chat(messages, config, max_tokens, temperature)
+        except Overloaded as e:
+            if POLICIES[traffic_class].shed:
+                raise
+            raise ProviderUnavailable(str(e))
+        tenant_limiter.record(business_id, result['provider'], result['model'], result['usage'], config)
+        return result
+
+    def _chat(self, messages: List[Dict[str, str]], ai_config, max_tokens: Optional[int],
+              temperature: Optional[float]) -> Dict[str, Any]:
+        config = parse_ai_config(ai_config)
+        max_tokens = max_tokens or config.get('max_tokens') or DEFAULT_MAX_TOKENS
+        if temperature is None:
+            temperature = config.get('temperature', DEFAULT_TEMPERATURE)
+
+        errors = []
+        for provider, model in self.candidates(config):
+            breaker = breakers.get(provider)
+            if not breaker.allow_request():
+                metrics.LLM_REQUESTS.inc(provider, 'short_circuited')
+                continue
+            started = time.perf_counter()
+            try:
+                result = self.call(provider, model, messages, max_tokens, temperature, timeout=breaker.timeout())
+            except Exception as e:
+                breaker.record_failure(time.perf_counter() - started)
+                metrics.LLM_REQUESTS.inc(provider, 'error')
+                logger.error(f"{provider} ({model}) request failed: {str(e)}")
+                errors.append(f"{provider}: {str(e)}")
+                continue
+            elapsed = time.perf_counter() - started
+            breaker.record_success(elapsed)
+            metrics.observe_stage('llm_total', elapsed)
+            metrics.LLM_REQUESTS.inc(provider, 'success')
+            return result
+        raise ProviderUnavailable('; '.join(errors) or 'no provider available')
+
+    def call(self, provider: str, model: str, messages: List[Dict[str, str]],
+             max_tokens: int = DEFAULT_MAX_TOKENS, temperature: float = DEFAULT_TEMPERATURE,
+             timeout: Optional[float] = None) -> Dict[str, Any]:
+        """One streamed completion from one provider, without failover"""
+        usage = {}
+        parts = []
+        started = time.perf_counter()
+        for delta in self.stream(provider, model, messages, max_tokens, temperature, timeout, usage):
+            if not parts:
+                metrics.observe_stage('llm_ttft', time.perf_counter() - started)
+            parts.append(delta)
+        text = ''.join(parts).strip()
+        if not usage:
+            # Rough count (about 4 characters per token) when the provider reports none
+            usage = {
+                'prompt_tokens': sum(len(m['content']) for m in messages) // 4,
+                'completion_tokens': len(text) // 4
+            }
+        return {'text': text, 'usage': usage, 'provider': provider, 'model': model}
+
+    def stream(self, provider: str, model: str, messages: List[Dict[str, str]],
+               max_tokens: int = DEFAULT_MAX_TOKENS, temperature: float = DEFAULT_TEMPERATURE,
+               timeout: Optional[float] = None, usage: Optional[Dict[str, int]] = None) -> Iterator[str]:
+        """Yield text deltas; token counts go into `usage` when the provider reports them"""
+        client = self.client(provider)
+        usage = usage if usage is not None else {}
+
+        if provider in ('openai', 'groq'):
+            extra = {'stream_options': {'include_usage': True}} if provider == 'openai' else {}
+            stream = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                timeout=timeout,
+                **extra
+            )
+            for chunk in stream:
+                reported = getattr(chunk, 'usage', None) or getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+                if reported:
+                    usage.update(prompt_tokens=reported.prompt_tokens, completion_tokens=reported.completion_tokens)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+
+        elif provider == 'anthropic':
+            system, turns = _split_system(messages)
+            extra = {'system': system} if system else {}
+            with client.messages.stream(model=model, max_tokens=max_tokens, temperature=temperature,
+                                        messages=turns, timeout=timeout, **extra) as stream:
+                for text in stream.text_stream:
+                    yield text
+                final = stream.get_final_message()
+            usage.update(prompt_tokens=final.usage.input_tokens, completion_tokens=final.usage.output_tokens)
+
+        elif provider == 'gemini':
+            system, turns = _split_system(messages)
+            model_client = client.GenerativeModel(model, system_instruction=system or None)
+            contents = [{'role': 'model' if m['role'] == 'assistant' else 'user', 'parts': [m['content']]}
+                        for m in turns]
+            response = model_client.generate_content(
+                contents,
+                generation_config={'max_output_tokens': max_tokens, 'temperature': temperature},
+                stream=True,
+                request_options={'timeout': timeout} if timeout else None
+            )
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+            reported = getattr(response, 'usage_metadata', None)
+            if reported:
+                usage.update(prompt_tokens=reported.prompt_token_count,
+                             completion_tokens=reported.candidates_token_count)
+
+        else:
+            raise ProviderUnavailable(f"Unknown provider {provider}")
+
+    def label(self, provider: Optional[str] = None) -> str:
+        provider = provider or self.default_provider
+        return PROVIDERS[provider]['label'] if provider in PROVIDERS else 'Fallback System'
+
+providers = ProviderRegistry()
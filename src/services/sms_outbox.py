@@ -0,0 +1,171 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List
+import requests
+from urllib3.exceptions import NewConnectionError
+from src.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Twilio rejects these before creating the message (rate limited). A 5xx may
+# come after the message was created, and any other 4xx (bad number,
+# unsubscribed recipient) will not succeed on retry
+RETRYABLE_STATUS = {429}
+
+@dataclass
+class OutboundSms:
+    message_sid: str
+    to: str
+    from_: str
+    compose: Callable[[], str]  # builds the reply text; runs on a worker thread
+    received_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+def is_retryable(error: Exception) -> bool:
+    """Only when Twilio certainly did not create the message: a retryable status, or no connection at all.
+
+    A read timeout or a connection dropped after the request went out may
+    have sent the SMS already, so those are not retried.
+    """
+    status = getattr(error, 'status', None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        # DNS failure or connection refused; requests wraps urllib3's MaxRetryError
+        return isinstance(getattr(error.args[0], 'reason', None), NewConnectionError)
+    return False
+
+class SmsOutbox:
+    """Bounded queue of SMS replies, sent through the REST messages API by a fixed pool of workers.
+
+    The webhook enqueues and returns at once; `workers` threads compose
+    the reply (the LLM turn) and send it, so at most `workers` sends are in
+    flight per process. Sends that Twilio certainly did not accept (see
+    is_retryable) are retried with jittered exponential backoff up to
+    `max_attempts`; nothing else is, so a reply is never sent twice. `enqueue()` returns False when the queue
+    is full so the caller can answer inline instead of dropping the reply.
+    Once started, the process drains the queue for up to `exit_timeout`
+    seconds at exit, so a recycled gunicorn worker still sends what it accepted.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 500, max_attempts: int = 4,
+                 backoff: float = 0.5, max_backoff: float = 8.0, exit_timeout: float = 20.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.exit_timeout = exit_timeout
+        self.client = None
+        self._queue: "queue.Queue[OutboundSms]" = queue.Queue(maxsize=max_queue)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self, client):
+        """Begin delivering through `client` (a twilio Client or anything with messages.create)"""
+        self.client = client
+        self._spawn_workers()
+        atexit.unregister(self._drain_at_exit)
+        atexit.register(self._drain_at_exit)
+
+    def _spawn_workers(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for index in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f'sms-outbox-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    @property
+    def enabled(self) -> bool:
+        return self.client is not None
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def pending(self) -> int:
+        """Queued plus currently being composed or sent"""
+        return self._queue.unfinished_tasks
+
+    def enqueue(self, sms: OutboundSms) -> bool:
+        if self.client is None:
+            return False
+        if len(self._threads) < self.workers:
+            self._spawn_workers()  # first use after a fork
+        try:
+            self._queue.put_nowait(sms)
+        except queue.Full:
+            metrics.SMS_OUTBOX.inc('rejected')
+            logger.warning(f"SMS outbox full ({self.max_queue}), replying inline to {sms.message_sid}")
+            return False
+        metrics.SMS_OUTBOX.inc('queued')
+        return True
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Wait until everything queued so far has been sent or given up on"""
+        deadline = time.monotonic() + timeout
+        while self.pending():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _drain_at_exit(self):
+        if self.pending() and not self.drain(self.exit_timeout):
+            logger.error(f"Exiting with {self.pending()} SMS replies unsent after {self.exit_timeout:.0f}s")
+
+    def reset(self):
+        """Forget threads and queued work inherited from a parent process; workers restart on the next enqueue"""
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _run(self):
+        while True:
+            sms = self._queue.get()
+            try:
+                self._deliver(sms)
+            except Exception as e:
+                metrics.SMS_OUTBOX.inc('failed')
+                logger.error(f"SMS reply to {sms.message_sid} failed: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, sms: OutboundSms):
+        metrics.observe_stage('sms_queue_wait', time.monotonic() - sms.received_at)
+        body = sms.compose()
+        while True:
+            sms.attempts += 1
+            started = time.perf_counter()
+            try:
+                self.client.messages.create(to=sms.to, from_=sms.from_, body=body)
+            except Exception as e:
+                if sms.attempts >= self.max_attempts or not is_retryable(e):
+                    metrics.SMS_OUTBOX.inc('failed')
+                    logger.error(f"Giving up on SMS reply to {sms.message_sid} after {sms.attempts} attempts: {str(e)}")
+                    return
+                delay = min(self.backoff * 2 ** (sms.attempts - 1), self.max_backoff)
+                metrics.SMS_OUTBOX.inc('retried')
+                logger.warning(f"SMS send for {sms.message_sid} failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                continue
+            metrics.observe_stage('sms_send', time.perf_counter() - started)
+            metrics.observe_stage('sms_delivery', time.monotonic() - sms.received_at)
+            metrics.SMS_OUTBOX.inc('sent')
+            return
+
+sms_outbox = SmsOutbox(
+    workers=int(os.getenv('SMS_WORKERS', '4')),
+    max_queue=int(os.getenv('SMS_QUEUE_SIZE', '500')),
+    exit_timeout=float(os.getenv('SMS_EXIT_TIMEOUT', '20'))
+)
+# Worker threads do not survive fork; gunicorn workers start their own on first use
+os.register_at_fork(after_in_child=sms_outbox.reset)
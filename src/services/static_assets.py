@@ -0,0 +1,109 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from typing import Dict
+from flask import Response, request
+from src.services.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+class StaticAsset:
+    """A static file held in memory with its precompressed encodings"""
+
+    def __init__(self, name: str, body: bytes):
+        self.name = name
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.encodings: Dict[str, bytes] = {'identity': body}
+
+        if self.mimetype.startswith(COMPRESSIBLE_TYPES):
+            self.encodings['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli:
+                self.encodings['br'] = brotli.compress(body, quality=11)
+
+    def etag_for(self, encoding: str) -> str:
+        """Strong ETag for one representation; encoded bodies get their own tag"""
+        return self.etag if encoding == 'identity' else f'{self.etag}-{encoding}'
+
+    def negotiate(self, accept_encoding: str) -> str:
+        """Pick the smallest encoding the client accepts (q=0 means refused)"""
+        weights = parse_accept_encoding(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if weights.get(encoding, weights.get('*', 0.0)) > 0 and encoding in self.encodings:
+                return encoding
+        return 'identity'
+
+def parse_accept_encoding(accept_encoding: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, *params = [piece.strip() for piece in part.split(';')]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.lower()] = q
+    return weights
+
+class StaticAssetCache:
+    """Serves files from src/static without touching the disk or Jinja per request.
+
+    Files are read and compressed once. Pages are revalidated with their ETag,
+    which is suffixed per encoding, so a 304 costs a hash comparison.
+    """
+
+    def __init__(self, directory: str = STATIC_DIR):
+        self.directory = directory
+        self.assets: Dict[str, StaticAsset] = {}
+
+    def load(self, name: str) -> StaticAsset:
+        asset = self.assets.get(name)
+        if asset is None:
+            path = os.path.join(self.directory, name)
+            with open(path, 'rb') as f:
+                asset = StaticAsset(name, f.read())
+            self.assets[name] = asset
+            logger.info(f"Loaded static asset {name} ({len(asset.encodings['identity'])} bytes, "
+                        f"encodings: {', '.join(asset.encodings)})")
+        return asset
+
+    def preload(self, *names: str):
+        for name in names:
+            self.load(name)
+
+    def serve(self, name: str) -> Response:
+        asset = self.load(name)
+        encoding = asset.negotiate(request.headers.get('Accept-Encoding', ''))
+        etag = asset.etag_for(encoding)
+        headers = {
+            'ETag': f'"{etag}"',
+            'Cache-Control': REVALIDATE_CACHE_CONTROL,
+            'Vary': 'Accept-Encoding'
+        }
+        if etag in request.if_none_match:
+            record_cache('static_assets', True)
+            return Response(status=304, headers=headers)
+        record_cache('static_assets', False)
+
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(asset.encodings[encoding], mimetype=asset.mimetype, headers=headers)
+
+static_assets = StaticAssetCache()
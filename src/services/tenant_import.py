@@ -0,0 +1,185 @@
+"""Streaming parsers and row validation for bulk tenant onboarding.
+
+CSV columns: name, phone, email, description, ai_config (JSON), services and
+one column per weekday (sunday ... saturday) holding "09:00-17:00" or
+"closed"; a business_hours column with the JSON form is accepted instead.
+services is "Name:price:minutes" entries separated by "|", e.g.
+"General Consultation:150:30|Lab Tests:80:20".
+
+JSONL: one object per line with the same keys; business_hours may be the
+JSON object, services a list of {"name", "price", "duration_minutes"}.
+"""
+import csv
+import io
+import json
+import re
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from src.services.fast_path import DAYS
+from src.services.tenant_registry import normalize_phone
+
+PHONE_PATTERN = re.compile(r'^\+?\d{8,15}$')
+TIME_PATTERN = re.compile(r'^([01]?\d|2[0-3]):[0-5]\d$')
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+MAX_FIELD_LENGTHS = {'name': 100, 'phone': 20, 'email': 100}
+
+def detect_format(mimetype: str, filename: Optional[str] = None, requested: Optional[str] = None) -> Optional[str]:
+    hint = (requested or '').lower() or (filename or '').rsplit('.', 1)[-1].lower()
+    if hint in ('csv',):
+        return 'csv'
+    if hint in ('jsonl', 'ndjson', 'json'):
+        return 'jsonl'
+    if 'csv' in mimetype:
+        return 'csv'
+    if any(kind in mimetype for kind in ('ndjson', 'jsonl', 'json')):
+        return 'jsonl'
+    return None
+
+def _iter_csv(stream) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    for row_number, row in enumerate(reader, start=1):
+        yield row_number, {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}, None
+
+def _iter_jsonl(stream) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    row_number = 0
+    for line in io.TextIOWrapper(stream, encoding='utf-8-sig'):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"invalid JSON: {str(e)}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "each line must be a JSON object"
+            continue
+        yield row_number, record, None
+
+def _parse_hours(raw: Dict[str, Any], errors: List[str]) -> Optional[Dict[str, Any]]:
+    hours = raw.get('business_hours')
+    if isinstance(hours, str) and hours:
+        try:
+            hours = json.loads(hours)
+        except ValueError:
+            errors.append('business_hours is not valid JSON')
+            return None
+    if hours is None or hours == '':
+        hours = {}
+        for day in DAYS:
+            cell = raw.get(day)
+            if cell in (None, ''):
+                continue
+            if isinstance(cell, str) and cell.lower() == 'closed':
+                hours[day] = None
+                continue
+            opens, _, closes = str(cell).partition('-')
+            hours[day] = {'open': opens.strip(), 'close': closes.strip()}
+        if not hours:
+            return None
+    if not isinstance(hours, dict):
+        errors.append('business_hours must be an object')
+        return None
+    for day, slot in hours.items():
+        if day not in DAYS:
+            errors.append(f"unknown day '{day}' in business_hours")
+        elif slot is not None and not (isinstance(slot, dict) and TIME_PATTERN.match(str(slot.get('open', '')))
+                                       and TIME_PATTERN.match(str(slot.get('close', '')))):
+            errors.append(f"{day} hours must be HH:MM-HH:MM or closed")
+    return hours
+
+def _parse_services(raw_services, errors: List[str]) -> Optional[List[Dict[str, Any]]]:
+    if raw_services in (None, ''):
+        return None
+    if isinstance(raw_services, str):
+        entries = []
+        for chunk in raw_services.split('|'):
+            parts = [part.strip() for part in chunk.split(':')]
+            if parts and parts[0]:
+                entries.append({
+                    'name': parts[0],
+                    'price': parts[1] if len(parts) > 1 and parts[1] else None,
+                    'duration_minutes': parts[2] if len(parts) > 2 and parts[2] else None
+                })
+        raw_services = entries
+    if not isinstance(raw_services, list):
+        errors.append('services must be a list')
+        return None
+
+    services = []
+    for service in raw_services:
+        name = str(service.get('name') or '').strip() if isinstance(service, dict) else ''
+        if not name:
+            errors.append('every service needs a name')
+            continue
+        try:
+            price = float(service['price']) if service.get('price') not in (None, '') else None
+            minutes = int(service['duration_minutes']) if service.get('duration_minutes') not in (None, '') else None
+        except (TypeError, ValueError):
+            errors.append(f"service '{name}' has a non-numeric price or duration")
+            continue
+        if (price is not None and price < 0) or (minutes is not None and minutes <= 0):
+            errors.append(f"service '{name}' has a negative price or non-positive duration")
+            continue
+        services.append({'name': name[:100], 'price': price, 'duration_minutes': minutes,
+                         'description': service.get('description'), 'is_active': service.get('is_active', True)})
+    return services
+
+def validate(raw: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Normalize one uploaded row into a tenant record, or return its errors"""
+    errors = []
+    name = str(raw.get('name') or '').strip()
+    phone = normalize_phone(str(raw.get('phone') or '').strip())
+    email = str(raw.get('email') or '').strip() or None
+    if not name:
+        errors.append('name is required')
+    if not phone or not PHONE_PATTERN.match(phone):
+        errors.append('phone is required in international format, e.g. +966110000000')
+    if email and not EMAIL_PATTERN.match(email):
+        errors.append('email is not valid')
+    for field, limit in MAX_FIELD_LENGTHS.items():
+        value = {'name': name, 'phone': phone, 'email': email}[field]
+        if value and len(value) > limit:
+            errors.append(f"{field} is longer than {limit} characters")
+
+    ai_config = raw.get('ai_config')
+    if isinstance(ai_config, str) and ai_config:
+        try:
+            ai_config = json.loads(ai_config)
+        except ValueError:
+            errors.append('ai_config is not valid JSON')
+    if ai_config not in (None, '') and not isinstance(ai_config, dict):
+        errors.append('ai_config must be an object')
+
+    hours = _parse_hours(raw, errors)
+    services = _parse_services(raw.get('services'), errors)
+    if errors:
+        return None, errors
+
+    record = {'name': name, 'phone': phone}
+    if email:
+        record['email'] = email
+    if raw.get('description'):
+        record['description'] = str(raw['description'])
+    if ai_config:
+        record['ai_config'] = ai_config
+    if hours is not None:
+        record['business_hours'] = hours
+    if services is not None:
+        record['services'] = services
+    return record, []
+
+def parse(stream, fmt: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], List[str]]]:
+    """Yield (row_number, record, errors) while reading the upload"""
+    rows = _iter_csv(stream) if fmt == 'csv' else _iter_jsonl(stream)
+    row_number = 0
+    try:
+        for row_number, raw, error in rows:
+            if error:
+                yield row_number, None, [error]
+                continue
+            record, errors = validate(raw)
+            yield row_number, record, errors
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Rows already read are still imported; the report says where reading stopped
+        yield row_number + 1, None, [f"upload could not be read from this row on: {str(e)}"]
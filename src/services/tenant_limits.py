@@ -0,0 +1,293 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from src.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens (input, output); unknown models are metered at zero cost
+PRICES_PER_MILLION = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4.1-nano': (0.10, 0.40),
+    'llama3-70b-8192': (0.59, 0.79),
+    'llama3-8b-8192': (0.05, 0.08),
+    'claude-3-5-sonnet-20241022': (3.00, 15.00),
+    'claude-3-5-haiku-20241022': (0.80, 4.00),
+    'gemini-1.5-flash': (0.075, 0.30),
+    'gemini-1.5-flash-8b': (0.0375, 0.15),
+    'gemini-1.5-pro': (1.25, 5.00),
+}
+
+@dataclass(frozen=True)
+class Limits:
+    requests_per_minute: float
+    request_burst: float
+    tokens_per_minute: float
+    token_burst: float
+
+DEFAULT_LIMITS = Limits(
+    requests_per_minute=float(os.getenv('TENANT_LLM_REQUESTS_PER_MINUTE', '60')),
+    request_burst=float(os.getenv('TENANT_LLM_REQUEST_BURST', '20')),
+    tokens_per_minute=float(os.getenv('TENANT_LLM_TOKENS_PER_MINUTE', '30000')),
+    token_burst=float(os.getenv('TENANT_LLM_TOKEN_BURST', '60000')),
+)
+
+def limits_for(ai_config: Optional[Dict[str, Any]]) -> Limits:
+    """Defaults, overridden per tenant by ai_config {"rate_limits": {"requests_per_minute", ...}}"""
+    overrides = (ai_config or {}).get('rate_limits') or {}
+    if not overrides:
+        return DEFAULT_LIMITS
+    requests_per_minute = float(overrides.get('requests_per_minute', DEFAULT_LIMITS.requests_per_minute))
+    tokens_per_minute = float(overrides.get('tokens_per_minute', DEFAULT_LIMITS.tokens_per_minute))
+    return Limits(
+        requests_per_minute=requests_per_minute,
+        request_burst=float(overrides.get('request_burst', max(DEFAULT_LIMITS.request_burst, requests_per_minute / 3))),
+        tokens_per_minute=tokens_per_minute,
+        token_burst=float(overrides.get('token_burst', tokens_per_minute * 2)),
+    )
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    input_price, output_price = PRICES_PER_MILLION.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+class MemoryBuckets:
+    """Token buckets in this process. One lock; each operation is a few float ops."""
+
+    def __init__(self):
+        self._buckets: Dict[str, list] = {}  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def _refill(self, key: str, rate: float, burst: float, now: float) -> list:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        return bucket
+
+    def take(self, key: str, rate: float, burst: float, amount: float) -> bool:
+        """Remove `amount` if available; amount 0 only checks the bucket is not in debt"""
+        with self._lock:
+            bucket = self._refill(key, rate, burst, time.monotonic())
+            if bucket[0] > 0 and bucket[0] >= amount:
+                bucket[0] -= amount
+                return True
+            return False
+
+    def charge(self, key: str, rate: float, burst: float, amount: float):
+        """Remove `amount` unconditionally (usage known after the fact); debt is capped at one burst"""
+        with self._lock:
+            bucket = self._refill(key, rate, burst, time.monotonic())
+            bucket[0] = max(bucket[0] - amount, -burst)
+
+# Same algorithm as MemoryBuckets, atomically in Redis. ARGV: rate/s, burst, amount, now, mode
+_REDIS_BUCKET_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 't', 'u')
+local rate, burst, amount, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated, 0) * rate)
+local allowed = 1
+if ARGV[5] == 'take' then
+    if tokens > 0 and tokens >= amount then tokens = tokens - amount else allowed = 0 end
+else
+    tokens = math.max(tokens - amount, -burst)
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'u', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(2 * burst / rate) + 60)
+return allowed
+"""
+
+class RedisBuckets:
+    """Token buckets shared by every worker through Redis.
+
+    Fails open: when Redis is unreachable the request is allowed and a
+    warning is logged, so a limiter outage never takes calls down.
+    """
+
+    def __init__(self, url: str, prefix: str = 'tenant-limit:'):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.2)
+        self._script = self._client.register_script(_REDIS_BUCKET_SCRIPT)
+
+    def _run(self, key: str, rate: float, burst: float, amount: float, mode: str) -> bool:
+        try:
+            return bool(self._script(keys=[self.prefix + key], args=[rate, burst, amount, time.time(), mode]))
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, allowing request: {str(e)}")
+            return True
+
+    def take(self, key: str, rate: float, burst: float, amount: float) -> bool:
+        return self._run(key, rate, burst, amount, 'take')
+
+    def charge(self, key: str, rate: float, burst: float, amount: float):
+        self._run(key, rate, burst, amount, 'charge')
+
+def _bucket_hour(now: datetime) -> datetime:
+    return now.replace(minute=0, second=0, microsecond=0)
+
+class TenantLimiter:
+    """Per-business request and LLM-token budgets, plus token and cost metering.
+
+    `allow()` runs before an LLM call and refuses it when either bucket
+    is empty; the caller then answers from the rule-based responder.
+    `record()` charges the real token count once the provider reports it
+    (the token bucket may go briefly negative) and adds the usage to an
+    in-memory hourly rollup that `flush()` writes to llm_usage_rollups.
+    """
+
+    def __init__(self, buckets=None, flush_interval: float = 30.0):
+        self.buckets = buckets or MemoryBuckets()
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[int, datetime, str, str], list] = defaultdict(lambda: [0, 0, 0, 0.0])
+        self._pending_lock = threading.Lock()
+        self._flusher = None
+        self._app = None
+
+    def allow(self, business_id: Optional[int], ai_config: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """None when the call may go ahead, otherwise the name of the exhausted budget"""
+        if not business_id:
+            return None
+        limits = limits_for(ai_config)
+        if not self.buckets.take(f"{business_id}:tokens", limits.tokens_per_minute / 60, limits.token_burst, 0):
+            reason = 'tokens'
+        elif not self.buckets.take(f"{business_id}:requests", limits.requests_per_minute / 60, limits.request_burst, 1):
+            reason = 'requests'
+        else:
+            return None
+        metrics.TENANT_THROTTLED.inc(str(business_id), reason)
+        return reason
+
+    def record(self, business_id: Optional[int], provider: str, model: str, usage: Dict[str, int],
+               ai_config: Optional[Dict[str, Any]] = None):
+        prompt_tokens = int(usage.get('prompt_tokens') or 0)
+        completion_tokens = int(usage.get('completion_tokens') or 0)
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        tenant = str(business_id) if business_id else 'none'
+        metrics.LLM_TOKENS.inc(tenant, provider, 'prompt', amount=prompt_tokens)
+        metrics.LLM_TOKENS.inc(tenant, provider, 'completion', amount=completion_tokens)
+        metrics.LLM_COST.inc(tenant, provider, amount=cost)
+        if not business_id:
+            return
+
+        limits = limits_for(ai_config)
+        self.buckets.charge(f"{business_id}:tokens", limits.tokens_per_minute / 60, limits.token_burst,
+                            prompt_tokens + completion_tokens)
+        with self._pending_lock:
+            totals = self._pending[(business_id, _bucket_hour(datetime.utcnow()), provider, model)]
+            totals[0] += 1
+            totals[1] += prompt_tokens
+            totals[2] += completion_tokens
+            totals[3] += cost
+
+    # Rollups
+
+    def flush(self):
+        """Add pending usage to llm_usage_rollups. Needs an app context."""
+        from src.models.voice_models import db
+        from src.models.analytics_models import LlmUsageRollup
+
+        with self._pending_lock:
+            pending, self._pending = self._pending, defaultdict(lambda: [0, 0, 0, 0.0])
+        if not pending:
+            return
+        try:
+            for (business_id, start, provider, model), (requests, prompt, completion, cost) in pending.items():
+                filters = dict(business_id=business_id, bucket_start=start, provider=provider, model=model)
+                values = {
+                    LlmUsageRollup.requests: LlmUsageRollup.requests + requests,
+                    LlmUsageRollup.prompt_tokens: LlmUsageRollup.prompt_tokens + prompt,
+                    LlmUsageRollup.completion_tokens: LlmUsageRollup.completion_tokens + completion,
+                    LlmUsageRollup.cost_usd: LlmUsageRollup.cost_usd + cost,
+                }
+                if LlmUsageRollup.query.filter_by(**filters).update(values, synchronize_session=False):
+                    continue
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(LlmUsageRollup(**filters, requests=requests, prompt_tokens=prompt,
+                                                      completion_tokens=completion, cost_usd=cost))
+                except IntegrityError:
+                    # Another worker created the bucket first
+                    LlmUsageRollup.query.filter_by(**filters).update(values, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Could not write LLM usage rollups, keeping them for the next flush: {str(e)}")
+            with self._pending_lock:
+                for key, totals in pending.items():
+                    merged = self._pending[key]
+                    for index, value in enumerate(totals):
+                        merged[index] += value
+
+    def start(self, app):
+        """Flush rollups every `flush_interval` seconds on a background thread, and once more at exit"""
+        if self._flusher and self._flusher.is_alive():
+            return
+        atexit.unregister(self._flush_at_exit)
+        self._app = app
+        atexit.register(self._flush_at_exit)
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                with app.app_context():
+                    self.flush()
+
+        self._flusher = threading.Thread(target=run, name='tenant-usage-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_at_exit(self):
+        with self._app.app_context():
+            self.flush()
+
+    def reset(self):
+        """After fork: the flusher thread and unflushed usage belong to the parent"""
+        self._flusher = None
+        self._pending = defaultdict(lambda: [0, 0, 0, 0.0])
+        self._pending_lock = threading.Lock()
+
+    def usage(self, business_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+        """Hourly usage rows and totals for a business, flushed rollups plus this worker's pending usage"""
+        from src.models.analytics_models import LlmUsageRollup
+
+        end = end or datetime.utcnow()
+        start = _bucket_hour(start or end - timedelta(days=1))
+        rows = LlmUsageRollup.query.filter(
+            LlmUsageRollup.business_id == business_id,
+            LlmUsageRollup.bucket_start >= start,
+            LlmUsageRollup.bucket_start <= end
+        ).order_by(LlmUsageRollup.bucket_start).all()
+        buckets = [row.to_dict() for row in rows]
+        with self._pending_lock:
+            for (pending_id, bucket_start, provider, model), (requests, prompt, completion, cost) in self._pending.items():
+                if pending_id == business_id and start <= bucket_start <= end:
+                    buckets.append({'bucket_start': bucket_start.isoformat(), 'provider': provider, 'model': model,
+                                    'requests': requests, 'prompt_tokens': prompt,
+                                    'completion_tokens': completion, 'cost_usd': round(cost, 6)})
+        totals = {field: sum(bucket[field] for bucket in buckets)
+                  for field in ('requests', 'prompt_tokens', 'completion_tokens', 'cost_usd')}
+        totals['cost_usd'] = round(totals['cost_usd'], 6)
+        return {'start': start.isoformat(), 'end': end.isoformat(), 'totals': totals, 'buckets': buckets}
+
+def _buckets_from_env():
+    url = os.getenv('RATE_LIMIT_REDIS_URL')
+    if not url:
+        return MemoryBuckets()
+    try:
+        return RedisBuckets(url)
+    except ImportError:
+        logger.warning("RATE_LIMIT_REDIS_URL is set but the redis package is not installed; limits are per worker")
+        return MemoryBuckets()
+
+tenant_limiter = TenantLimiter(_buckets_from_env(), flush_interval=float(os.getenv('USAGE_FLUSH_SECONDS', '30')))
+os.register_at_fork(after_in_child=tenant_limiter.reset)
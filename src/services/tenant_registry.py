@@ -0,0 +1,296 @@
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from src.models.voice_models import db, Business
+from src.services import metrics, fast_path, business_index
+from src.services.provider_registry import parse_ai_config
+
+logger = logging.getLogger(__name__)
+
+EDITABLE_FIELDS = ('name', 'phone', 'email', 'description', 'business_hours', 'ai_config')
+PHONE_SEPARATORS = (' ', '\t', '-', '(', ')')
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """'+966 11 000-0000' and '+966110000000' are the same tenant"""
+    if not phone:
+        return None
+    return re.sub(r'[\s\-()]', '', phone)
+
+def _normalized_phone_column():
+    """normalize_phone() in SQL, for rows stored before phones were normalized on write"""
+    column = Business.phone
+    for separator in PHONE_SEPARATORS:
+        column = func.replace(column, separator, '')
+    return column
+
+def _entry(business: Business) -> Dict[str, Any]:
+    return {
+        'id': business.id,
+        'name': business.name,
+        'phone': business.phone,
+        'email': business.email,
+        'description': business.description or '',
+        'business_hours': business.business_hours,
+        'ai_config': parse_ai_config(business.ai_config),
+        'version': business.updated_at.isoformat() if business.updated_at else None
+    }
+
+class TenantRegistry:
+    """In-process cache of the businesses table, keyed by id and by phone.
+
+    Every worker holds its own copy. A write through this registry updates
+    the local copy immediately. Other workers notice it within
+    `refresh_interval` seconds: each poll re-reads the rows whose
+    updated_at falls inside a trailing overlap window (so a transaction
+    that committed late with an older timestamp is not missed), and a
+    lower row count (a deleted tenant) triggers a full reload. A lookup
+    miss forces an early poll so a tenant created on another worker is
+    found straight away. Entries are shared dicts and must not be
+    mutated by callers.
+    """
+
+    def __init__(self, refresh_interval: float = 5.0, miss_interval: float = 1.0, overlap: float = 30.0):
+        self.refresh_interval = refresh_interval
+        self.miss_interval = miss_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._by_phone: Dict[str, int] = {}
+        self._latest: Optional[datetime] = None
+        self._count = 0
+        self._checked_at = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    # Lookups
+
+    def get(self, business_id: int) -> Optional[Dict[str, Any]]:
+        self._maybe_refresh()
+        entry = self._by_id.get(business_id)
+        if entry is None and self._maybe_refresh(self.miss_interval):
+            entry = self._by_id.get(business_id)
+        metrics.record_cache('tenants', entry is not None)
+        return entry
+
+    def get_by_phone(self, phone: Optional[str]) -> Optional[Dict[str, Any]]:
+        key = normalize_phone(phone)
+        if not key:
+            return None
+        self._maybe_refresh()
+        business_id = self._by_phone.get(key)
+        if business_id is None and self._maybe_refresh(self.miss_interval):
+            business_id = self._by_phone.get(key)
+        metrics.record_cache('tenants', business_id is not None)
+        return self._by_id.get(business_id) if business_id is not None else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        self._maybe_refresh()
+        return [self._by_id[key] for key in sorted(self._by_id)]
+
+    def page(self, after_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Up to `limit` entries with id > after_id, in id order, without sorting the whole cache"""
+        self._maybe_refresh()
+        by_id = self._by_id
+        ids = heapq.nsmallest(limit, (key for key in list(by_id) if after_id is None or key > after_id))
+        return [by_id[key] for key in ids if key in by_id]
+
+    # Cache maintenance
+
+    def load(self):
+        """Full reload from the database"""
+        with self._lock:
+            self._reload_all()
+
+    def _reload_all(self):
+        businesses = Business.query.all()
+        by_id, by_phone = {}, {}
+        for business in businesses:
+            entry = _entry(business)
+            by_id[entry['id']] = entry
+            if entry['phone']:
+                by_phone[normalize_phone(entry['phone'])] = entry['id']
+        # Swap whole maps so concurrent readers never see a half-built cache
+        self._by_id, self._by_phone = by_id, by_phone
+        self._count = len(by_id)
+        self._latest = max((b.updated_at for b in businesses if b.updated_at), default=None)
+        self._checked_at = time.monotonic()
+        self._loaded = True
+        fast_path.invalidate()
+        business_index.invalidate()
+        logger.info(f"Loaded {len(by_id)} tenants")
+
+    def _maybe_refresh(self, interval: Optional[float] = None) -> bool:
+        """Poll for changed rows if the last poll is older than `interval`; True when anything changed"""
+        interval = self.refresh_interval if interval is None else interval
+        if self._loaded and time.monotonic() - self._checked_at < interval:
+            return False
+        if not self._lock.acquire(blocking=False):
+            return False  # another thread is already refreshing; serve the current copy
+        try:
+            if not self._loaded:
+                self._reload_all()
+                return True
+            self._checked_at = time.monotonic()
+            count = db.session.query(func.count(Business.id)).scalar()
+            if count < self._count:
+                self._reload_all()
+                return True
+
+            query = Business.query
+            if self._latest is not None:
+                query = query.filter(Business.updated_at >= self._latest - self.overlap)
+            changed = False
+            for business in query.all():
+                entry = _entry(business)
+                current = self._by_id.get(business.id)
+                if current is None or current['version'] != entry['version']:
+                    self._store(entry)
+                    fast_path.invalidate(business.id)
+                    business_index.invalidate(business.id)
+                    changed = True
+                if business.updated_at and (self._latest is None or business.updated_at > self._latest):
+                    self._latest = business.updated_at
+            self._count = len(self._by_id)
+            return changed
+        finally:
+            self._lock.release()
+
+    def _store(self, entry: Dict[str, Any]):
+        old = self._by_id.get(entry['id'])
+        if old and old['phone'] and normalize_phone(old['phone']) != normalize_phone(entry['phone']):
+            self._by_phone.pop(normalize_phone(old['phone']), None)
+        self._by_id[entry['id']] = entry
+        if entry['phone']:
+            self._by_phone[normalize_phone(entry['phone'])] = entry['id']
+
+    def _committed(self, businesses: Iterable[Business]):
+        with self._lock:
+            for business in businesses:
+                self._store(_entry(business))
+                fast_path.invalidate(business.id)
+                business_index.invalidate(business.id)
+
+    # Writes
+
+    @staticmethod
+    def _apply(business: Business, data: Dict[str, Any]):
+        for field in EDITABLE_FIELDS:
+            if field in data:
+                value = data[field]
+                if field == 'phone':
+                    value = normalize_phone(value)
+                elif field in ('business_hours', 'ai_config') and isinstance(value, (dict, list)):
+                    value = json.dumps(value, ensure_ascii=False)
+                setattr(business, field, value)
+        business.updated_at = datetime.utcnow()
+
+    def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        business = Business(created_at=datetime.utcnow())
+        self._apply(business, data)
+        db.session.add(business)
+        db.session.commit()
+        self._committed([business])
+        return self._by_id[business.id]
+
+    def update(self, business_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        business = Business.query.get(business_id)
+        if not business:
+            return None
+        self._apply(business, data)
+        db.session.commit()
+        self._committed([business])
+        return self._by_id[business.id]
+
+    def bulk_import(self, records: Iterable[Tuple[int, Dict[str, Any]]], batch_size: int = 500) -> List[Dict[str, Any]]:
+        """Upsert tenants and their services keyed by phone, one transaction per batch.
+
+        `records` yields (row_number, record) and is consumed lazily, so an
+        upload can be parsed while earlier batches are being written.
+        Returns one {'row', 'status', 'id', 'phone'} result per record.
+        """
+        results = []
+        batch = []
+        for item in records:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                results.extend(self._import_batch(batch))
+                batch = []
+        if batch:
+            results.extend(self._import_batch(batch))
+        return results
+
+    def _import_batch(self, batch: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        try:
+            results, touched = self._upsert(batch)
+            db.session.commit()
+        except Exception as e:
+            # One bad row should not sink its whole batch: retry the rows one by one
+            db.session.rollback()
+            logger.warning(f"Tenant import batch failed, retrying {len(batch)} rows individually: {str(e)}")
+            results, touched = [], []
+            for item in batch:
+                try:
+                    row_results, row_touched = self._upsert([item])
+                    db.session.commit()
+                except Exception as row_error:
+                    db.session.rollback()
+                    row_results, row_touched = [{'row': item[0], 'status': 'error', 'errors': [str(row_error)]}], []
+                results.extend(row_results)
+                touched.extend(row_touched)
+        self._committed(touched)
+        return results
+
+    def _upsert(self, batch: List[Tuple[int, Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], List[Business]]:
+        from src.models.voice_models import Service
+
+        phones = {normalize_phone(record.get('phone')) for _, record in batch} - {None}
+        existing = {normalize_phone(business.phone): business
+                    for business in Business.query.filter(_normalized_phone_column().in_(phones)).all()}
+        pending = []
+        for row, record in batch:
+            phone = normalize_phone(record.get('phone'))
+            if not record.get('name') or not phone:
+                pending.append((row, None, 'error', record))
+                continue
+            business = existing.get(phone)
+            status = 'updated'
+            if business is None:
+                business = Business(created_at=datetime.utcnow())
+                db.session.add(business)
+                existing[phone] = business
+                status = 'created'
+            self._apply(business, record)
+            pending.append((row, business, status, record))
+        db.session.flush()  # assigns ids to new businesses
+
+        touched = [business for _, business, _, _ in pending if business is not None]
+        services = {(service.business_id, service.name.lower()): service
+                    for service in Service.query.filter(Service.business_id.in_({b.id for b in touched})).all()}
+        results = []
+        for row, business, status, record in pending:
+            if business is None:
+                results.append({'row': row, 'status': 'error', 'errors': ['name and phone are required']})
+                continue
+            for item in record.get('services') or []:
+                key = (business.id, item['name'].lower())
+                service = services.get(key)
+                if service is None:
+                    service = Service(business_id=business.id, name=item['name'], created_at=datetime.utcnow())
+                    db.session.add(service)
+                    services[key] = service
+                service.price = item.get('price')
+                service.duration_minutes = item.get('duration_minutes')
+                service.is_active = item.get('is_active', True)
+                if item.get('description'):
+                    service.description = item['description']
+                service.updated_at = datetime.utcnow()
+            results.append({'row': row, 'status': status, 'id': business.id, 'phone': business.phone})
+        return results, touched
+
+tenants = TenantRegistry(refresh_interval=float(os.getenv('TENANT_REFRESH_SECONDS', '5')))
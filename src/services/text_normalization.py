@@ -0,0 +1,29 @@
+import re
+
+# Harakat, tanween, shadda, sukun, superscript alef and Quranic marks
+ARABIC_DIACRITICS = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]')
+TATWEEL = '\u0640'
+
+ARABIC_LETTER_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+
+ARABIC_CHARS = 'أبتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+def normalize_arabic(text: str) -> str:
+    """Normalize Arabic spelling variants so 'أشعة', 'اشعه' and 'الأشِعَّة' compare equal.
+
+    Strips diacritics and tatweel, unifies alef/yaa/taa marbuta forms and
+    maps Arabic-Indic digits to ASCII. Latin text passes through unchanged.
+    """
+    if not text:
+        return ''
+    text = ARABIC_DIACRITICS.sub('', text).replace(TATWEEL, '')
+    return text.translate(ARABIC_LETTER_MAP)
+
+def is_arabic(text: str) -> bool:
+    """Detect Arabic the same way the rest of the app does"""
+    return any(char in text for char in ARABIC_CHARS)
@@ -0,0 +1,234 @@
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+import requests
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'ai-voice-agent'
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+def trace_id_for(sid: str) -> str:
+    """Every hop of a call derives the same trace id from its CallSid, no shared state needed"""
+    return hashlib.sha256(sid.encode()).hexdigest()[:32]
+
+def root_span_id_for(sid: str) -> str:
+    return hashlib.sha256(f"{sid}:root".encode()).hexdigest()[:16]
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    """W3C traceparent '00-<trace_id>-<span_id>-01' -> (trace_id, span_id)"""
+    parts = (value or '').split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+class Span:
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name: str, trace_id: str, span_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 2,  # SERVER
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [{'key': key, 'value': {'stringValue': str(value)}} for key, value in self.attributes.items()],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+class FileExporter:
+    """Appends finished spans to a JSONL file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False) + '\n')
+
+class OTLPHttpExporter:
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def export(self, spans: List[Span]):
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+            'scopeSpans': [{'scope': {'name': SERVICE_NAME}, 'spans': [span.to_otlp() for span in spans]}]
+        }]}
+        self.session.post(self.url, json=payload, timeout=self.timeout)
+
+class Tracer:
+    """Per-call tracing across webhook hops.
+
+    Finished spans go to a bounded queue and are exported in batches on a
+    background thread; when the queue is full spans are dropped rather
+    than slowing down a call. Without an exporter every operation is a
+    no-op.
+    """
+
+    def __init__(self, exporter=None, batch_size: int = 256, flush_interval: float = 2.0, max_queue: int = 10000):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        if exporter:
+            self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+            self._thread.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                logger.warning(f"Trace export failed, dropped {len(batch)} spans: {str(e)}")
+
+    def _finish(self, span: Span):
+        span.end_ns = span.end_ns or time.time_ns()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass
+
+    @contextmanager
+    def start_hop(self, name: str, sid: str, parent_id: Optional[str] = None, root: bool = False,
+                  attributes: Optional[Dict[str, Any]] = None):
+        """Open the span for one webhook request of a call"""
+        if not self.enabled or not sid:
+            yield None
+            return
+        trace_id = trace_id_for(sid)
+        if root:
+            span = Span(name, trace_id, root_span_id_for(sid), None, attributes)
+        else:
+            span = Span(name, trace_id, os.urandom(8).hex(), parent_id or root_span_id_for(sid), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Child span of whatever span is current; no-op outside a traced hop"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(name, parent.trace_id, os.urandom(8).hex(), parent.span_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record_span(self, name: str, duration: float, **attributes):
+        """Add a child span for work that was timed by hand and just ended"""
+        parent = _current_span.get()
+        if parent is None:
+            return
+        end_ns = time.time_ns()
+        span = Span(name, parent.trace_id, os.urandom(8).hex(), parent.span_id, attributes,
+                    start_ns=end_ns - int(duration * 1e9))
+        span.end_ns = end_ns
+        self._finish(span)
+
+    def current_traceparent(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.traceparent if span else None
+
+    def trace_webhook(self, name: str, sid_field: str = 'CallSid', root: bool = False):
+        """Decorator for Twilio webhook views.
+
+        The parent span comes from the `traceparent` query argument that
+        earlier hops put on the <Gather action> URL; hops without one (the
+        status callback) hang off the call's root span.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+                sid = request.form.get(sid_field, '')
+                parent = parse_traceparent(request.args.get('traceparent'))
+                parent_id = parent[1] if parent and parent[0] == trace_id_for(sid) else None
+                attributes = {'http.route': request.path, sid_field: sid}
+                with self.start_hop(name, sid, parent_id, root=root, attributes=attributes):
+                    return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+def exporter_from_env():
+    kind = os.getenv('TRACE_EXPORTER', 'none').lower()
+    if kind == 'file':
+        return FileExporter(os.getenv('TRACE_FILE', 'traces.jsonl'))
+    if kind == 'otlp':
+        return OTLPHttpExporter(os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://localhost:4318'))
+    return None
+
+tracer = Tracer(exporter_from_env())
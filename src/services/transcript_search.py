@@ -0,0 +1,279 @@
+import logging
+import re
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+from sqlalchemy import or_, text
+from src.models.voice_models import db, CallLog
+from src.services.text_normalization import normalize_arabic, is_arabic
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'call_transcript_fts'
+TSV_TABLE = 'call_transcript_tsv'
+MAX_PER_PAGE = 100
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+TURN_PATTERN = re.compile(r'^(Customer|AI): (.*)$')
+ARABIC_DEFINITE_ARTICLE = 'ال'
+LIKE_ESCAPE = '\\'
+
+# One row per spoken turn, so indexing a new turn is an append and never
+# rewrites the call's existing rows. Filter columns are UNINDEXED and stored
+# alongside the text; rowids stay stable for snippet() and bm25().
+CREATE_FTS_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    content,
+    call_log_id UNINDEXED,
+    business_id UNINDEXED,
+    speaker UNINDEXED,
+    created_at UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+# Postgres: the same rows with a generated tsvector under a GIN index. The
+# 'simple' configuration only lower-cases, so Arabic and English are indexed
+# alike from the normalized text, as FTS5's unicode61 tokenizer does.
+CREATE_TSV_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {TSV_TABLE} (
+        id BIGSERIAL PRIMARY KEY,
+        content TEXT NOT NULL,
+        call_log_id INTEGER NOT NULL,
+        business_id INTEGER,
+        speaker VARCHAR(16) NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        document TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_{TSV_TABLE}_document ON {TSV_TABLE} USING GIN (document)",
+    f"CREATE INDEX IF NOT EXISTS ix_{TSV_TABLE}_call_log_id ON {TSV_TABLE} (call_log_id)",
+]
+
+def backend() -> Optional[str]:
+    """'fts5' on SQLite, 'tsvector' on Postgres, None (LIKE fallback) elsewhere"""
+    return {'sqlite': 'fts5', 'postgresql': 'tsvector'}.get(db.engine.dialect.name)
+
+def is_available() -> bool:
+    return backend() is not None
+
+def _table() -> str:
+    return FTS_TABLE if backend() == 'fts5' else TSV_TABLE
+
+def create_schema():
+    """Create the index table in its own committed transaction; run once at startup"""
+    if not is_available():
+        return
+    with db.engine.begin() as connection:
+        for statement in ([CREATE_FTS_SQL] if backend() == 'fts5' else CREATE_TSV_SQL):
+            connection.execute(text(statement))
+
+def index_turn(call_log: CallLog, customer_text: str, ai_text: str):
+    """Index one conversation turn. Runs inside the caller's transaction."""
+    if not is_available():
+        return
+    now = datetime.utcnow()
+    if backend() == 'fts5':
+        now = now.isoformat()  # FTS5 columns are untyped
+    rows = [
+        {'content': normalize_arabic(content), 'call_log_id': call_log.id,
+         'business_id': call_log.business_id, 'speaker': speaker, 'created_at': now}
+        for speaker, content in (('customer', customer_text), ('ai', ai_text)) if content
+    ]
+    if rows:
+        db.session.execute(text(
+            f"INSERT INTO {_table()} (content, call_log_id, business_id, speaker, created_at) "
+            "VALUES (:content, :call_log_id, :business_id, :speaker, :created_at)"
+        ), rows)
+
+def reindex_call_logs(batch_size: int = 500) -> int:
+    """Rebuild the index from call_logs.transcript for existing calls"""
+    if not is_available():
+        return 0
+    db.session.execute(text(f"DELETE FROM {_table()}"))
+
+    # One transaction: searches keep seeing the old index until the new one is complete
+    indexed = 0
+    for call_log in CallLog.query.filter(CallLog.transcript.isnot(None)).yield_per(batch_size):
+        customer_text = None
+        for line in call_log.transcript.splitlines():
+            match = TURN_PATTERN.match(line)
+            if not match:
+                continue
+            if match.group(1) == 'Customer':
+                customer_text = match.group(2)
+            else:
+                index_turn(call_log, customer_text, match.group(2))
+                customer_text = None
+        indexed += 1
+    if backend() == 'fts5':
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('optimize')"))
+    db.session.commit()
+    logger.info(f"Reindexed transcripts for {indexed} calls")
+    return indexed
+
+def _match_term(token: str, prefix: bool) -> str:
+    suffix = '*' if prefix else ''
+    if is_arabic(token) and not token.startswith(ARABIC_DEFINITE_ARTICLE):
+        # "اشعه" should also find "الاشعه"
+        return f'("{token}"{suffix} OR "{ARABIC_DEFINITE_ARTICLE}{token}"{suffix})'
+    return f'"{token}"{suffix}'
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 query: every token quoted, the last one prefix-matched"""
+    tokens = TOKEN_PATTERN.findall(normalize_arabic(query))
+    if not tokens:
+        return None
+    return ' AND '.join(_match_term(token, index == len(tokens) - 1) for index, token in enumerate(tokens))
+
+def _tsquery_term(token: str, prefix: bool) -> str:
+    suffix = ':*' if prefix else ''
+    if is_arabic(token) and not token.startswith(ARABIC_DEFINITE_ARTICLE):
+        return f"('{token}'{suffix} | '{ARABIC_DEFINITE_ARTICLE}{token}'{suffix})"
+    return f"'{token}'{suffix}"
+
+def build_tsquery(query: str) -> Optional[str]:
+    """The same query for Postgres to_tsquery(): every token quoted, the last one prefix-matched"""
+    tokens = TOKEN_PATTERN.findall(normalize_arabic(query))
+    if not tokens:
+        return None
+    return ' & '.join(_tsquery_term(token, index == len(tokens) - 1) for index, token in enumerate(tokens))
+
+def _filters(business_id, intent, start, end, params: Dict[str, Any]) -> List[str]:
+    clauses = []
+    if business_id is not None:
+        clauses.append('f.business_id = :business_id')
+        params['business_id'] = business_id
+    if intent:
+        clauses.append('c.intent_detected = :intent')
+        params['intent'] = intent
+    if start:
+        clauses.append('c.created_at >= :start')
+        params['start'] = start
+    if end:
+        clauses.append('c.created_at < :end')
+        params['end'] = end
+    return clauses
+
+def search(query: str, business_id: Optional[int] = None, intent: Optional[str] = None,
+           start: Optional[datetime] = None, end: Optional[datetime] = None,
+           page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    """Search transcript turns, best matches first, with highlighted snippets"""
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    if not is_available():
+        return _search_like(query, business_id, intent, start, end, page, per_page)
+
+    if backend() == 'tsvector':
+        return _search_tsvector(query, business_id, intent, start, end, page, per_page)
+
+    match = build_match_query(query)
+    if not match:
+        return {'results': [], 'page': page, 'per_page': per_page, 'has_more': False}
+
+    params = {'match': match, 'limit': per_page + 1, 'offset': (page - 1) * per_page}
+    where = [f'{FTS_TABLE} MATCH :match'] + _filters(business_id, intent, start, end, params)
+    rows = db.session.execute(text(f"""
+        SELECT f.call_log_id, f.speaker, f.created_at,
+               snippet({FTS_TABLE}, 0, '[', ']', '…', 12) AS snippet,
+               c.business_id, c.call_sid, c.from_number, c.intent_detected, c.created_at AS call_started_at
+        FROM {FTS_TABLE} AS f
+        JOIN call_logs AS c ON c.id = f.call_log_id
+        WHERE {' AND '.join(where)}
+        ORDER BY bm25({FTS_TABLE})
+        LIMIT :limit OFFSET :offset
+    """), params).mappings().all()
+
+    return {
+        'results': [_result(row) for row in rows[:per_page]],
+        'page': page,
+        'per_page': per_page,
+        'has_more': len(rows) > per_page
+    }
+
+def _search_tsvector(query, business_id, intent, start, end, page, per_page) -> Dict[str, Any]:
+    """Postgres: GIN index lookup ranked by ts_rank; ts_headline runs only on the page returned"""
+    tsquery = build_tsquery(query)
+    if not tsquery:
+        return {'results': [], 'page': page, 'per_page': per_page, 'has_more': False}
+
+    params = {'tsquery': tsquery, 'limit': per_page + 1, 'offset': (page - 1) * per_page}
+    where = ["f.document @@ to_tsquery('simple', :tsquery)"] + _filters(business_id, intent, start, end, params)
+    rows = db.session.execute(text(f"""
+        SELECT hit.call_log_id, hit.speaker, hit.created_at,
+               ts_headline('simple', hit.content, to_tsquery('simple', :tsquery),
+                           'StartSel=[, StopSel=], MaxWords=12, MinWords=4') AS snippet,
+               hit.business_id, hit.call_sid, hit.from_number, hit.intent_detected, hit.call_started_at
+        FROM (
+            SELECT f.call_log_id, f.speaker, f.created_at, f.content,
+                   c.business_id, c.call_sid, c.from_number, c.intent_detected, c.created_at AS call_started_at,
+                   ts_rank(f.document, to_tsquery('simple', :tsquery)) AS rank
+            FROM {TSV_TABLE} AS f
+            JOIN call_logs AS c ON c.id = f.call_log_id
+            WHERE {' AND '.join(where)}
+            ORDER BY rank DESC
+            LIMIT :limit OFFSET :offset
+        ) AS hit
+        ORDER BY hit.rank DESC
+    """), params).mappings().all()
+
+    return {
+        'results': [_result(row) for row in rows[:per_page]],
+        'page': page,
+        'per_page': per_page,
+        'has_more': len(rows) > per_page
+    }
+
+def _like_pattern(term: str) -> str:
+    """%term% with the LIKE wildcards in term matched literally"""
+    for char in (LIKE_ESCAPE, '%', '_'):
+        term = term.replace(char, LIKE_ESCAPE + char)
+    return f"%{term}%"
+
+def _search_like(query, business_id, intent, start, end, page, per_page) -> Dict[str, Any]:
+    """Substring search for databases without a full-text index.
+
+    Stored transcripts are not normalized, so the query matches either as
+    typed or normalized ("الأشعة" also finds "الاشعه").
+    """
+    terms = list(dict.fromkeys((query, normalize_arabic(query))))
+    calls = CallLog.query.filter(or_(*(CallLog.transcript.ilike(_like_pattern(term), escape=LIKE_ESCAPE)
+                                       for term in terms)))
+    if business_id is not None:
+        calls = calls.filter(CallLog.business_id == business_id)
+    if intent:
+        calls = calls.filter(CallLog.intent_detected == intent)
+    if start:
+        calls = calls.filter(CallLog.created_at >= start)
+    if end:
+        calls = calls.filter(CallLog.created_at < end)
+    rows = calls.order_by(CallLog.id.desc()).offset((page - 1) * per_page).limit(per_page + 1).all()
+
+    results = []
+    for call_log in rows[:per_page]:
+        transcript = call_log.transcript.lower()
+        position, length = next(((transcript.find(term.lower()), len(term)) for term in terms
+                                 if term.lower() in transcript), (0, 0))
+        results.append({
+            'call_log_id': call_log.id,
+            'business_id': call_log.business_id,
+            'call_sid': call_log.call_sid,
+            'from_number': call_log.from_number,
+            'intent': call_log.intent_detected,
+            'speaker': None,
+            'snippet': call_log.transcript[max(position - 60, 0):position + 60 + length],
+            'call_started_at': call_log.created_at.isoformat() if call_log.created_at else None
+        })
+    return {'results': results, 'page': page, 'per_page': per_page, 'has_more': len(rows) > per_page}
+
+def _result(row) -> Dict[str, Any]:
+    started_at = row['call_started_at']
+    return {
+        'call_log_id': row['call_log_id'],
+        'business_id': row['business_id'],
+        'call_sid': row['call_sid'],
+        'from_number': row['from_number'],
+        'intent': row['intent_detected'],
+        'speaker': row['speaker'],
+        'snippet': row['snippet'],
+        'call_started_at': started_at.isoformat() if isinstance(started_at, datetime) else started_at
+    }
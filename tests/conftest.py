@@ -0,0 +1,28 @@
+"""Shared fixtures: the Flask app on a scratch database with fake provider clients"""
+import os
+import tempfile
+
+import pytest
+
+_fd, _path = tempfile.mkstemp(prefix='voice-test-', suffix='.db')
+os.close(_fd)
+os.environ['DATABASE_URL'] = f"sqlite:///{_path}"
+os.environ.setdefault('HEALTH_CHECK_INTERVAL', '3600')
+
+@pytest.fixture(scope='session')
+def app():
+    from benchmarks.fakes import FakeLLMClient, FakeElevenLabs, FakeTwilioClient
+    from benchmarks.harness import build_app
+
+    app = build_app(FakeLLMClient(ttft=0, tokens_per_second=1e6), FakeElevenLabs(latency=0),
+                    FakeTwilioClient(latency=0), os.environ['DATABASE_URL'])
+    app.config['TESTING'] = True
+    yield app
+    from src.services.tenant_limits import tenant_limiter
+    with app.app_context():
+        tenant_limiter.flush()  # before the database goes, rather than at exit
+    os.unlink(_path)
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
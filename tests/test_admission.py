@@ -0,0 +1,56 @@
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+from benchmarks.fakes import call_sid, speech_form, voice_call_form
+from benchmarks.harness import BUSINESS_PHONE
+from src.models.voice_models import CallLog
+from src.services.admission import llm_scheduler, LIVE
+from src.services.provider_registry import providers
+from src.services.tenant_registry import tenants
+
+CALLER = '+966500000043'
+QUESTION = 'Can you explain how a consultation differs from a follow up visit?'
+
+def test_test_traffic_is_shed_while_callers_wait_for_the_llm(app, client, monkeypatch):
+    # A threaded server, like a gthread worker: requests in one process run concurrently
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    monkeypatch.setattr(llm_scheduler, 'capacity', 2)
+    monkeypatch.setattr(providers.client('openai'), 'ttft', 0.5)
+
+    calls = []
+    for n in range(3):
+        sid = call_sid(4300 + n)
+        client.post('/api/webhook/twilio/voice', data=voice_call_form(sid, CALLER, BUSINESS_PHONE))
+        with app.app_context():
+            calls.append((sid, CallLog.query.filter_by(call_sid=sid).one().id))
+    business_id = tenants.get_by_phone(BUSINESS_PHONE)['id']
+
+    live = []
+
+    def caller_turn(sid, call_log_id):
+        live.append(requests.post(f'{base}/api/webhook/twilio/process/{call_log_id}?turn=1',
+                                  data=speech_form(sid, CALLER, BUSINESS_PHONE, QUESTION), timeout=10))
+
+    threads = [threading.Thread(target=caller_turn, args=call) for call in calls]
+    try:
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while not llm_scheduler.waiting([LIVE]) and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert llm_scheduler.waiting([LIVE]), 'the third caller should be queued for the LLM'
+        shed = requests.post(f'{base}/api/businesses/{business_id}/test-voice',
+                             json={'message': QUESTION}, timeout=10)
+        for thread in threads:
+            thread.join(10)
+    finally:
+        server.shutdown()
+
+    assert shed.status_code == 503
+    assert shed.headers['Retry-After']
+    assert [response.status_code for response in live] == [200, 200, 200]
@@ -0,0 +1,36 @@
+from benchmarks.fakes import call_sid, voice_call_form
+from benchmarks.harness import BUSINESS_PHONE
+
+def test_app_imports_and_reports_alive(client):
+    response = client.get('/health')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'alive'}
+
+def test_voice_webhook_answers_with_twiml(client):
+    response = client.post('/api/webhook/twilio/voice', data=voice_call_form(call_sid(1), '+966500000001', BUSINESS_PHONE))
+    assert response.status_code == 200
+    assert b'<Gather' in response.data
+
+def test_stored_text_is_escaped_in_twiml(app, client):
+    from xml.etree import ElementTree
+    from benchmarks.fakes import speech_form
+    from src.models.voice_models import db, CallLog, Service
+    from src.services import fast_path
+    from src.services.tenant_registry import tenants
+
+    phone = '+966110003700'
+    with app.app_context():
+        business = tenants.create({'name': 'Smile <Dental> & Co', 'phone': phone})
+        db.session.add(Service(business_id=business['id'], name='Cleaning & Polishing', price=200.0,
+                               duration_minutes=30, is_active=True))
+        db.session.commit()
+        fast_path.invalidate(business['id'])
+
+    sid = call_sid(3701)
+    greeting = client.post('/api/webhook/twilio/voice', data=voice_call_form(sid, '+966500003701', phone))
+    assert 'Smile <Dental> & Co' in ''.join(ElementTree.fromstring(greeting.data).itertext())
+    with app.app_context():
+        call_log_id = CallLog.query.filter_by(call_sid=sid).one().id
+    reply = client.post(f'/api/webhook/twilio/process/{call_log_id}?turn=1',
+                        data=speech_form(sid, '+966500003701', phone, 'what services do you offer'))
+    assert 'Cleaning & Polishing' in ''.join(ElementTree.fromstring(reply.data).itertext())
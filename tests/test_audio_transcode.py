@@ -0,0 +1,77 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_transcode import speech_like
+from src.services.audio_transcode import (ULAW_SILENCE, TelephonyTranscoder, decode_ulaw, encode_ulaw,
+                                          transcode)
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    audioop = pytest.importorskip('audioop')  # removed in Python 3.13
+
+ALL_SAMPLES = np.arange(-32768, 32768, dtype=np.int32).astype(np.int16)
+
+def _frames(chunks, rate):
+    return [bytes(frame) for frame in transcode(chunks, rate)]
+
+def _split(data: bytes, sizes):
+    chunks, offset, n = [], 0, 0
+    while offset < len(data):
+        size = sizes[n % len(sizes)]
+        chunks.append(memoryview(data)[offset:offset + size])
+        offset, n = offset + size, n + 1
+    return chunks
+
+def test_ulaw_encoding_matches_audioop_for_every_sample():
+    assert encode_ulaw(ALL_SAMPLES).tobytes() == audioop.lin2ulaw(ALL_SAMPLES.tobytes(), 2)
+
+def test_ulaw_decoding_matches_audioop_for_every_code():
+    codes = bytes(range(256))
+    assert decode_ulaw(codes).astype('<i2').tobytes() == audioop.ulaw2lin(codes, 2)
+
+@pytest.mark.parametrize('rate', [8000, 16000, 22050, 24000, 44100])
+def test_output_does_not_depend_on_how_the_input_is_chunked(rate):
+    audio = speech_like(rate, 0.5)
+    whole = _frames([audio], rate)
+    assert _frames(_split(audio, [1, 3, 4096, 7, 320, 2, 1001]), rate) == whole
+    assert _frames(_split(audio, [1]), rate) == whole
+    assert all(len(frame) == 160 for frame in whole)
+
+@pytest.mark.parametrize('rate', [16000, 24000, 44100])
+def test_resampled_stream_keeps_its_duration(rate):
+    frames = _frames([speech_like(rate, 1.0)], rate)
+    assert abs(len(frames) - 50) <= 1  # 20 ms frames, plus the flushed filter tail
+
+def test_telephony_rate_input_is_only_encoded():
+    audio = speech_like(8000, 0.5)
+    encoded = b''.join(_frames([audio], 8000))
+    assert encoded == audioop.lin2ulaw(audio, 2)
+
+def test_last_frame_is_padded_with_silence():
+    transcoder = TelephonyTranscoder(8000)
+    assert list(transcoder.feed(np.zeros(100, dtype='<i2').tobytes())) == []
+    frames = [bytes(frame) for frame in transcoder.flush()]
+    assert len(frames) == 1 and frames[0][100:] == bytes([ULAW_SILENCE]) * 60
+
+@pytest.fixture
+def processor():
+    from benchmarks.fakes import FakeElevenLabs
+    from services.voice_service import VoiceProcessor
+    processor = VoiceProcessor()
+    processor.client = FakeElevenLabs(latency=0, chars_per_second=1e9)
+    return processor
+
+def test_telephony_audio_goes_through_the_sdk_text_to_speech_methods(processor):
+    text = 'Thank you for calling, how can I help you today?'
+    wav = processor.synthesize_telephony(text, 'voice_without_library')
+    assert wav[:4] == b'RIFF' and len(wav) > 44
+    frames = list(processor.telephony_frames(text, 'voice_without_library'))
+    assert frames and all(len(frame) == 160 for frame in frames)
+    assert len(frames) == pytest.approx(len(text) / 15 * 50, abs=1)
+
+def test_the_fake_tts_client_only_accepts_what_the_sdk_does(processor):
+    assert not hasattr(processor.client, 'generate')
+    with pytest.raises(TypeError):
+        processor.client.text_to_speech.convert(voice_id='v', text='hi', voice='v', model='eleven_multilingual_v2')
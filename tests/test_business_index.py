@@ -0,0 +1,42 @@
+import pytest
+
+from benchmarks.harness import BUSINESS_PHONE
+from src.services import business_index
+from src.services.business_index import tokenize
+
+@pytest.mark.parametrize('plural, singular', [
+    ('services', 'service'), ('doctors', 'doctor'), ('nurses', 'nurse'), ('fees', 'fee'),
+    ('branches', 'branch'), ('boxes', 'box'), ('classes', 'class'), ('dishes', 'dish'),
+])
+def test_plurals_index_as_their_singular(plural, singular):
+    assert tokenize(plural) == tokenize(singular) == [singular]
+
+@pytest.mark.parametrize('word', ['business', 'analysis', 'status', 'parking', 'closed'])
+def test_words_that_are_not_plurals_are_kept(word):
+    assert tokenize(word) == [word]
+
+def test_arabic_article_and_stopwords_are_dropped():
+    assert tokenize('ما هي أسعار الأشعة في العيادة') == tokenize('اسعار اشعه عياده')
+    assert tokenize('What are your opening hours?') == ['opening', 'hour']
+
+def test_search_finds_the_snippet_the_question_is_about():
+    index = business_index.build(
+        'Family clinic in Riyadh. Free parking is available behind the building.',
+        [('Teeth Cleaning', 200.0, 45, None), ('X-Ray', 250.0, 30, None)],
+        [{'question': 'Do you accept insurance?', 'answer': 'Yes, Bupa and Tawuniya.'}])
+    assert index.context('Do you have parking?') == [
+        'Family clinic in Riyadh. Free parking is available behind the building.']
+    assert index.context('how much are your cleanings', k=1)[-1] == 'Service: Teeth Cleaning (200 SAR, 45 min)'
+    assert 'Bupa' in index.context('which insurances do you take', k=1)[-1]
+
+def test_the_conversation_prompt_carries_details_relevant_to_the_message(app):
+    from src.routes.voice_routes import get_conversation_engine
+    from src.services.tenant_registry import tenants
+
+    with app.app_context():
+        business = tenants.get_by_phone(BUSINESS_PHONE)
+        engine = get_conversation_engine()
+        prompt = engine.build_system_prompt(business, message='Do you do x-rays?')
+        assert 'Relevant details:\n- Family clinic in Riyadh.' in prompt
+        assert '- Service: X-Ray (250 SAR, 30 min)' in prompt
+        assert 'Relevant details' not in engine.build_system_prompt(business)
@@ -0,0 +1,52 @@
+from benchmarks.fakes import call_sid, speech_form, status_form, voice_call_form
+from benchmarks.harness import BUSINESS_PHONE
+from src.models.voice_models import db, CallLog
+from src.models.analytics_models import CallRollup
+from src.services import call_analytics
+
+CALLER = '+966500000026'
+
+def _call(client, sid, utterances, status='completed'):
+    client.post('/api/webhook/twilio/voice', data=voice_call_form(sid, CALLER, BUSINESS_PHONE))
+    call_log = CallLog.query.filter_by(call_sid=sid).one()
+    for turn, speech in enumerate(utterances, 1):
+        client.post(f'/api/webhook/twilio/process/{call_log.id}?turn={turn}',
+                    data=speech_form(sid, CALLER, BUSINESS_PHONE, speech))
+    client.post('/api/webhook/twilio/status', data=status_form(sid, CALLER, BUSINESS_PHONE, 60, status))
+    db.session.expire_all()
+    return CallLog.query.filter_by(call_sid=sid).one()
+
+def _total(business_id, field):
+    rows = CallRollup.query.filter_by(business_id=business_id, granularity='day').all()
+    return sum(getattr(row, field) for row in rows)
+
+def _booking_requests(business_id):
+    return _total(business_id, 'booking_requests')
+
+def test_booking_request_is_latched_when_a_later_turn_changes_intent(app, client):
+    with app.app_context():
+        call_log = _call(client, call_sid(2601), ['I want to book an appointment'])
+        before = _booking_requests(call_log.business_id)
+
+        call_log = _call(client, call_sid(2602), ['I want to book an appointment', 'what are your prices'])
+        assert call_log.booking_requested
+        assert call_log.intent_detected != 'booking'
+        assert _booking_requests(call_log.business_id) == before + 1
+
+def test_rebuild_counts_the_same_as_incremental_updates(app, client):
+    with app.app_context():
+        call_log = _call(client, call_sid(2603), ['I want to book an appointment', 'what are your prices'])
+        db.session.commit()
+        incremental = _booking_requests(call_log.business_id)
+        call_analytics.rebuild_rollups(call_log.business_id)
+        assert _booking_requests(call_log.business_id) == incremental
+
+def test_canceled_calls_are_counted_as_failed(app, client):
+    with app.app_context():
+        call_log = _call(client, call_sid(2604), [])
+        calls, failed = _total(call_log.business_id, 'calls'), _total(call_log.business_id, 'failed_calls')
+
+        call_log = _call(client, call_sid(2605), [], status='canceled')
+        assert call_log.outcome == 'failed' and call_log.ended_at
+        assert _total(call_log.business_id, 'calls') == calls + 1
+        assert _total(call_log.business_id, 'failed_calls') == failed + 1
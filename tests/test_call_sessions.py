@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+
+from benchmarks.fakes import call_sid, speech_form, voice_call_form
+from benchmarks.harness import BUSINESS_PHONE
+from src.models.voice_models import db, Appointment, CallLog, Customer
+from src.routes import voice_routes
+from src.services.call_sessions import CallSessionCache, call_sessions
+from src.services.tenant_registry import tenants
+
+CALLER = '+966500000048'
+
+@pytest.fixture
+def business(app):
+    with app.app_context():
+        yield tenants.get_by_phone(BUSINESS_PHONE)
+
+@pytest.fixture
+def customer_id(app, business):
+    customer = Customer.query.filter_by(phone=CALLER).first()
+    if not customer:
+        customer = Customer(phone=CALLER, name='Noura', preferred_language='ar')
+        db.session.add(customer)
+        db.session.flush()
+        db.session.add(Appointment(business_id=business['id'], customer_id=customer.id,
+                                   appointment_date=datetime(2026, 10, 1, 10, 0), status='completed'))
+        db.session.commit()
+    return customer.id
+
+def _prompt(business, caller):
+    return f"prompt for {caller['name'] if caller else 'anyone'}"
+
+def test_a_preloaded_session_is_picked_up(app, business, customer_id):
+    cache = CallSessionCache(wait=5)
+    cache.start(app, 1, call_sid(4801), business, customer_id, _prompt)
+    session = cache.get(1)
+    assert session.caller['name'] == 'Noura'
+    assert session.prompt_prefix == 'prompt for Noura'
+
+def test_a_miss_loads_the_caller_inline(business, customer_id):
+    cache = CallSessionCache()
+    assert cache.get(2) is None
+    session = cache.get(2, business, customer_id, _prompt)
+    assert session.caller['appointments'][0]['status'] == 'completed'
+    assert session.prompt_prefix == 'prompt for Noura'
+    assert cache.get(3, business, None, _prompt) is None
+
+def test_expired_sessions_are_evicted(app, business, customer_id):
+    cache = CallSessionCache(ttl=60, wait=5)
+    cache.start(app, 4, call_sid(4804), business, customer_id, _prompt).started_at -= 61
+    assert cache.get(4) is None
+    assert 4 not in cache._sessions
+    cache.start(app, 5, call_sid(4805), business, customer_id, _prompt).started_at -= 61
+    cache.start(app, 6, call_sid(4806), business, customer_id, _prompt)
+    assert list(cache._sessions) == [6]
+
+def test_a_skipped_preload_still_personalizes_the_first_turn(app, client, customer_id, monkeypatch):
+    monkeypatch.setattr(call_sessions, 'max_pending', 0)
+    engine = voice_routes.get_conversation_engine()
+    sessions = []
+    original = engine.process_message
+    monkeypatch.setattr(engine, 'process_message', lambda **kwargs: sessions.append(kwargs['session']) or original(**kwargs))
+    sid = call_sid(4807)
+    client.post('/api/webhook/twilio/voice', data=voice_call_form(sid, CALLER, BUSINESS_PHONE))
+    with app.app_context():
+        call_log_id = CallLog.query.filter_by(call_sid=sid).one().id
+    client.post(f'/api/webhook/twilio/process/{call_log_id}?turn=1',
+                data=speech_form(sid, CALLER, BUSINESS_PHONE, 'Can you remind me what I had done last time?'))
+    assert sessions[0].caller['name'] == 'Noura'
+    assert 'Caller: Noura (prefers ar)' in sessions[0].prompt_prefix
@@ -0,0 +1,47 @@
+from src.services import circuit_breaker
+from src.services.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+def _breaker(**options):
+    return CircuitBreaker('test', min_requests=4, failure_threshold=0.5, open_seconds=30, **options)
+
+def test_opens_when_the_failure_rate_crosses_the_threshold():
+    breaker = _breaker()
+    for ok in (True, False, True):
+        breaker.record_success(0.1) if ok else breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+def test_half_open_lets_one_probe_through(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record_failure()
+    now[0] += 31
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    now[0] += 31
+    assert breaker.allow_request()
+    breaker.record_success(0.2)
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+def test_timeout_follows_recent_latency_within_bounds():
+    breaker = _breaker(timeout_floor=1.0, timeout_ceiling=10.0, timeout_multiplier=2.0)
+    assert breaker.timeout() == 10.0
+    for _ in range(10):
+        breaker.record_success(0.8)
+    assert breaker.timeout() == 1.6
+    for _ in range(10):
+        breaker.record_success(0.1)
+    assert breaker.timeout() == 1.6  # p99 still sees the slow calls in the window
+    fast = _breaker(timeout_floor=1.0, timeout_multiplier=2.0)
+    for _ in range(10):
+        fast.record_success(0.1)
+    assert fast.timeout() == 1.0
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+
+from src.services import fast_path
+
+WEEKDAYS = {day: {'open': '09:00', 'close': '17:00'} for day in ('sunday', 'monday', 'tuesday', 'wednesday', 'thursday')}
+MONDAY = datetime(2026, 10, 19, 10, 0, tzinfo=fast_path.SAUDI_TZ)
+
+@pytest.fixture
+def facts():
+    return fast_path.build_facts('Riyadh Clinic', WEEKDAYS, [('General Consultation', 150.0, 30), ('X-Ray', 250.0, 30)])
+
+def _hours(message, facts, now=MONDAY):
+    return fast_path.answer_intent('hours', message, facts, now)
+
+@pytest.mark.parametrize('message, expected', [
+    ('are you open today', "Yes, we're open today (Monday)"),
+    ('are you open tomorrow', "Yes, we're open tomorrow (Tuesday)"),
+    ('is the clinic open on friday', "No, we're closed on Friday. We're open Sunday from 9:00 AM"),
+    ('are you open on Wednesday?', "Yes, we're open on Wednesday from 9:00 AM to 5:00 PM"),
+    ('do you work on saturdays', "No, we're closed on Saturday"),
+    ('are you open on the weekend', "No, we're closed on Friday and Saturday. We're open Sunday"),
+])
+def test_english_questions_are_answered_for_the_day_asked(message, expected, facts):
+    assert _hours(message, facts).startswith(expected)
+
+@pytest.mark.parametrize('message, expected', [
+    ('هل أنتم مفتوحون اليوم', 'نعم، نحن مفتوحون اليوم (الاثنين)'),
+    ('هل تفتحون غداً', 'نعم، نحن مفتوحون غداً (الثلاثاء)'),
+    ('هل العيادة مفتوحة يوم الجمعة', 'لا، نحن مغلقون يوم الجمعة. نفتح يوم الأحد'),
+    ('تفتحون بالأربعاء؟', 'نعم، نحن مفتوحون يوم الأربعاء'),
+    ('هل تفتحون نهاية الأسبوع', 'لا، نحن مغلقون يوم الجمعة والسبت'),
+])
+def test_arabic_questions_are_answered_for_the_day_asked(message, expected, facts):
+    assert _hours(message, facts).startswith(expected)
+
+def test_several_days_are_listed_in_upcoming_order(facts):
+    saturday = MONDAY.replace(day=24)
+    assert _hours('are you open on friday or sunday', facts, saturday) == \
+        'Our hours: Sunday from 9:00 AM to 5:00 PM, Friday closed.'
+
+def test_tomorrow_and_a_different_day_is_left_to_the_llm(facts):
+    assert _hours('are you open tomorrow or thursday', facts) is None
+    assert _hours('are you open tomorrow, tuesday?', facts).startswith("Yes, we're open tomorrow (Tuesday)")
+
+def test_answer_goes_through_the_classifier(facts):
+    result = fast_path.answer('is the clinic open on friday', facts, MONDAY)
+    assert result['intent'] == 'hours'
+    assert 'closed on Friday' in result['response']
+
+@pytest.mark.parametrize('message', [
+    'what are your hours and how much is an x-ray',
+    'When are you open and what services do you offer?',
+    'ما هي مواعيد العمل والاسعار',
+    'متى تفتحون وبكم الكشف',
+    'Hi, I was wondering if you could tell me what your opening hours are on a normal weekday please',
+])
+def test_long_and_multi_part_questions_are_left_to_the_llm(message, facts):
+    assert fast_path.answer(message, facts, MONDAY) is None
+
+def test_a_price_is_given_only_for_a_listed_service(facts):
+    assert fast_path.answer_intent('pricing', 'how much is an x-ray', facts).startswith('The price for X-Ray is 250 SAR')
+    assert fast_path.answer_intent('pricing', 'كم سعر تنظيف الاسنان', facts) is None
+    assert fast_path.answer_intent('pricing', 'how much does teeth cleaning cost', facts) is None
+    assert fast_path.answer_intent('pricing', 'ما هي الاسعار', facts).startswith('أسعارنا: General Consultation 150 ريال')
+
+def test_malformed_hours_are_left_to_the_llm():
+    hours = dict(WEEKDAYS, sunday={'open': '9am', 'close': '5pm'})
+    facts = fast_path.build_facts('Riyadh Clinic', hours, [])
+    assert facts['hours']['sunday'] == fast_path.UNKNOWN
+    assert _hours('are you open on sunday', facts) is None
+    assert _hours('هل تفتحون يوم الأحد', facts) is None
+    assert _hours('is the clinic open on friday', facts) is None  # the next open day is unreadable
+    assert _hours('are you open on the weekend', facts) is None
+    assert _hours('are you open today', facts).startswith("Yes, we're open today (Monday)")
+    assert 'Sunday' not in fast_path.describe(facts)
+
+def test_hours_that_cannot_be_read_at_all_give_no_facts():
+    facts = fast_path.build_facts('Riyadh Clinic', {'monday': {'open': 'morning', 'close': 'evening'}}, [])
+    assert facts['hours'] is None
+    assert fast_path.answer('are you open today', facts, MONDAY) is None
@@ -0,0 +1,46 @@
+from src.services.health_monitor import HealthMonitor
+
+def _monitor(**checks):
+    monitor = HealthMonitor(interval=60)
+    for name, (result, critical) in checks.items():
+        monitor.register_check(name, (lambda result=result: result), critical=critical)
+    return monitor
+
+def test_not_ready_until_the_first_run():
+    snapshot = _monitor(database=((True, 'ok'), True)).snapshot()
+    assert snapshot['status'] == 'starting'
+    assert not snapshot['ready']
+
+def test_non_critical_failure_only_degrades():
+    monitor = _monitor(database=((True, 'ok'), True), ai_provider=((False, 'HTTP 503'), False))
+    monitor.run_checks()
+    snapshot = monitor.snapshot()
+    assert snapshot['status'] == 'degraded'
+    assert snapshot['ready']
+
+def test_critical_failure_and_exceptions_make_it_unavailable():
+    monitor = _monitor()
+    monitor.register_check('database', lambda: 1 / 0, critical=True)
+    monitor.run_checks()
+    snapshot = monitor.snapshot()
+    assert snapshot['status'] == 'unavailable'
+    assert not snapshot['ready']
+    assert 'division' in snapshot['checks']['database']['detail']
+
+def test_stale_results_are_not_ready():
+    monitor = _monitor(database=((True, 'ok'), True))
+    monitor.run_checks()
+    monitor._last_run -= monitor.stale_after + 1
+    assert monitor.snapshot()['status'] == 'stale'
+
+def test_liveness_probe_does_not_run_checks(app, client):
+    from src.main import health_monitor
+    runs = []
+    health_monitor.register_check('probe_counter', lambda: (runs.append(1) or True, 'ok'), critical=False)
+    try:
+        for _ in range(3):
+            assert client.get('/health/live').status_code == 200
+            client.get('/health/ready')
+        assert runs == []
+    finally:
+        health_monitor.checks.pop('probe_counter')
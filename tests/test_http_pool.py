@@ -0,0 +1,40 @@
+import socket
+
+from src.services import http_pool
+from src.services.http_pool import HttpPoolRegistry, _DnsCache
+
+def test_status_retries_only_for_idempotent_methods():
+    retries = HttpPoolRegistry().requests_session().get_adapter('https://api.twilio.com').max_retries
+    assert retries.is_retry('GET', 503)
+    assert not retries.is_retry('POST', 503)
+
+def test_twilio_client_has_its_own_session_without_retries():
+    pools = HttpPoolRegistry()
+    session = pools.twilio_http_client().session
+    assert session is pools.twilio_session() and session is not pools.requests_session()
+    assert session.get_adapter('https://api.twilio.com').max_retries.total == 0
+
+def test_dns_cache_is_opt_in():
+    assert not isinstance(getattr(socket.getaddrinfo, '__self__', None), _DnsCache)
+
+def test_dns_cache_expires_and_stays_bounded(monkeypatch):
+    lookups = []
+    now = [0.0]
+    monkeypatch.setattr(http_pool.time, 'monotonic', lambda: now[0])
+    cache = _DnsCache(ttl=60, max_entries=2)
+    cache._original = lambda host, port, *args, **kwargs: lookups.append(host) or [(host, port)]
+
+    cache.getaddrinfo('a.example', 443)
+    cache.getaddrinfo('a.example', 443)
+    assert lookups == ['a.example']
+    now[0] = 61
+    cache.getaddrinfo('a.example', 443)
+    assert lookups == ['a.example', 'a.example']
+
+    cache.getaddrinfo('b.example', 443)
+    cache.getaddrinfo('a.example', 443)  # most recently used
+    cache.getaddrinfo('c.example', 443)
+    assert len(cache._entries) == 2
+    cache.getaddrinfo('a.example', 443)
+    cache.getaddrinfo('b.example', 443)
+    assert lookups == ['a.example', 'a.example', 'b.example', 'c.example', 'b.example']
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from benchmarks.fakes import call_sid, speech_form, voice_call_form
+from benchmarks.harness import BUSINESS_PHONE
+from src.models.voice_models import CallLog
+from src.routes import voice_routes
+from src.services.idempotency import IdempotencyCache
+
+CALLER = '+966500000042'
+
+def test_a_retry_gets_the_stored_result():
+    cache, calls = IdempotencyCache(), []
+    first = cache.run('sms:SM1', lambda: calls.append(1) or '<Response>1</Response>')
+    again = cache.run('sms:SM1', lambda: calls.append(2) or '<Response>2</Response>')
+    assert first == again == '<Response>1</Response>'
+    assert calls == [1]
+
+def test_concurrent_retries_share_one_call():
+    cache, calls = IdempotencyCache(), []
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'twiml'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.run('voice:CA1', slow)))
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.run('voice:CA1', slow))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    assert results == ['twiml'] * 4
+    assert calls == [1]
+
+def test_failures_are_not_stored():
+    cache, calls = IdempotencyCache(), []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('provider down')
+        return 'twiml'
+
+    with pytest.raises(RuntimeError):
+        cache.run('sms:SM2', flaky)
+    assert cache.run('sms:SM2', flaky) == 'twiml'
+    assert len(calls) == 2
+
+def test_expired_results_and_missing_keys_run_again():
+    cache, calls = IdempotencyCache(ttl=-1), []
+    cache.run('sms:SM3', lambda: calls.append(1))
+    cache.run('sms:SM3', lambda: calls.append(1))
+    cache.run(None, lambda: calls.append(1))
+    cache.run(None, lambda: calls.append(1))
+    assert len(calls) == 4
+
+def test_oldest_results_are_evicted():
+    cache = IdempotencyCache(max_entries=2)
+    for n in range(3):
+        cache.run(f'sms:SM{n}', lambda n=n: n)
+    assert cache.run('sms:SM0', lambda: 'rerun') == 'rerun'
+    assert cache.run('sms:SM2', lambda: 'rerun') == 2
+
+def test_a_retried_speech_turn_is_answered_once(app, client, monkeypatch):
+    sid = call_sid(4201)
+    client.post('/api/webhook/twilio/voice', data=voice_call_form(sid, CALLER, BUSINESS_PHONE))
+    with app.app_context():
+        call_log_id = CallLog.query.filter_by(call_sid=sid).one().id
+    answered = []
+    original = voice_routes._answer_speech
+    monkeypatch.setattr(voice_routes, '_answer_speech', lambda *args: answered.append(args) or original(*args))
+    form = speech_form(sid, CALLER, BUSINESS_PHONE, 'what are your opening hours')
+    first = client.post(f'/api/webhook/twilio/process/{call_log_id}?turn=1', data=form)
+    retry = client.post(f'/api/webhook/twilio/process/{call_log_id}?turn=1', data=form)
+    assert first.status_code == retry.status_code == 200
+    assert first.data == retry.data
+    assert len(answered) == 1
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from src.services.intent_classifier import (BOOKING, GENERAL, GREETING, HOURS, PRICING, SERVICES,
+                                            IntentClassifier, intents, seed_examples)
+
+# Never in SEED_EXAMPLES; the model has to generalize to these
+HELD_OUT = [
+    ('وش مواعيدكم', HOURS), ('مواعيد العمل اليوم', HOURS), ('هل انتم فاتحين الحين', HOURS),
+    ('متى تقفلون يوم الاربعاء', HOURS), ('الساعة كم تفتحون', HOURS),
+    ('what are your opening hours on saturday', HOURS), ('are you open late tonight', HOURS),
+    ('when does the clinic close', HOURS),
+    ('how much is a filling', PRICING), ('what do you charge for braces', PRICING),
+    ('كم سعر تقويم الاسنان', PRICING), ('بكم الكشف', PRICING),
+    ('do you offer physiotherapy', SERVICES), ('what kind of treatments are available', SERVICES),
+    ('هل عندكم تحاليل دم', SERVICES), ('وش الخدمات اللي تقدمونها', SERVICES),
+    ('i would like an appointment on monday', BOOKING), ('can you book me with the dentist', BOOKING),
+    ('cancel my visit please', BOOKING), ('ابي احجز موعد بكره', BOOKING), ('ابغى الغي الحجز', BOOKING),
+    ('اريد موعد مع الطبيب', BOOKING),
+    ('good morning there', GREETING), ('hello there', GREETING), ('اهلين', GREETING),
+    ('do you take my insurance card', GENERAL), ('where can i park', GENERAL), ('وين مكانكم', GENERAL),
+    ('thanks so much', GENERAL), ('عندي مشكلة في الفاتورة', GENERAL),
+]
+ARABIC_HOURS = ['مواعيد العمل اليوم', 'وش مواعيدكم', 'هل انتم فاتحين الحين', 'متى تقفلون يوم الاربعاء', 'الساعة كم تفتحون']
+
+@pytest.fixture(scope='module')
+def predictions():
+    return intents.classify_batch([text for text, _ in HELD_OUT])
+
+def test_held_out_utterances_are_not_training_examples():
+    assert not {text for text, _ in HELD_OUT} & {text for text, _ in seed_examples()}
+
+def test_held_out_labels(predictions):
+    correct = [intent == expected for (intent, _), (_, expected) in zip(predictions, HELD_OUT)]
+    assert sum(correct) / len(correct) >= 0.75
+
+@pytest.mark.parametrize('text', ARABIC_HOURS)
+def test_arabic_hours_phrasings(text):
+    assert intents.classify(text)[0] == HOURS
+
+def test_confidence_ranks_right_answers_above_wrong_ones(predictions):
+    right = [confidence for (intent, confidence), (_, expected) in zip(predictions, HELD_OUT) if intent == expected]
+    wrong = [confidence for (intent, confidence), (_, expected) in zip(predictions, HELD_OUT) if intent != expected]
+    assert np.mean(right) > np.mean(wrong)
+    # The fast path answers at 0.85 and above, so nothing that confident may be wrong
+    assert all(confidence < 0.85 for confidence in wrong)
+
+def test_batch_matches_single_and_probabilities_sum_to_one():
+    texts = [text for text, _ in HELD_OUT[:6]]
+    assert intents.classify_batch(texts) == [intents.classify(text) for text in texts]
+    ranked = intents.ranked('كم سعر الكشف')
+    assert sum(probability for _, probability in ranked) == pytest.approx(1.0, abs=1e-5)
+    assert [p for _, p in ranked] == sorted((p for _, p in ranked), reverse=True)
+
+def test_empty_text_is_general_with_no_confidence():
+    assert intents.classify('  ') == (GENERAL, 0.0)
+
+def test_saved_model_loads_with_the_same_predictions(tmp_path):
+    model = IntentClassifier.train(seed_examples())
+    path = str(tmp_path / 'intent_model.npz')
+    model.save(path)
+    texts = [text for text, _ in HELD_OUT]
+    assert IntentClassifier.load(path).classify_batch(texts) == model.classify_batch(texts)
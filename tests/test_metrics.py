@@ -0,0 +1,50 @@
+import os
+
+from src.services import metrics
+from src.services.metrics import MetricsRegistry
+
+def _registry(directory=None):
+    registry = MetricsRegistry()
+    registry.counter('turns_total', 'Turns', ['channel'])
+    registry.histogram('stage_seconds', 'Stage time', ['stage'], buckets=(0.1, 1.0))
+    if directory:
+        registry.share(str(directory), interval=3600)
+    return registry
+
+def test_histogram_renders_cumulative_buckets():
+    registry = _registry()
+    for seconds in (0.05, 0.5, 5.0):
+        registry.metrics['stage_seconds'].observe(seconds, 'llm')
+    text = registry.render()
+    assert 'stage_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="llm",le="1.0"} 2' in text
+    assert 'stage_seconds_bucket{stage="llm",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{stage="llm"} 3' in text
+
+def test_observe_stage_feeds_the_turn_histogram():
+    metrics.observe_stage('test_stage', 0.2)
+    assert 'voice_turn_stage_seconds_count{stage="test_stage"}' in metrics.registry.render()
+
+def test_shared_directory_sums_every_process(tmp_path):
+    registry = _registry(tmp_path)
+    registry.metrics['turns_total'].inc('voice')
+    registry.metrics['stage_seconds'].observe(0.5, 'llm')
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            registry.reset()
+            registry.metrics['turns_total'].inc('voice', amount=2)
+            registry.metrics['stage_seconds'].observe(0.05, 'llm')
+            registry.shared.write()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    for _ in range(2):  # the exited worker is folded into the archive on the first render
+        text = registry.render()
+        assert 'turns_total{channel="voice"} 3.0' in text
+        assert 'stage_seconds_count{stage="llm"} 2' in text
+        assert 'stage_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert set(os.listdir(tmp_path)) == {'.lock', 'metrics-archive.json', os.path.basename(registry.shared.path)}
+    registry.shared.stop()
@@ -0,0 +1,49 @@
+from benchmarks.fakes import call_sid, speech_form, voice_call_form
+from benchmarks.harness import BUSINESS_PHONE
+from src.models.voice_models import CallLog
+from src.services import model_routing
+from src.services.model_routing import FAST, LARGE, TIER_MODELS, route
+from src.services.provider_registry import PROVIDERS
+from src.services.tenant_limits import PRICES_PER_MILLION
+
+CALLER = '+966500000045'
+QUESTION = 'Can you explain how a consultation differs from a follow up visit?'
+
+def test_fast_models_differ_from_the_provider_defaults_and_are_priced():
+    for provider, model in TIER_MODELS[FAST].items():
+        assert model != PROVIDERS[provider]['model'], provider
+        assert model in PRICES_PER_MILLION, model
+
+def test_short_factual_turns_go_fast_until_the_call_gets_long():
+    assert route('pricing', 'how much is an x-ray', turn=0, default_provider='openai').model == 'gpt-4.1-nano'
+    long = route('pricing', 'how much is an x-ray', turn=6, default_provider='openai')
+    assert (long.tier, long.reason, long.model) == (LARGE, 'long_conversation', None)
+
+def _turns(client, app, sid, count):
+    client.post('/api/webhook/twilio/voice', data=voice_call_form(sid, CALLER, BUSINESS_PHONE))
+    with app.app_context():
+        call_log_id = CallLog.query.filter_by(call_sid=sid).one().id
+    for turn in range(1, count + 1):
+        client.post(f'/api/webhook/twilio/process/{call_log_id}?turn={turn}',
+                    data=speech_form(sid, CALLER, BUSINESS_PHONE, QUESTION))
+
+def test_turns_are_counted_per_call_not_per_business(app, client, monkeypatch):
+    routed = []
+    original = model_routing.route
+
+    def spy(*args, **kwargs):
+        routed.append(kwargs['turn'])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(model_routing, 'route', spy)
+    _turns(client, app, call_sid(4501), 3)
+    _turns(client, app, call_sid(4502), 1)
+    assert routed == [0, 1, 2, 0]
+
+def test_each_turn_is_classified_once(app, client, monkeypatch):
+    from src.services.intent_classifier import intents
+    classified = []
+    original = intents.classify
+    monkeypatch.setattr(intents, 'classify', lambda text: classified.append(text) or original(text))
+    _turns(client, app, call_sid(4503), 2)
+    assert classified == [QUESTION, QUESTION]
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.services import fast_path, phrase_audio
+from src.services.phrase_audio import PhraseLibrary, number_keys
+
+SERVICES = [('General Consultation', 150.0, 30), ('X-Ray', 250.0, 30)]
+HOURS = {day: {'open': '09:00', 'close': '17:00'} for day in ('sunday', 'monday', 'tuesday', 'wednesday', 'thursday')}
+MONDAY = datetime(2026, 10, 19, 10, 0, tzinfo=fast_path.SAUDI_TZ)
+
+@pytest.fixture(scope='module')
+def library():
+    fragments = phrase_audio.inventory([name for name, _, _ in SERVICES])
+    return PhraseLibrary('voice', {key: np.full(80, 1000, dtype=np.int16) for key in fragments})
+
+@pytest.fixture(scope='module')
+def facts():
+    return fast_path.build_facts('Riyadh Clinic', HOURS, SERVICES)
+
+def test_longest_phrase_wins_and_punctuation_becomes_pauses(library):
+    assert library.plan("Yes, we're open today (Monday) from 9:30 AM to 5:00 PM.") == [
+        "say:yes we're open today", 'say:monday', 'say:from', 'en.hour:9', 'en.minute:30', 'en.ampm:am',
+        'say:to', 'en.hour:5', 'en.ampm:pm', '.']
+
+def test_prices_are_read_as_number_fragments(library):
+    assert library.plan('The price for X-Ray is 1250.5 SAR (30 minutes).') == [
+        'say:the price for', 'say:x ray', 'say:is', 'en.num:1000', 'en.num:200', 'en.num:50',
+        'en.point:', 'en.num:5', 'say:sar', 'en.num:30', 'say:minutes', '.']
+    assert number_keys('ar', '1250') == ['ar.num:1000', 'ar.andnum:200', 'ar.andnum:50']
+    assert number_keys('en', '0') == ['en.num:0']
+
+def test_anything_missing_from_the_library_goes_to_tts(library):
+    assert library.plan('The price for Teeth Cleaning is 200 SAR.') is None
+    assert library.plan('The price for X-Ray is 25000 SAR.') is None
+    assert library.plan("We're open at 9:00 AM today") is not None
+    assert library.plan('We are open late') is None
+
+@pytest.mark.parametrize('intent, message', [
+    ('hours', 'are you open today'),
+    ('hours', 'are you open tomorrow'),
+    ('hours', 'هل أنتم مفتوحون اليوم'),
+    ('hours', 'هل تفتحون غداً'),
+    ('pricing', 'how much is an x-ray'),
+    ('pricing', 'what are your prices'),
+    ('pricing', 'ما هي الاسعار'),
+])
+def test_fast_path_replies_are_covered(intent, message, library, facts):
+    reply = fast_path.answer_intent(intent, message, facts, MONDAY)
+    assert library.plan(reply), reply
+
+def test_render_drops_the_trailing_pause(library):
+    with_pause = library.render('Monday.')
+    assert len(with_pause) == len(library.render('Monday')) == 80
+
+def _build(monkeypatch, tmp_path, tts):
+    import services.voice_service as voice_service
+    monkeypatch.setenv('ELEVENLABS_API_KEY', 'test-key')
+    monkeypatch.setattr(voice_service, 'ElevenLabs', lambda **kwargs: tts)
+    return phrase_audio.main(['builder_voice', '--out-dir', str(tmp_path), '--workers', '8'])
+
+def test_library_builder_synthesizes_every_fragment(monkeypatch, tmp_path):
+    from benchmarks.fakes import FakeElevenLabs
+    assert _build(monkeypatch, tmp_path, FakeElevenLabs(latency=0, chars_per_second=1e9)) == 0
+    library = PhraseLibrary.load(phrase_audio.library_path('builder_voice', str(tmp_path)), 'builder_voice')
+    assert set(library.fragments) == set(phrase_audio.inventory())
+
+def test_library_builder_fails_instead_of_writing_a_partial_library(monkeypatch, tmp_path):
+    from benchmarks.fakes import FakeElevenLabs
+    assert _build(monkeypatch, tmp_path, FakeElevenLabs(latency=0, error_rate=1.0)) == 1
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,47 @@
+import pytest
+
+from benchmarks.fakes import FakeLLMClient
+from src.services.provider_registry import ProviderRegistry, ProviderUnavailable, PROVIDERS, parse_ai_config
+
+def _registry(**clients):
+    registry = ProviderRegistry()
+    registry._keys = dict.fromkeys(PROVIDERS, '')
+    for name, client in clients.items():
+        registry.register_client(name, client)
+    return registry
+
+def _fake(**options):
+    return FakeLLMClient(ttft=0, tokens_per_second=1e6, **options)
+
+def test_clients_are_built_once_and_shared():
+    registry = ProviderRegistry()
+    registry._keys = dict.fromkeys(PROVIDERS, '')
+    registry.configure(openai='sk-test')
+    assert registry.configured() == ['openai']
+    assert registry.client('openai') is registry.client('openai')
+    with pytest.raises(ProviderUnavailable):
+        registry.client('groq')
+
+def test_candidates_follow_the_tenant_config():
+    registry = _registry(openai=_fake(), groq=_fake())
+    registry.default_provider = 'openai'
+    assert registry.candidates({'provider': 'groq', 'model': 'llama-small'}) == [
+        ('groq', 'llama-small'), ('openai', PROVIDERS['openai']['model'])]
+    assert registry.candidates('{"provider": "anthropic"}')[0][0] == 'openai'  # not configured
+
+def test_chat_fails_over_and_reports_usage():
+    failing, working = _fake(error_rate=1.0), _fake(reply='We open at nine')
+    registry = _registry(openai=failing, groq=working)
+    result = registry.chat([{'role': 'user', 'content': 'when do you open'}], {'provider': 'openai'})
+    assert failing.calls == 1
+    assert result['provider'] == 'groq'
+    assert result['text'] == 'We open at nine'
+    assert result['usage']['completion_tokens'] > 0
+
+def test_chat_without_providers_is_unavailable():
+    with pytest.raises(ProviderUnavailable):
+        _registry().chat([{'role': 'user', 'content': 'hello'}])
+
+def test_malformed_ai_config_is_ignored():
+    assert parse_ai_config('{not json') == {}
+    assert parse_ai_config(None) == {}
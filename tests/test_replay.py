@@ -0,0 +1,33 @@
+import json
+
+from benchmarks.replay import sessions_from_transcript, load_from_corpus, db_contention
+
+TRANSCRIPT = "\nCustomer: are you open today\nAI: Yes, until 5 PM.\nCustomer: book me at 3\nAI: Done."
+
+def test_sessions_replay_the_recorded_caller_turns():
+    sessions = sessions_from_transcript([
+        {'from_number': '+966500000032', 'to_number': '+966110000000', 'transcript': TRANSCRIPT, 'duration': 75},
+        {'from_number': '+966500000033', 'to_number': '+966110000000', 'transcript': None, 'duration': 0},
+    ])
+    assert len(sessions) == 1
+    assert sessions[0]['turns'] == ['are you open today', 'book me at 3']
+    assert sessions[0]['replies'] == ['Yes, until 5 PM.', 'Done.']
+    assert sessions[0]['duration'] == 75
+
+def test_corpus_accepts_turn_lists_and_transcripts(tmp_path):
+    corpus = tmp_path / 'calls.jsonl'
+    corpus.write_text('\n'.join([
+        json.dumps({'to': '+966110000000', 'turns': ['hello', 'bye']}),
+        '',
+        json.dumps({'to': '+966110000000', 'transcript': TRANSCRIPT}),
+    ]), encoding='utf-8')
+    sessions = load_from_corpus(str(corpus))
+    assert [session['turns'] for session in sessions] == [['hello', 'bye'], ['are you open today', 'book me at 3']]
+    assert sessions[0]['duration'] == 60
+
+def test_db_contention_uses_histogram_deltas():
+    before = {'sum': 1.0, 'count': 10, 'buckets': {'0.01': 8, '0.1': 10, '+Inf': 10}}
+    after = {'sum': 3.0, 'count': 110, 'buckets': {'0.01': 50, '0.1': 105, '+Inf': 110}}
+    assert db_contention(before, after) == {'commits': 100, 'mean_ms': 20.0, 'p95_upper_bound_s': '0.1'}
+    assert db_contention(before, before) == {'commits': 0}
+    assert db_contention(None, after) is None
@@ -0,0 +1,128 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from benchmarks.fakes import FakeTwilioServer, rest_twilio_client, message_sid
+from src.services import sms_outbox as sms_outbox_module
+from src.services.sms_outbox import SmsOutbox, OutboundSms, is_retryable
+
+@pytest.fixture(scope='module')
+def server():
+    server = FakeTwilioServer(latency=0).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def twilio(server):
+    server.sent.clear()
+    server.requests = 0
+    return rest_twilio_client(server.url)
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff delays the workers asked for, without waiting them out; drain() still polls for real"""
+    delays = []
+
+    def sleep(seconds):
+        if threading.current_thread() is threading.main_thread():
+            time.sleep(seconds)
+        else:
+            delays.append(seconds)
+
+    monkeypatch.setattr(sms_outbox_module, 'time', SimpleNamespace(
+        sleep=sleep, monotonic=time.monotonic, perf_counter=time.perf_counter))
+    return delays
+
+def _send(outbox, n, body='Thanks, see you at 5'):
+    sms = OutboundSms(message_sid(n), '+966500000041', '+966110000000', lambda: body)
+    assert outbox.enqueue(sms)
+    assert outbox.drain(timeout=10)
+    return sms
+
+def test_each_reply_is_sent_exactly_once(twilio, server):
+    outbox = SmsOutbox(workers=2)
+    outbox.start(twilio)
+    for n in range(5):
+        _send(outbox, n, f'reply {n}')
+    assert sorted(sms['body'] for sms in server.sent) == [f'reply {n}' for n in range(5)]
+    assert server.requests == 5
+
+def test_rate_limiting_is_retried_with_backoff(twilio, server, sleeps):
+    outbox = SmsOutbox(workers=1, backoff=0.5, max_backoff=8)
+    outbox.start(twilio)
+    server.script(429, 429)
+    sms = _send(outbox, 10)
+    assert sms.attempts == 3
+    assert len(server.sent) == 1
+    assert len(sleeps) == 2
+    assert 0.25 <= sleeps[0] <= 0.5 and 0.5 <= sleeps[1] <= 1.0
+
+@pytest.mark.parametrize('status', [400, 500, 502, 503, 504])
+def test_other_errors_are_not_retried(status, twilio, server, sleeps):
+    outbox = SmsOutbox(workers=1)
+    outbox.start(twilio)
+    server.script(status)
+    sms = _send(outbox, 20)
+    assert sms.attempts == 1
+    assert server.sent == [] and sleeps == []
+
+def test_a_dropped_connection_after_sending_is_not_retried(twilio, server, sleeps):
+    outbox = SmsOutbox(workers=1)
+    outbox.start(twilio)
+    server.script('drop')
+    sms = _send(outbox, 30)
+    assert sms.attempts == 1
+    assert len(server.sent) == 1 and server.requests == 1
+
+def test_full_queue_is_refused_so_the_webhook_can_reply_inline(twilio, server):
+    outbox = SmsOutbox(workers=1, max_queue=1)
+    outbox.start(twilio)
+    release = threading.Event()
+
+    def blocked():
+        release.wait(5)
+        return 'composed late'
+
+    sending = OutboundSms(message_sid(40), '+966500000041', '+966110000000', blocked)
+    assert outbox.enqueue(sending)
+    deadline = time.monotonic() + 5
+    while outbox.depth() and time.monotonic() < deadline:
+        time.sleep(0.005)  # the worker has picked it up
+    assert outbox.enqueue(OutboundSms(message_sid(41), '+966500000041', '+966110000000', lambda: 'queued'))
+    assert not outbox.enqueue(OutboundSms(message_sid(42), '+966500000041', '+966110000000', lambda: 'refused'))
+    release.set()
+    assert outbox.drain(timeout=10)
+    assert sorted(sms['body'] for sms in server.sent) == ['composed late', 'queued']
+
+def test_only_errors_before_the_request_left_are_retryable():
+    try:
+        requests.post('http://127.0.0.1:9/', timeout=1)  # nothing listens on the discard port
+    except requests.exceptions.ConnectionError as e:
+        refused = e
+    assert is_retryable(refused)
+    assert is_retryable(requests.exceptions.ConnectTimeout())
+    assert not is_retryable(requests.exceptions.ReadTimeout())
+    assert not is_retryable(requests.exceptions.RetryError())
+    assert not is_retryable(requests.exceptions.ConnectionError('Connection aborted'))
+    assert not is_retryable(RuntimeError('unknown'))
+
+def test_queued_replies_are_sent_before_the_process_exits(twilio, server, monkeypatch):
+    handlers = []
+    monkeypatch.setattr(sms_outbox_module.atexit, 'register', handlers.append)
+    monkeypatch.setattr(sms_outbox_module.atexit, 'unregister', lambda handler: None)
+    outbox = SmsOutbox(workers=1)
+    outbox.start(twilio)
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return 'sent at exit'
+
+    assert outbox.enqueue(OutboundSms(message_sid(50), '+966500000041', '+966110000000', slow))
+    threading.Timer(0.05, release.set).start()
+    [drain_at_exit] = handlers
+    drain_at_exit()
+    assert [sms['body'] for sms in server.sent] == ['sent at exit']
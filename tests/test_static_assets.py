@@ -0,0 +1,40 @@
+import gzip
+
+from src.services.static_assets import static_assets, REVALIDATE_CACHE_CONTROL
+
+def test_home_page_revalidates_with_etag(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == REVALIDATE_CACHE_CONTROL
+    etag = response.headers['ETag']
+
+    cached = client.get('/', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+def test_serves_the_smallest_accepted_encoding(client):
+    identity = client.get('/').data
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(response.data) == identity
+    assert 'Content-Encoding' not in client.get('/', headers={'Accept-Encoding': 'identity'}).headers
+
+def test_each_encoding_has_its_own_etag(client):
+    identity = client.get('/', headers={'Accept-Encoding': 'identity'})
+    gzipped = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert identity.headers['ETag'] != gzipped.headers['ETag']
+    assert gzipped.headers['ETag'].endswith('-gzip"')
+
+    # A gzip tag does not validate the identity representation
+    stale = client.get('/', headers={'Accept-Encoding': 'identity', 'If-None-Match': gzipped.headers['ETag']})
+    assert stale.status_code == 200
+    fresh = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']})
+    assert fresh.status_code == 304
+
+def test_q_zero_refuses_an_encoding():
+    asset = static_assets.load('index.html')
+    assert asset.negotiate('gzip;q=0') == 'identity'
+    assert asset.negotiate('br;q=0, gzip;q=0.5') == 'gzip'
+    assert asset.negotiate('*;q=0') == 'identity'
+    assert asset.negotiate('*') in ('br', 'gzip')
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from src.models.voice_models import db, Business, Service
+from src.services.tenant_registry import tenants
+
+def test_bulk_import_matches_phones_stored_unnormalized(app):
+    with app.app_context():
+        legacy = Business(name='Legacy Dental', phone='+966 11 000-3900', updated_at=datetime.utcnow())
+        db.session.add(legacy)
+        db.session.commit()
+        count = Business.query.count()
+
+        results = tenants.bulk_import([
+            (1, {'name': 'Legacy Dental Clinic', 'phone': '+966110003900',
+                 'services': [{'name': 'Cleaning', 'price': 200.0}]}),
+            (2, {'name': 'New Optics', 'phone': '+966 11 000 3901'}),
+            (3, {'name': 'New Optics Riyadh', 'phone': '+966110003901'}),
+            (4, {'name': 'No Phone'}),
+        ])
+
+        assert [result['status'] for result in results] == ['updated', 'created', 'updated', 'error']
+        assert results[0]['id'] == legacy.id
+        assert results[1]['id'] == results[2]['id']
+        assert Business.query.count() == count + 1
+        assert db.session.get(Business, legacy.id).phone == '+966110003900'
+        assert tenants.get_by_phone('+966 11 000 3900')['name'] == 'Legacy Dental Clinic'
+        assert [service.name for service in Service.query.filter_by(business_id=legacy.id)] == ['Cleaning']
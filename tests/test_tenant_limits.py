@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import tenant_limits
+from src.services.tenant_limits import DEFAULT_LIMITS, MemoryBuckets, TenantLimiter, estimate_cost, limits_for
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tenant_limits, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def test_a_bucket_allows_its_burst_then_refills_at_the_rate(clock):
+    buckets = MemoryBuckets()
+    assert all(buckets.take('1:requests', 1.0, 3, 1) for _ in range(3))
+    assert not buckets.take('1:requests', 1.0, 3, 1)
+    clock[0] += 1.5
+    assert buckets.take('1:requests', 1.0, 3, 1)
+    assert not buckets.take('1:requests', 1.0, 3, 1)
+    clock[0] += 60
+    assert sum(buckets.take('1:requests', 1.0, 3, 1) for _ in range(5)) == 3
+
+def test_charged_debt_blocks_until_repaid_and_is_capped_at_one_burst(clock):
+    buckets = MemoryBuckets()
+    buckets.charge('1:tokens', 100.0, 1000, 5000)
+    assert not buckets.take('1:tokens', 100.0, 1000, 0)
+    clock[0] += 9.9  # debt of 1000 (not 4000) repaid at 100/s
+    assert not buckets.take('1:tokens', 100.0, 1000, 0)
+    clock[0] += 0.2
+    assert buckets.take('1:tokens', 100.0, 1000, 0)
+
+def test_tenants_have_separate_buckets(clock):
+    limiter = TenantLimiter(MemoryBuckets())
+    config = {'rate_limits': {'requests_per_minute': 60, 'request_burst': 2}}
+    assert [limiter.allow(1, config) for _ in range(3)] == [None, None, 'requests']
+    assert limiter.allow(2, config) is None
+    assert limiter.allow(None, config) is None
+
+def test_recorded_tokens_exhaust_the_token_budget(clock):
+    limiter = TenantLimiter(MemoryBuckets())
+    config = {'rate_limits': {'tokens_per_minute': 600}}
+    assert limiter.allow(3, config) is None
+    limiter.record(3, 'openai', 'gpt-4o-mini', {'prompt_tokens': 1500, 'completion_tokens': 200}, config)
+    assert limiter.allow(3, config) == 'tokens'
+
+def test_limits_default_and_override_per_tenant():
+    assert limits_for(None) is DEFAULT_LIMITS
+    limits = limits_for({'rate_limits': {'requests_per_minute': 600, 'tokens_per_minute': 1000}})
+    assert limits.request_burst == 200 and limits.token_burst == 2000
+    assert limits_for({'rate_limits': {'token_burst': 5}}).tokens_per_minute == DEFAULT_LIMITS.tokens_per_minute
+
+def test_cost_uses_input_and_output_prices():
+    assert estimate_cost('gpt-4o', 1_000_000, 100_000) == pytest.approx(3.5)
+    assert estimate_cost('unknown-model', 1000, 1000) == 0.0
+
+def test_pending_usage_is_flushed_at_exit(app, monkeypatch):
+    handlers = []
+    monkeypatch.setattr(tenant_limits.atexit, 'register', handlers.append)
+    monkeypatch.setattr(tenant_limits.atexit, 'unregister', lambda handler: None)
+    limiter = TenantLimiter(MemoryBuckets(), flush_interval=3600)
+    limiter.start(app)
+    limiter.record(4400, 'openai', 'gpt-4o-mini', {'prompt_tokens': 120, 'completion_tokens': 30})
+    [flush_at_exit] = handlers
+    flush_at_exit()
+    with app.app_context():
+        assert TenantLimiter().usage(4400)['totals']['prompt_tokens'] == 120
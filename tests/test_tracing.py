@@ -0,0 +1,53 @@
+from src.services.tracing import Tracer, parse_traceparent, root_span_id_for, trace_id_for
+
+class Collect:
+    def export(self, spans):
+        pass
+
+def _tracer():
+    tracer = Tracer()
+    tracer.exporter = Collect()  # enabled, but finished spans stay in the queue for inspection
+    return tracer
+
+def _finished(tracer):
+    return list(tracer._queue.queue)
+
+def test_every_hop_of_a_call_shares_one_trace():
+    tracer = _tracer()
+    with tracer.start_hop('twilio.voice', 'CA1', root=True) as root:
+        traceparent = tracer.current_traceparent()
+    with tracer.start_hop('twilio.gather', 'CA1', parse_traceparent(traceparent)[1]) as gather:
+        with tracer.span('llm') as llm:
+            tracer.record_span('db_commit', 0.002)
+    with tracer.start_hop('twilio.status', 'CA1') as status:
+        pass
+
+    assert root.span_id == root_span_id_for('CA1') and root.parent_id is None
+    assert gather.parent_id == root.span_id
+    assert llm.parent_id == gather.span_id
+    assert status.parent_id == root.span_id
+    spans = _finished(tracer)
+    assert {span.trace_id for span in spans} == {trace_id_for('CA1')}
+    assert [span.name for span in spans] == ['twilio.voice', 'db_commit', 'llm', 'twilio.gather', 'twilio.status']
+
+def test_errors_are_recorded_on_the_span():
+    tracer = _tracer()
+    try:
+        with tracer.start_hop('twilio.gather', 'CA2'):
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+    assert _finished(tracer)[0].error == 'boom'
+
+def test_disabled_tracer_is_a_no_op():
+    tracer = Tracer()
+    with tracer.start_hop('twilio.voice', 'CA3', root=True) as span:
+        tracer.record_span('db_commit', 0.01)
+    assert span is None
+    assert tracer.current_traceparent() is None
+    assert tracer._queue.empty()
+
+def test_malformed_traceparent_is_ignored():
+    assert parse_traceparent('00-abc-def-01') is None
+    assert parse_traceparent(None) is None
+    assert parse_traceparent(f"00-{'a' * 32}-{'b' * 16}-01") == ('a' * 32, 'b' * 16)
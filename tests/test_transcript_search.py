@@ -0,0 +1,67 @@
+from unittest import mock
+
+import pytest
+
+from src.models.voice_models import db, Business, CallLog
+from src.services import transcript_search
+
+@pytest.fixture
+def calls(app):
+    with app.app_context():
+        business = Business(name='Transcript Clinic', phone='+966110002700')
+        db.session.add(business)
+        db.session.flush()
+        transcripts = [
+            "\nCustomer: is the discount 100% off\nAI: No, it is 10 percent.",
+            "\nCustomer: is the discount 1000 riyals\nAI: No.",
+            "\nCustomer: my user_id is 42\nAI: Thanks.",
+            "\nCustomer: my userXid is 42\nAI: Thanks.",
+            "\nCustomer: كم سعر الاشعه\nAI: مئتان وخمسون ريال.",
+        ]
+        rows = [CallLog(business_id=business.id, call_sid=f'CA27{index:030d}', transcript=transcript)
+                for index, transcript in enumerate(transcripts)]
+        db.session.add_all(rows)
+        db.session.commit()
+        yield business.id, [row.id for row in rows]
+        CallLog.query.filter_by(business_id=business.id).delete()
+        db.session.delete(business)
+        db.session.commit()
+
+def _like(query, business_id):
+    return [row['call_log_id'] for row in transcript_search._search_like(query, business_id, None, None, None, 1, 20)['results']]
+
+def test_like_fallback_matches_wildcards_literally(calls):
+    business_id, ids = calls
+    assert _like('100%', business_id) == [ids[0]]
+    assert _like('user_id', business_id) == [ids[2]]
+
+def test_like_fallback_normalizes_arabic_query(calls):
+    business_id, ids = calls
+    assert _like('الأشعة', business_id) == [ids[4]]
+
+def test_reindex_commits_once(calls):
+    with mock.patch.object(db.session, 'commit', wraps=db.session.commit) as commit:
+        indexed = transcript_search.reindex_call_logs(batch_size=2)
+    assert indexed >= len(calls[1])
+    assert commit.call_count == 1
+    found = transcript_search.search('discount', business_id=calls[0])['results']
+    assert {row['call_log_id'] for row in found} == {calls[1][0], calls[1][1]}
+
+def test_tsquery_quotes_tokens_and_prefix_matches_the_last():
+    assert transcript_search.build_tsquery("x-ray it's") == "'x' & 'ray' & 'it' & 's':*"
+    assert transcript_search.build_tsquery('سعر الأشعة') == "('سعر' | 'السعر') & 'الاشعه':*"
+    assert transcript_search.build_tsquery('!!') is None
+
+def test_reindex_transcripts_command(app, calls):
+    result = app.test_cli_runner().invoke(args=['reindex-transcripts'])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith('Indexed transcripts for ')
+    with app.app_context():
+        found = transcript_search.search('userXid', business_id=calls[0])['results']
+    assert [row['call_log_id'] for row in found] == [calls[1][3]]
+
+def test_index_table_is_created_and_committed_at_startup(app):
+    from sqlalchemy import inspect
+    with app.app_context():
+        db.session.rollback()  # nothing a request left uncommitted can take the table away
+        assert transcript_search.FTS_TABLE in inspect(db.engine).get_table_names()
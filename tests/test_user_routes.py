@@ -0,0 +1,34 @@
+import pytest
+from flask import Flask
+
+from src.models.user import User, db
+from src.routes.user import user_bp
+
+@pytest.fixture(scope='module')
+def users_client():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(User(username=f'user{n}', email=f'user{n}@example.com') for n in range(3))
+        db.session.commit()
+    return app.test_client()
+
+def test_users_are_paginated_by_default(users_client):
+    body = users_client.get('/api/users').get_json()
+    assert [user['username'] for user in body['users']] == ['user0', 'user1', 'user2']
+    assert body['limit'] == 50 and body['next_cursor'] is None
+
+def test_users_page_through_the_cursor(users_client):
+    first = users_client.get('/api/users?limit=2').get_json()
+    assert [user['username'] for user in first['users']] == ['user0', 'user1']
+    second = users_client.get(f"/api/users?limit=2&cursor={first['next_cursor']}").get_json()
+    assert [user['username'] for user in second['users']] == ['user2']
+    assert second['next_cursor'] is None
+
+def test_users_field_selection(users_client):
+    body = users_client.get('/api/users?fields=username').get_json()
+    assert body['users'][0] == {'id': 1, 'username': 'user0'}
+    assert users_client.get('/api/users?fields=password').status_code == 400
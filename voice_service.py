@@ -5,6 +5,9 @@ from datetime import datetime, timedelta
 import pytz
 from typing import Dict, Any, Optional
 import re
+from src.services.provider_registry import providers, ProviderUnavailable, parse_ai_config
+from src.services import model_routing, business_index
+from src.services.intent_classifier import intents
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,18 +25,11 @@ class VoiceService:
         self.elevenlabs_api_key = elevenlabs_api_key
         self.conversation_contexts = {}
         
-        # Initialize OpenAI client if key is provided
+        # LLM clients are shared process-wide through the provider registry
         if self.openai_api_key:
-            try:
-                from openai import OpenAI
-                self.client = OpenAI(api_key=self.openai_api_key)
-                logger.info("OpenAI client initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize OpenAI client: {e}")
-                self.client = None
-        else:
-            self.client = None
-            logger.warning("No OpenAI API key provided, using mock responses")
+            providers.configure(openai=self.openai_api_key)
+        if not providers.configured():
+            logger.warning("No AI provider configured, using mock responses")
     
     def get_saudi_time_info(self) -> Dict[str, Any]:
         """
@@ -140,13 +136,16 @@ class VoiceService:
             'hours_text': business_hours
         }
     
-    def create_intelligent_prompt(self, business_data: Dict[str, Any], conversation_history: list = None) -> str:
+    def create_intelligent_prompt(self, business_data: Dict[str, Any], conversation_history: list = None,
+                                  message: str = '') -> str:
         """
         Create an intelligent system prompt with comprehensive business and time context.
+        Only the parts of the description relevant to `message` are included.
         """
         time_info = self.get_saudi_time_info()
         business_name = business_data.get('name', 'Business')
-        business_description = business_data.get('description', '')
+        business_description = business_index.relevant_context(business_data.get('id'), message,
+                                                               fallback=business_data.get('description', ''))
         business_hours = business_data.get('hours', '')
         
         # Check current status
@@ -164,7 +163,8 @@ CURRENT DATE & TIME CONTEXT:
 
 BUSINESS INFORMATION:
 Name: {business_name}
-Description: {business_description}
+Description:
+{business_description}
 Hours: {business_hours}
 
 INTELLIGENT CAPABILITIES:
@@ -194,63 +194,14 @@ Always be helpful and provide specific, accurate information based on the curren
     
     def detect_intent(self, message: str, business_data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Detect customer intent from their message with enhanced accuracy.
+        Detect customer intent with the shared classifier; confidences are calibrated probabilities.
         """
-        message_lower = message.lower()
-        
-        # Enhanced intent patterns
-        booking_patterns = [
-            'book', 'appointment', 'schedule', 'reserve', 'موعد', 'حجز', 'احجز', 'أريد موعد'
-        ]
-        
-        pricing_patterns = [
-            'price', 'cost', 'how much', 'سعر', 'كم', 'تكلفة', 'أسعار'
-        ]
-        
-        hours_patterns = [
-            'hours', 'open', 'closed', 'time', 'when', 'ساعات', 'مفتوح', 'مغلق', 'متى'
-        ]
-        
-        services_patterns = [
-            'service', 'what do you', 'offer', 'provide', 'خدمات', 'تقدمون', 'ماذا'
-        ]
-        
-        # Check for time-related queries
-        time_patterns = [
-            'today', 'tomorrow', 'yesterday', 'اليوم', 'غداً', 'أمس', 'بكرة'
-        ]
-        
-        # Determine intent with confidence scoring
-        intents = []
-        
-        if any(pattern in message_lower for pattern in booking_patterns):
-            intents.append(('booking', 0.9))
-        
-        if any(pattern in message_lower for pattern in pricing_patterns):
-            intents.append(('pricing', 0.8))
-        
-        if any(pattern in message_lower for pattern in hours_patterns):
-            intents.append(('hours', 0.8))
-        
-        if any(pattern in message_lower for pattern in services_patterns):
-            intents.append(('services', 0.7))
-        
-        if any(pattern in message_lower for pattern in time_patterns):
-            intents.append(('time_query', 0.9))
-        
-        # Return highest confidence intent
-        if intents:
-            primary_intent = max(intents, key=lambda x: x[1])
-            return {
-                'intent': primary_intent[0],
-                'confidence': primary_intent[1],
-                'all_intents': intents
-            }
-        
+        ranked = intents.ranked(message)
+        primary_intent, confidence = ranked[0]
         return {
-            'intent': 'general',
-            'confidence': 0.5,
-            'all_intents': []
+            'intent': primary_intent,
+            'confidence': round(confidence, 3),
+            'all_intents': [(intent, round(p, 3)) for intent, p in ranked if p >= 0.1]
         }
     
     def process_message(self, message: str, business_data: Dict[str, Any], conversation_id: str = "default") -> Dict[str, Any]:
@@ -265,28 +216,28 @@ Always be helpful and provide specific, accurate information based on the curren
             intent_info = self.detect_intent(message, business_data)
             
             # Create intelligent prompt
-            system_prompt = self.create_intelligent_prompt(business_data, conversation_history)
+            system_prompt = self.create_intelligent_prompt(business_data, conversation_history, message)
             
             # Add current message to history
             conversation_history.append({"role": "user", "content": message})
             
-            if self.client:
-                # Use real OpenAI API
+            ai_response = None
+            if providers.configured():
                 messages = [
                     {"role": "system", "content": system_prompt},
                     *conversation_history[-5:]  # Keep last 5 messages for context
                 ]
                 
-                response = self.client.chat.completions.create(
-                    model="gpt-4",
-                    messages=messages,
-                    max_tokens=300,
-                    temperature=0.7
-                )
-                
-                ai_response = response.choices[0].message.content
-                
-            else:
+                ai_config = parse_ai_config(business_data.get('ai_config'))
+                selected = model_routing.route(intent_info['intent'], message, turn=len(conversation_history) // 2,
+                                               ai_config=ai_config, default_provider=providers.default_provider)
+                try:
+                    ai_response = providers.chat(messages, ai_config=model_routing.routed_config(ai_config, selected),
+                                                 business_id=business_data.get('id'))['text']
+                except ProviderUnavailable as e:
+                    logger.error(f"AI provider error: {e}")
+            
+            if ai_response is None:
                 # Generate intelligent mock response
                 ai_response = self.generate_mock_response(message, business_data, intent_info)
             
@@ -348,19 +299,6 @@ Always be helpful and provide specific, accurate information based on the curren
             else:
                 return f"At {business_name}, we offer comprehensive medical services: general consultations, lab tests, X-rays, and specialist consultations. How can I help you?"
         
-        elif intent == 'time_query':
-            if 'today' in message.lower() or 'اليوم' in message:
-                if is_arabic:
-                    return f"اليوم هو {time_info['formatted_date_arabic']} والوقت الحالي {time_info['current_time']}. نحن مفتوحون ومستعدون لخدمتك!"
-                else:
-                    return f"Today is {time_info['formatted_date_english']} and it's currently {time_info['current_time']}. We're open and ready to serve you!"
-            
-            elif 'tomorrow' in message.lower() or 'غداً' in message or 'بكرة' in message:
-                if is_arabic:
-                    return f"غداً هو {time_info['tomorrow_day_arabic']} ({time_info['tomorrow_date']}). يمكنك حجز موعد لغد إذا أردت!"
-                else:
-                    return f"Tomorrow is {time_info['tomorrow_day_english']} ({time_info['tomorrow_date']}). You can book an appointment for tomorrow if you'd like!"
-        
         else:
             if is_arabic:
                 return f"مرحباً بك في {business_name}! كيف يمكنني مساعدتك اليوم؟ يمكنني مساعدتك في حجز المواعيد، معرفة الأسعار، أو الإجابة على أي استفسارات."